@@ -1,11 +1,19 @@
+import re
+import shutil
+import struct
 import subprocess
 import sys
 import tempfile
+import threading
 import time
 import zipfile
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
-from typing import Tuple, Set, List, Optional, Dict, Union
+from typing import Tuple, List, Optional, Dict, Union
 
+from src.apk_management.manifest_reader import ManifestReader
+from src.apk_management.package_index import InstalledPackageIndex, PackageVersions
+from src.apk_management.package_metadata_cache import PackageMetadataCache, PackageMetadata
 from src.utils.logger import get_logger
 from src.utils.yaml_utils import YamlUtils
 
@@ -15,12 +23,18 @@ logger = get_logger(__name__)
 class PackageInstaller:
     """APK/XAPK安装器核心类"""
 
+    # 流式安装时单次读写的缓冲区大小
+    STREAM_BUFFER_SIZE = 1024 * 1024
+
     def __init__(self, device_id: str = None):
         self.device_id = device_id
-        self.installed_packages = None
+        self.package_index = InstalledPackageIndex.for_device(device_id)
+        self._initialized = False
         self.aapt_path = None
         self.adb_path = None
         self.max_workers = None
+        self.install_obb = False
+        self.metadata_cache = PackageMetadataCache.shared()
 
     def _build_adb_cmd(self, base_cmd: list) -> list:
         """构造带设备ID的ADB命令"""
@@ -58,12 +72,13 @@ class PackageInstaller:
             raise RuntimeError(f"连接检查失败: {e.stderr.strip()}")
 
     def initialize(self, max_retries=3):
-        """带重试机制的初始化"""
+        """带重试机制的初始化（每个实例只执行一次，已安装包索引按设备在会话内共享）"""
+        if self._initialized:
+            return
+
         for attempt in range(1, max_retries + 1):
             try:
-                self.adb_path = YamlUtils.load_config().get('adb_path')
-                self.aapt_path = YamlUtils.load_config().get('aapt_path')
-                self.max_workers = YamlUtils.load_config().get('max_workers')
+                self._load_settings()
 
                 self._check_environment()
 
@@ -71,7 +86,8 @@ class PackageInstaller:
                     logger.debug(f"验证设备连接 (尝试 {attempt}/{max_retries})")
                     self._check_device_connection()
 
-                self.installed_packages = self._get_installed_packages()
+                self.package_index.load(self._get_installed_packages)
+                self._initialized = True
                 return  # 初始化成功
 
             except RuntimeError as e:
@@ -81,10 +97,34 @@ class PackageInstaller:
 
                 logger.warning(f"初始化失败: {str(e)}，10秒后重试...")
                 time.sleep(10)
-                self._restart_adb_server()  # 新增ADB服务重启
+                self._recover_connection()
+
+    def _load_settings(self):
+        """读取工具路径与并发配置"""
+        config = YamlUtils.load_config()
+        self.adb_path = config.get('adb_path')
+        self.aapt_path = config.get('aapt_path')
+        self.max_workers = config.get('max_workers')
+        self.install_obb = config.get('install_obb', False)
+
+    def _recover_connection(self):
+        """恢复连接：指定设备时只重连该设备（ADB服务由多个设备的调度线程共享，不能在此重启）"""
+        if not self.device_id:
+            self._restart_adb_server()
+            return
+        try:
+            subprocess.run(
+                [self.adb_path, "-s", self.device_id, "reconnect"],
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+                timeout=30
+            )
+            time.sleep(5)  # 等待设备重新上线
+        except Exception as e:
+            logger.error(f"设备 {self.device_id} 重连失败: {str(e)}")
 
     def _restart_adb_server(self):
-        """重启ADB服务"""
+        """重启ADB服务（仅用于未指定设备的单设备模式）"""
         try:
             subprocess.run(
                 [self.adb_path, "kill-server"],
@@ -98,7 +138,7 @@ class PackageInstaller:
             )
             time.sleep(5)  # 等待服务启动
         except Exception as e:
-            logger.error("ADB服务重启失败: {str(e)}")
+            logger.error(f"ADB服务重启失败: {str(e)}")
 
     def _check_environment(self):
         """检查必要工具是否可用"""
@@ -106,9 +146,9 @@ class PackageInstaller:
         if not Path(self.adb_path).exists():
             raise FileNotFoundError(f"ADB路径不存在: {self.adb_path}")
 
-        # 检查aapt
-        if not Path(self.aapt_path).exists():
-            raise FileNotFoundError(f"AAPT路径不存在: {self.aapt_path}")
+        # 检查aapt（仅作为清单解析失败时的回退）
+        if not Path(self.aapt_path).is_file():
+            logger.warning(f"AAPT路径不存在，仅使用内置清单解析: {self.aapt_path}")
 
         # 检查adb连接
         try:
@@ -140,92 +180,327 @@ class PackageInstaller:
         file_path = self.get_app_path(apk)
         self.initialize()
 
+        success, package, message = self._install(file_path)
+        self.metadata_cache.flush()
+        if success == -1:
+            logger.error(f"{package or file_path.name}安装失败: {message}")
+            sys.exit(-1)
+
+        return success, package, message
+
+    def install_apps(self, app_files: List[Path], device_ids: Optional[List[Optional[str]]] = None) -> List[dict]:
+        """多设备并行批量安装（按文件并行，同一设备上同包的文件串行，线程数受max_workers限制，失败不退出进程）
+
+        :param app_files: 待安装的APK/XAPK文件
+        :param device_ids: 目标设备列表，None 表示当前安装器的设备
+        :return: 格式化结果列表，每项附带 device 字段
+        """
+        # 只读取配置：不指定设备的 pm list packages 在多设备连接时会失败，由各设备的安装器分别初始化
+        self._load_settings()
+        device_ids = device_ids if device_ids is not None else [self.device_id]
+
+        # 每台设备独立的安装器，各自使用对应设备的已安装包索引
+        installers = {}
+        for device_id in device_ids:
+            installer = self if device_id == self.device_id else PackageInstaller(device_id=device_id)
+            installer.initialize()
+            installers[device_id] = installer
+
+        results = {device_id: [None] * len(app_files) for device_id in device_ids}
+        max_workers = max(1, int(self.max_workers or 1))
+        logger.info(f"📦 并行安装 | 设备 {len(device_ids)} 台 | 文件 {len(app_files)} 个 | 线程 {max_workers}")
+
+        # (设备, 包名) -> 锁：同包的多个文件（如APK与XAPK）不会同时通过 needs_install
+        package_locks: Dict[Tuple[Optional[str], str], threading.Lock] = {}
+        locks_guard = threading.Lock()
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            # 按文件交错提交，使线程池在设备间均衡
+            futures = {
+                executor.submit(self._install_serialized, installers[device_id], file_path,
+                                package_locks, locks_guard): (device_id, index)
+                for index, file_path in enumerate(app_files)
+                for device_id in device_ids
+            }
+            for future in as_completed(futures):
+                device_id, index = futures[future]
+                results[device_id][index] = future.result()
+        self.metadata_cache.flush()
+
+        formatted = []
+        for device_id in device_ids:
+            logger.info(f"设备 {device_id or '默认'}:")
+            self._print_summary(results[device_id])
+            for item in self._format_results(results[device_id], app_files):
+                item["device"] = device_id
+                formatted.append(item)
+        return formatted
+
+    @staticmethod
+    def _install_serialized(installer: "PackageInstaller",
+                            file_path: Path,
+                            package_locks: Dict[Tuple[Optional[str], str], threading.Lock],
+                            locks_guard: threading.Lock) -> Tuple[int, str, str]:
+        """安装单个文件，持有 (设备, 包名) 锁；不同包在同一设备上仍可并行"""
+        try:
+            package_name = installer.get_package_metadata(file_path)["package_name"]
+        except Exception:
+            # 元数据读取失败时按文件加锁，错误由 _install 返回
+            package_name = str(file_path)
+        with locks_guard:
+            lock = package_locks.setdefault((installer.device_id, package_name), threading.Lock())
+        with lock:
+            result = installer._install(file_path)
+        if result[0] == -1:
+            logger.error(f"[{installer.device_id or '默认设备'}] {result[1] or file_path.name}安装失败: {result[2]}")
+        return result
+
+    def list_connected_devices(self) -> List[str]:
+        """获取处于 device 状态的设备序列号"""
+        if self.adb_path is None:
+            self._load_settings()
+        result = subprocess.run(
+            [self.adb_path, "devices"],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True,
+            timeout=10,
+            check=True
+        )
+        return [
+            line.split("\t")[0]
+            for line in result.stdout.splitlines()[1:]
+            if line.strip().endswith("\tdevice")
+        ]
+
+    def _install(self, file_path: Path) -> Tuple[int, str, str]:
+        """按文件类型安装单个应用，异常转为失败结果"""
         try:
             if file_path.suffix.lower() == '.xapk':
-                success, package, message = self._install_xapk(file_path)
+                result = self._install_xapk(file_path)
             else:
-                success, package, message = self._install_apk(file_path)
-
-            if success == -1:
-                logger.error(f"{package}安装失败: {message}")
-                sys.exit(-1)
-
-            return success, package, message
+                result = self._install_apk(file_path)
         except Exception as e:
             logger.error(f"安装失败: {file_path.name}", exc_info=True)
-            sys.exit(-1)
+            return -1, "", str(e)
+
+        return result
+
+    def get_package_metadata(self, file_path: Path) -> PackageMetadata:
+        """获取APK/XAPK元数据（包名、版本号、最低SDK、启动Activity），优先读取磁盘缓存"""
+        if file_path.suffix.lower() == '.xapk':
+            return self.metadata_cache.get_or_compute(file_path, self._read_xapk_metadata)
+        return self.metadata_cache.get_or_compute(file_path, self._read_apk_metadata)
+
+    def prefill_metadata_cache(self, app_files: List[Path]) -> int:
+        """批量预热元数据缓存（无需连接设备），返回成功解析的文件数"""
+        self._load_settings()
+        parsed = 0
+        with ThreadPoolExecutor(max_workers=max(1, int(self.max_workers or 1))) as executor:
+            futures = {executor.submit(self.get_package_metadata, file_path): file_path for file_path in app_files}
+            for future in as_completed(futures):
+                try:
+                    metadata = future.result()
+                    parsed += 1
+                    logger.info(f"\t{futures[future].name}: {metadata['package_name']} ({metadata['version_code']})")
+                except Exception as e:
+                    logger.error(f"\t{futures[future].name} 解析失败: {e}")
+        self.metadata_cache.flush()
+        logger.info(f"元数据缓存预热完成: {parsed}/{len(app_files)}")
+        return parsed
 
     def _install_xapk(self, xapk_path: Path) -> Tuple[int, str, str]:
         """返回 (状态, 包名, 信息)"""
 
-        with tempfile.TemporaryDirectory() as tmp_dir:
-            try:
-                apk_files = self._extract_xapk(xapk_path, tmp_dir)
-                package_name = self._validate_package_names(apk_files)
+        # 缓存命中且已安装时无需打开压缩包
+        cached = self.metadata_cache.get(xapk_path)
+        if cached and not self.package_index.needs_install(cached["package_name"], cached["version_code"])[0]:
+            logger.info(f"📱 尝试拉起app (包名为{cached['package_name']})")
+            logger.info(f"\t跳过安装")
+            return 0, cached["package_name"], "skipped"
+
+        package_name = ""
+        try:
+            with zipfile.ZipFile(xapk_path, 'r') as zip_ref:
+                apk_members = self._list_split_members(zip_ref)
+                metadata = cached or self._validate_package_names(zip_ref, apk_members)
+                package_name = metadata["package_name"]
+                if not cached:
+                    self.metadata_cache.put(xapk_path, metadata)
 
                 logger.info(f"📱 尝试拉起app (包名为{package_name})")
 
-                if package_name in self.installed_packages:
+                need_install, reason = self.package_index.needs_install(package_name, metadata["version_code"])
+                if not need_install:
                     logger.info(f"\t跳过安装")
                     return 0, package_name, "skipped"
+                if reason == "upgrade":
+                    logger.info(f"\t⬆️ 发现新版本，升级安装 ({self.package_index.version_of(package_name)} -> {metadata['version_code']})")
 
-                install_cmd = self._build_adb_cmd(["install-multiple", "-r"])
-                install_cmd.extend(str(apk) for apk in apk_files)
+                # split直接从压缩包流式写入安装会话，不落地临时文件
+                success, message = self._stream_install_session(zip_ref, apk_members)
+                if not success:
+                    logger.error(f"\t安装失败")
+                    return -1, package_name, "failed：" + message
 
-                result = subprocess.run(
-                    install_cmd,
-                    capture_output=True,
-                    text=True,
-                    check=True
-                )
+                # 安装成功后增量更新索引，避免同包的重复文件再次安装
+                self.package_index.record_install(package_name, metadata["version_code"])
 
-                if 'Success' not in result.stdout:
-                    logger.error(f"\t安装失败")
-                    return -1, package_name, "failed：" + result.stdout.strip()
+                if self.install_obb:
+                    try:
+                        self._stream_obb_files(zip_ref, package_name)
+                    except (subprocess.CalledProcessError, RuntimeError, OSError, zipfile.BadZipFile) as e:
+                        # 应用本身已安装成功，OBB写入失败只记录警告
+                        logger.warning(f"\t⚠️ OBB写入失败（应用已安装）: {e}")
+                        return 1, package_name, f"success（OBB写入失败: {e}）"
 
                 return 1, package_name, "success"
 
-            except subprocess.CalledProcessError as e:
-                error = e.stderr or e.stdout
-                return -1, package_name, f"ADB错误: {error.strip()}"
-            except RuntimeError as e:
-                return -1, "", str(e)
+        except subprocess.CalledProcessError as e:
+            error = e.stderr or e.stdout
+            return -1, package_name, f"ADB错误: {error.strip()}"
+        except (RuntimeError, zipfile.BadZipFile) as e:
+            return -1, package_name, str(e)
 
-    def _extract_xapk(self, xapk_path: Path, tmp_dir: str) -> List[Path]:
-        """解压XAPK文件并返回APK列表"""
+    def _read_xapk_metadata(self, xapk_path: Path) -> PackageMetadata:
+        """读取XAPK内各split的元数据（仅在缓存未命中时调用）"""
         with zipfile.ZipFile(xapk_path, 'r') as zip_ref:
-            zip_ref.extractall(tmp_dir)
+            return self._validate_package_names(zip_ref, self._list_split_members(zip_ref))
 
-        apk_files = list(Path(tmp_dir).rglob("*.apk"))
-        if not apk_files:
+    @staticmethod
+    def _list_split_members(zip_ref: zipfile.ZipFile) -> List[zipfile.ZipInfo]:
+        """列出XAPK中的APK条目（跳过OBB、图标等资源）"""
+        apk_members = [
+            info for info in zip_ref.infolist()
+            if not info.is_dir() and info.filename.lower().endswith('.apk')
+        ]
+        if not apk_members:
             raise RuntimeError("未找到APK文件")
-        return apk_files
+        return apk_members
 
-    def _validate_package_names(self, apk_files: List[Path]) -> str:
-        """验证并返回唯一包名"""
+    def _validate_package_names(self, zip_ref: zipfile.ZipFile, apk_members: List[zipfile.ZipInfo]) -> PackageMetadata:
+        """验证包名唯一，返回基础APK（含启动Activity）的元数据"""
         package_names = set()
-        for apk in apk_files:
+        base_metadata = None
+        for member in apk_members:
             try:
-                name = self._parse_package_name(apk)
-                package_names.add(name)
+                metadata = self._read_split_metadata(zip_ref, member)
             except RuntimeError:
                 continue
+            package_names.add(metadata["package_name"])
+            if base_metadata is None or (metadata["launchable_activity"] and not base_metadata["launchable_activity"]):
+                base_metadata = metadata
 
         if not package_names:
             raise RuntimeError("所有APK文件均未找到有效包名")
         if len(package_names) > 1:
             raise RuntimeError(f"发现多个不同包名: {', '.join(package_names)}")
-        return package_names.pop()
+        return base_metadata
+
+    def _read_split_metadata(self, zip_ref: zipfile.ZipFile, member: zipfile.ZipInfo) -> PackageMetadata:
+        """直接读取嵌套APK中的清单；失败时仅解压该split到临时文件交给aapt，用后即删"""
+        try:
+            with zip_ref.open(member) as split_stream:
+                return ManifestReader.read_metadata(split_stream)
+        except (zipfile.BadZipFile, KeyError, struct.error, RuntimeError) as e:
+            logger.debug(f"split清单解析失败，解压后重试: {member.filename} | {e}")
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            split_path = Path(zip_ref.extract(member, tmp_dir))
+            return self._read_apk_metadata(split_path)
+
+    def _stream_install_session(self,
+                                zip_ref: zipfile.ZipFile,
+                                apk_members: List[zipfile.ZipInfo]) -> Tuple[bool, str]:
+        """通过 pm install-create/install-write/install-commit 会话流式安装split，返回 (是否成功, 信息)"""
+        total_size = sum(member.file_size for member in apk_members)
+        result = subprocess.run(
+            self._build_adb_cmd(["shell", "pm", "install-create", "-r", "-S", str(total_size)]),
+            capture_output=True,
+            text=True,
+            check=True
+        )
+        session_match = re.search(r"\[(\d+)]", result.stdout)
+        if not session_match:
+            return False, result.stdout.strip()
+        session_id = session_match.group(1)
+
+        try:
+            for index, member in enumerate(apk_members):
+                split_name = f"{index}_{Path(member.filename).name}"
+                # exec-in 不经过shell协议，stdin按原始字节转发
+                write_cmd = self._build_adb_cmd([
+                    "exec-in", "pm", "install-write", "-S", str(member.file_size), session_id, split_name, "-"
+                ])
+                output = self._stream_member(zip_ref, member, write_cmd)
+                if 'Success' not in output:
+                    raise RuntimeError(f"写入{member.filename}失败: {output.strip()}")
+
+            result = subprocess.run(
+                self._build_adb_cmd(["shell", "pm", "install-commit", session_id]),
+                capture_output=True,
+                text=True,
+                check=True
+            )
+            if 'Success' not in result.stdout:
+                return False, result.stdout.strip()
+            return True, "success"
+
+        except (RuntimeError, subprocess.CalledProcessError) as e:
+            subprocess.run(
+                self._build_adb_cmd(["shell", "pm", "install-abandon", session_id]),
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL
+            )
+            if isinstance(e, subprocess.CalledProcessError):
+                raise
+            return False, str(e)
+
+    def _stream_obb_files(self, zip_ref: zipfile.ZipFile, package_name: str):
+        """将OBB数据包流式写入设备的 Android/obb/<包名>/ 目录"""
+        obb_members = [
+            info for info in zip_ref.infolist()
+            if not info.is_dir() and info.filename.lower().endswith('.obb')
+        ]
+        if not obb_members:
+            return
+
+        obb_dir = f"/sdcard/Android/obb/{package_name}"
+        subprocess.run(self._build_adb_cmd(["shell", "mkdir", "-p", obb_dir]), capture_output=True, check=True)
+        for member in obb_members:
+            remote_path = f"{obb_dir}/{Path(member.filename).name}"
+            self._stream_member(zip_ref, member, self._build_adb_cmd(["exec-in", "sh", "-c", f"cat > '{remote_path}'"]))
+            logger.info(f"\t📦 OBB已写入: {remote_path}")
+
+    def _stream_member(self, zip_ref: zipfile.ZipFile, member: zipfile.ZipInfo, cmd: list) -> str:
+        """将压缩包条目按固定大小缓冲区写入子进程stdin，返回子进程输出"""
+        process = subprocess.Popen(cmd, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        try:
+            with zip_ref.open(member) as source:
+                shutil.copyfileobj(source, process.stdin, self.STREAM_BUFFER_SIZE)
+        except BrokenPipeError:
+            pass  # 设备端提前退出，错误信息见子进程输出
+        finally:
+            process.stdin.close()
+
+        stdout, stderr = process.communicate()
+        if process.returncode != 0:
+            raise RuntimeError(f"ADB流式写入失败: {(stderr or stdout).decode(errors='replace').strip()}")
+        return stdout.decode(errors='replace')
 
     def _install_apk(self, apk_path: Path) -> Tuple[int, str, str]:
         """返回 (状态, 包名, 信息)"""
         try:
-            package_name = self._parse_package_name(apk_path)
+            metadata = self.get_package_metadata(apk_path)
+            package_name = metadata["package_name"]
             logger.info(f"📱 尝试拉起app (包名为{package_name})")
 
-            if package_name in self.installed_packages:
+            need_install, reason = self.package_index.needs_install(package_name, metadata["version_code"])
+            if not need_install:
                 logger.info(f"\t跳过安装{package_name}")
                 return 0, package_name, "skipped"
+            if reason == "upgrade":
+                logger.info(f"\t⬆️ 发现新版本，升级安装 ({self.package_index.version_of(package_name)} -> {metadata['version_code']})")
             install_cmd = self._build_adb_cmd(["install", "-r", str(apk_path)])
             result = subprocess.run(
                 install_cmd,
@@ -238,6 +513,8 @@ class PackageInstaller:
             if 'Success' not in result.stdout:
                 logger.error(f"{package_name}安装失败")
                 return -1, package_name, f"failed：{result.stdout.strip()}"
+
+            self.package_index.record_install(package_name, metadata["version_code"])
             return 1, package_name, "success"
 
         except subprocess.CalledProcessError as e:
@@ -248,6 +525,20 @@ class PackageInstaller:
 
     def _parse_package_name(self, apk_path: Path) -> str:
         """解析APK包名"""
+        return self.get_package_metadata(apk_path)["package_name"]
+
+    def _read_apk_metadata(self, apk_path: Path) -> PackageMetadata:
+        """进程内解析二进制清单，失败时回退到 aapt"""
+        try:
+            return ManifestReader.read_metadata(apk_path)
+        except (zipfile.BadZipFile, KeyError, struct.error, RuntimeError) as e:
+            if not (self.aapt_path and Path(self.aapt_path).is_file()):
+                raise RuntimeError(f"清单解析失败且aapt不可用: {e}")
+            logger.debug(f"清单解析失败，回退aapt: {apk_path.name} | {e}")
+            return self._dump_badging(apk_path)
+
+    def _dump_badging(self, apk_path: Path) -> PackageMetadata:
+        """通过 aapt dump badging 解析APK元数据"""
         try:
             cmd = [self.aapt_path, "dump", "badging", str(apk_path)]
             result = subprocess.run(
@@ -256,19 +547,57 @@ class PackageInstaller:
                 text=True,
                 check=True
             )
+        except subprocess.CalledProcessError as e:
+            raise RuntimeError(f"aapt执行失败: {e.stderr.strip()}")
 
-            for line in result.stdout.splitlines():
-                if line.startswith("package: name="):
-                    package_name = line.split("'")[1]
-                    return package_name
+        metadata = {
+            "package_name": None,
+            "version_code": None,
+            "min_sdk": None,
+            "launchable_activity": None
+        }
+        for line in result.stdout.splitlines():
+            if line.startswith("package: name="):
+                metadata["package_name"] = line.split("'")[1]
+                version_code = re.search(r"versionCode='(\d+)'", line)
+                if version_code:
+                    metadata["version_code"] = int(version_code.group(1))
+            elif line.startswith(("sdkVersion:", "minSdkVersion:")) and metadata["min_sdk"] is None:
+                min_sdk = re.search(r"'(\d+)'", line)
+                if min_sdk:
+                    metadata["min_sdk"] = int(min_sdk.group(1))
+            elif line.startswith("launchable-activity:") and metadata["launchable_activity"] is None:
+                metadata["launchable_activity"] = line.split("'")[1]
+
+        if not metadata["package_name"]:
             raise RuntimeError("未找到包名信息")
+        return metadata
 
-        except subprocess.CalledProcessError as e:
-            raise RuntimeError(f"aapt执行失败: {e.stderr.strip()}")
+    def _get_installed_packages(self) -> PackageVersions:
+        """安全获取已安装包及其版本号"""
+        try:
+            output = self._list_packages(["--show-versioncode"])
+        except (RuntimeError, subprocess.CalledProcessError):
+            # 旧版本系统不支持 --show-versioncode
+            output = self._list_packages([])
+
+        packages = {}
+        for line in output.splitlines():
+            if not line.startswith("package:"):
+                continue
+            fields = line[len("package:"):].split()
+            if not fields:
+                continue
+            version_code = None
+            for field in fields[1:]:
+                if field.startswith("versionCode:") and field[len("versionCode:"):].isdigit():
+                    version_code = int(field[len("versionCode:"):])
+            packages[fields[0].strip()] = version_code
+        return packages
 
-    def _get_installed_packages(self) -> Set[str]:
-        """安全获取已安装包列表"""
-        cmd = self._build_adb_cmd(["shell", "pm", "list", "packages"])
+    def _list_packages(self, options: List[str]) -> str:
+        """执行 pm list packages 并返回输出"""
+        cmd = self._build_adb_cmd(["shell", "pm", "list", "packages"] + options)
 
         try:
             result = subprocess.run(
@@ -284,11 +613,7 @@ class PackageInstaller:
             if "error:" in result.stderr.lower():
                 raise RuntimeError(f"ADB命令执行错误: {result.stderr.strip()}")
 
-            return set(
-                line.split(":")[1].strip()
-                for line in result.stdout.splitlines()
-                if line.startswith("package:")
-            )
+            return result.stdout
 
         except subprocess.CalledProcessError as e:
             error_msg = f"获取安装列表失败: {e.stderr.strip() or e.stdout.strip()}"
@@ -308,6 +633,17 @@ class PackageInstaller:
             sys.exit(-1)
         return path
 
+    @staticmethod
+    def collect_app_files(directory: str) -> List[Path]:
+        """递归收集目录下的APK/XAPK文件"""
+        path = Path(directory)
+        if not path.is_dir():
+            raise NotADirectoryError(f"{directory}不是有效目录")
+        return sorted(
+            file for file in path.rglob("*")
+            if file.is_file() and file.suffix.lower() in ('.xapk', '.apk')
+        )
+
     def _print_summary(self, results: list):
         """修改后的摘要打印"""
         success = sum(1 for s, _, _ in results if s == 1)
@@ -331,3 +667,24 @@ class PackageInstaller:
         first_success = success_results[0]
         logger.info(f"成功安装应用: {first_success.get('package', '')}")
         return first_success.get('package', '')
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from src.utils.logger import setup_logging
+
+    parser = argparse.ArgumentParser(description="批量并行安装APK/XAPK")
+    parser.add_argument("directory", help="安装文件目录")
+    parser.add_argument("--devices", nargs="*", help="目标设备序列号，默认所有已连接设备")
+    parser.add_argument("--prefill-cache", action="store_true", help="仅预热包元数据缓存，不安装")
+    args = parser.parse_args()
+
+    setup_logging()
+    bulk_installer = PackageInstaller()
+    files = bulk_installer.collect_app_files(args.directory)
+    if args.prefill_cache:
+        sys.exit(0 if bulk_installer.prefill_metadata_cache(files) == len(files) else 1)
+    targets = args.devices or bulk_installer.list_connected_devices()
+    install_results = bulk_installer.install_apps(files, targets)
+    sys.exit(0 if all(r["success"] != -1 for r in install_results) else 1)
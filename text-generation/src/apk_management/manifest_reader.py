@@ -0,0 +1,211 @@
+# src/apk_management/manifest_reader.py
+"""二进制 AndroidManifest.xml 解析模块：进程内读取包名/版本/启动Activity，替代 aapt 子进程"""
+import struct
+import zipfile
+from pathlib import Path
+from typing import BinaryIO, Dict, List, Optional, Tuple, Union
+
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# ResChunk 类型
+_RES_STRING_POOL_TYPE = 0x0001
+_RES_XML_TYPE = 0x0003
+_RES_XML_START_ELEMENT_TYPE = 0x0102
+_RES_XML_END_ELEMENT_TYPE = 0x0103
+_RES_XML_RESOURCE_MAP_TYPE = 0x0180
+
+# Res_value 数据类型
+_TYPE_REFERENCE = 0x01
+_TYPE_STRING = 0x03
+_TYPE_INT_DEC = 0x10
+_TYPE_INT_HEX = 0x11
+
+_UTF8_FLAG = 1 << 8
+
+# android: 命名空间属性的资源ID（混淆后的manifest可能只保留资源ID，不保留属性名）
+_ATTR_RESOURCE_IDS = {
+    0x01010003: "name",
+    0x0101021b: "versionCode",
+    0x0101020c: "minSdkVersion",
+}
+
+_ACTION_MAIN = "android.intent.action.MAIN"
+_CATEGORY_LAUNCHER = "android.intent.category.LAUNCHER"
+
+
+class ManifestReader:
+    """AXML（Android二进制XML）清单读取器"""
+
+    MANIFEST_ENTRY = "AndroidManifest.xml"
+
+    @classmethod
+    def read_metadata(cls, apk_path: Union[Path, BinaryIO]) -> Dict[str, Optional[object]]:
+        """读取APK元数据，字段与 aapt dump badging 解析结果一致（支持路径或可seek的文件对象）"""
+        with zipfile.ZipFile(apk_path, 'r') as zip_ref:
+            # ZipFile 只解析中央目录，read 仅解压 manifest 这一个条目
+            data = zip_ref.read(cls.MANIFEST_ENTRY)
+        return cls.parse(data)
+
+    @classmethod
+    def parse(cls, data: bytes) -> Dict[str, Optional[object]]:
+        """解析二进制清单内容"""
+        chunk_type, header_size, total_size = struct.unpack_from("<HHI", data, 0)
+        if chunk_type != _RES_XML_TYPE:
+            raise RuntimeError("不是有效的二进制AndroidManifest")
+
+        strings: List[str] = []
+        resource_ids: List[int] = []
+        metadata = {
+            "package_name": None,
+            "version_code": None,
+            "min_sdk": None,
+            "launchable_activity": None
+        }
+
+        # 元素标签栈；activity 内收集 intent-filter 的 action/category
+        stack: List[str] = []
+        activity: Optional[str] = None
+        filter_actions, filter_categories = set(), set()
+        activity_is_launcher = False
+
+        offset = header_size
+        end = min(total_size, len(data))
+        while offset + 8 <= end:
+            chunk_type, chunk_header_size, chunk_size = struct.unpack_from("<HHI", data, offset)
+            if chunk_size < 8:
+                raise RuntimeError(f"清单数据块长度异常: offset={offset}")
+
+            if chunk_type == _RES_STRING_POOL_TYPE:
+                strings = cls._parse_string_pool(data, offset)
+            elif chunk_type == _RES_XML_RESOURCE_MAP_TYPE:
+                count = (chunk_size - chunk_header_size) // 4
+                resource_ids = list(struct.unpack_from(f"<{count}I", data, offset + chunk_header_size))
+            elif chunk_type == _RES_XML_START_ELEMENT_TYPE:
+                tag, attrs = cls._parse_start_element(data, offset, chunk_header_size, strings, resource_ids)
+                stack.append(tag)
+
+                if tag == "manifest":
+                    metadata["package_name"] = attrs.get("package")
+                    metadata["version_code"] = cls._to_int(attrs.get("versionCode"))
+                elif tag == "uses-sdk" and metadata["min_sdk"] is None:
+                    metadata["min_sdk"] = cls._to_int(attrs.get("minSdkVersion"))
+                elif tag in ("activity", "activity-alias") and "application" in stack:
+                    activity = attrs.get("name")
+                    activity_is_launcher = False
+                elif tag == "intent-filter":
+                    filter_actions, filter_categories = set(), set()
+                elif tag == "action" and stack[-2:-1] == ["intent-filter"]:
+                    filter_actions.add(attrs.get("name"))
+                elif tag == "category" and stack[-2:-1] == ["intent-filter"]:
+                    filter_categories.add(attrs.get("name"))
+            elif chunk_type == _RES_XML_END_ELEMENT_TYPE:
+                tag = stack.pop() if stack else None
+                if tag == "intent-filter" and activity:
+                    if _ACTION_MAIN in filter_actions and _CATEGORY_LAUNCHER in filter_categories:
+                        activity_is_launcher = True
+                elif tag in ("activity", "activity-alias"):
+                    if activity_is_launcher and metadata["launchable_activity"] is None:
+                        metadata["launchable_activity"] = cls._qualify(activity, metadata["package_name"])
+                    activity = None
+
+            offset += chunk_size
+
+        if not metadata["package_name"]:
+            raise RuntimeError("未找到包名信息")
+        return metadata
+
+    @staticmethod
+    def _parse_string_pool(data: bytes, offset: int) -> List[str]:
+        """解析字符串池（UTF-8 / UTF-16）"""
+        (_, header_size, _, string_count, _, flags,
+         strings_start, _) = struct.unpack_from("<HHIIIIII", data, offset)
+        is_utf8 = bool(flags & _UTF8_FLAG)
+        offsets = struct.unpack_from(f"<{string_count}I", data, offset + header_size)
+        base = offset + strings_start
+
+        strings = []
+        for string_offset in offsets:
+            pos = base + string_offset
+            if is_utf8:
+                # UTF-8: 先是UTF-16长度，再是UTF-8字节长度，均为1或2字节变长编码
+                _, pos = ManifestReader._decode_length8(data, pos)
+                length, pos = ManifestReader._decode_length8(data, pos)
+                strings.append(data[pos:pos + length].decode("utf-8", errors="replace"))
+            else:
+                length, pos = ManifestReader._decode_length16(data, pos)
+                strings.append(data[pos:pos + length * 2].decode("utf-16-le", errors="replace"))
+        return strings
+
+    @staticmethod
+    def _decode_length8(data: bytes, pos: int) -> Tuple[int, int]:
+        length = data[pos]
+        if length & 0x80:
+            return ((length & 0x7F) << 8) | data[pos + 1], pos + 2
+        return length, pos + 1
+
+    @staticmethod
+    def _decode_length16(data: bytes, pos: int) -> Tuple[int, int]:
+        length = struct.unpack_from("<H", data, pos)[0]
+        if length & 0x8000:
+            low = struct.unpack_from("<H", data, pos + 2)[0]
+            return ((length & 0x7FFF) << 16) | low, pos + 4
+        return length, pos + 2
+
+    @staticmethod
+    def _parse_start_element(data: bytes,
+                             offset: int,
+                             header_size: int,
+                             strings: List[str],
+                             resource_ids: List[int]) -> Tuple[str, Dict[str, object]]:
+        """解析开始标签，返回 (标签名, {属性名: 值})"""
+        ext = offset + header_size
+        _, name_idx, attr_start, attr_size, attr_count = struct.unpack_from("<IIHHH", data, ext)
+
+        def string_at(index: int) -> Optional[str]:
+            return strings[index] if 0 <= index < len(strings) else None
+
+        attrs = {}
+        for i in range(attr_count):
+            attr_offset = ext + attr_start + i * attr_size
+            _, attr_name_idx, raw_value_idx, _, _, data_type, value = struct.unpack_from(
+                "<IIIHBBI", data, attr_offset
+            )
+            # 优先按资源ID识别 android: 属性，兼容属性名被混淆的清单
+            attr_name = None
+            if attr_name_idx < len(resource_ids):
+                attr_name = _ATTR_RESOURCE_IDS.get(resource_ids[attr_name_idx])
+            attr_name = attr_name or string_at(attr_name_idx)
+            if not attr_name:
+                continue
+
+            if data_type == _TYPE_STRING:
+                attrs[attr_name] = string_at(value)
+            elif data_type in (_TYPE_INT_DEC, _TYPE_INT_HEX):
+                attrs[attr_name] = value
+            elif raw_value_idx != 0xFFFFFFFF:
+                attrs[attr_name] = string_at(raw_value_idx)
+            elif data_type == _TYPE_REFERENCE:
+                attrs[attr_name] = f"@0x{value:08x}"
+        return string_at(name_idx) or "", attrs
+
+    @staticmethod
+    def _to_int(value) -> Optional[int]:
+        if isinstance(value, int):
+            return value
+        try:
+            return int(value)
+        except (TypeError, ValueError):
+            return None
+
+    @staticmethod
+    def _qualify(activity: Optional[str], package_name: Optional[str]) -> Optional[str]:
+        """补全相对类名（.MainActivity / MainActivity）"""
+        if not activity or not package_name:
+            return activity
+        if activity.startswith("."):
+            return package_name + activity
+        if "." not in activity:
+            return f"{package_name}.{activity}"
+        return activity
@@ -0,0 +1,72 @@
+# src/apk_management/package_index.py
+"""设备已安装包索引：会话内每台设备只查询一次 pm list packages，安装后增量更新"""
+import threading
+from typing import Callable, Dict, Optional, Tuple
+
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# 包名 -> 版本号（设备不支持 --show-versioncode 时为 None）
+PackageVersions = Dict[str, Optional[int]]
+
+
+class InstalledPackageIndex:
+    """单台设备的已安装包索引"""
+
+    _indexes: Dict[Optional[str], "InstalledPackageIndex"] = {}
+    _registry_lock = threading.Lock()
+
+    def __init__(self, device_id: Optional[str] = None):
+        self.device_id = device_id
+        self._packages: PackageVersions = {}
+        self._lock = threading.Lock()
+        self.loaded = False
+
+    @classmethod
+    def for_device(cls, device_id: Optional[str]) -> "InstalledPackageIndex":
+        """获取设备对应的共享索引（None 表示默认设备）"""
+        with cls._registry_lock:
+            if device_id not in cls._indexes:
+                cls._indexes[device_id] = cls(device_id)
+            return cls._indexes[device_id]
+
+    def load(self, fetch: Callable[[], PackageVersions], force: bool = False):
+        """首次调用（或 force=True）时通过 fetch 拉取设备包列表"""
+        with self._lock:
+            if self.loaded and not force:
+                return
+            self._packages = dict(fetch())
+            self.loaded = True
+        logger.debug(f"已安装包索引加载完成: {self.device_id or '默认设备'} | {len(self._packages)} 个")
+
+    def __contains__(self, package_name: str) -> bool:
+        with self._lock:
+            return package_name in self._packages
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._packages)
+
+    def version_of(self, package_name: str) -> Optional[int]:
+        with self._lock:
+            return self._packages.get(package_name)
+
+    def needs_install(self, package_name: str, version_code: Optional[int]) -> Tuple[bool, str]:
+        """判断是否需要安装，返回 (是否安装, 原因: install / upgrade / skipped)"""
+        with self._lock:
+            if package_name not in self._packages:
+                return True, "install"
+            installed_version = self._packages[package_name]
+
+        # 任一版本未知时沿用旧逻辑：已安装即跳过
+        if version_code is None or installed_version is None:
+            return False, "skipped"
+        if version_code > installed_version:
+            return True, "upgrade"
+        return False, "skipped"
+
+    def record_install(self, package_name: str, version_code: Optional[int]):
+        """安装成功后增量更新索引"""
+        with self._lock:
+            self._packages[package_name] = version_code
@@ -0,0 +1,126 @@
+# src/apk_management/package_metadata_cache.py
+"""APK元数据磁盘缓存：避免每次运行都执行 aapt dump badging"""
+import atexit
+import hashlib
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Callable, Dict, Optional
+
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# 元数据字段: package_name / version_code / min_sdk / launchable_activity
+PackageMetadata = Dict[str, Optional[object]]
+
+
+class PackageMetadataCache:
+    """按 (路径, 大小, 修改时间) 快速命中，未命中时以内容哈希兜底（文件移动/拷贝后仍可复用）
+
+    写入只更新内存并标记为脏，由 flush() 一次性落盘（批量安装/预热结束时及进程退出时调用）。
+    """
+
+    DEFAULT_PATH = Path("output/cache/package_metadata.json")
+    _HASH_CHUNK_SIZE = 1024 * 1024
+
+    _shared_instance = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self, cache_path: Optional[Path] = None):
+        self.cache_path = Path(cache_path or self.DEFAULT_PATH)
+        self._lock = threading.Lock()
+        self._files: Dict[str, Dict] = {}  # 路径 -> {size, mtime, sha256}
+        self._metadata: Dict[str, PackageMetadata] = {}  # sha256 -> 元数据
+        self._dirty = False
+        self._load()
+
+    @classmethod
+    def shared(cls) -> "PackageMetadataCache":
+        """进程内共享的默认缓存实例"""
+        if cls._shared_instance is None:
+            with cls._shared_lock:
+                if cls._shared_instance is None:
+                    cls._shared_instance = cls()
+                    atexit.register(cls._shared_instance.flush)
+        return cls._shared_instance
+
+    def get(self, file_path: Path) -> Optional[PackageMetadata]:
+        """仅查询缓存，路径/大小/修改时间一致时不读取文件内容"""
+        stat = file_path.stat()
+        with self._lock:
+            record = self._files.get(self._path_key(file_path))
+            if record and record["size"] == stat.st_size and record["mtime"] == stat.st_mtime_ns:
+                metadata = self._metadata.get(record["sha256"])
+                if metadata is not None:
+                    return dict(metadata)
+        return None
+
+    def get_or_compute(self, file_path: Path, compute: Callable[[Path], PackageMetadata]) -> PackageMetadata:
+        """查询缓存，未命中时按内容哈希查找，仍未命中再调用 compute 并写入缓存"""
+        metadata = self.get(file_path)
+        if metadata is not None:
+            return metadata
+
+        digest = self._hash_file(file_path)
+        with self._lock:
+            metadata = self._metadata.get(digest)
+
+        if metadata is None:
+            metadata = compute(file_path)
+            logger.debug(f"元数据缓存未命中: {file_path.name}")
+        self.put(file_path, metadata, digest)
+        return dict(metadata)
+
+    def put(self, file_path: Path, metadata: PackageMetadata, digest: Optional[str] = None):
+        """写入内存缓存，调用 flush() 后持久化"""
+        stat = file_path.stat()
+        digest = digest or self._hash_file(file_path)
+        with self._lock:
+            self._metadata[digest] = dict(metadata)
+            self._files[self._path_key(file_path)] = {
+                "size": stat.st_size,
+                "mtime": stat.st_mtime_ns,
+                "sha256": digest
+            }
+            self._dirty = True
+
+    def flush(self):
+        """有未保存的写入时持久化到磁盘"""
+        with self._lock:
+            if not self._dirty:
+                return
+            self._save()
+            self._dirty = False
+
+    def _load(self):
+        if not self.cache_path.exists():
+            return
+        try:
+            with open(self.cache_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            self._files = data.get("files", {})
+            self._metadata = data.get("metadata", {})
+        except (OSError, json.JSONDecodeError) as e:
+            logger.warning(f"元数据缓存损坏，已忽略: {self.cache_path} | {e}")
+
+    def _save(self):
+        """原子写入，避免并发安装时产生半截文件"""
+        self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.cache_path.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({"files": self._files, "metadata": self._metadata}, f, ensure_ascii=False)
+        os.replace(tmp_path, self.cache_path)
+
+    @staticmethod
+    def _path_key(file_path: Path) -> str:
+        return str(file_path.resolve())
+
+    @classmethod
+    def _hash_file(cls, file_path: Path) -> str:
+        sha256 = hashlib.sha256()
+        with open(file_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(cls._HASH_CHUNK_SIZE), b""):
+                sha256.update(chunk)
+        return sha256.hexdigest()
@@ -1,15 +1,18 @@
 # src/context_extraction/context_extractor.py
-import sys
+import json
 import time
 from pathlib import Path
 from typing import Dict, List, Optional, Tuple
-from xml.etree import ElementTree as ET
 
 import adbutils
 import cv2
+import numpy as np
 import uiautomator2
 from uiautomator2 import Device
 
+from src.context_extraction.hierarchy_pruner import HierarchyPruner
+from src.context_extraction.spatial_index import LabelSpatialIndex
+from src.context_extraction.ui_node_table import UINodeTable
 from src.utils.logger import get_logger
 from src.utils.str_utils import StrUtils
 from src.utils.uiautomator_utils import UIAutomatorUtils
@@ -22,34 +25,21 @@ class ContextExtractor:
         self.device = device
         self.hierarchy_xml = None
         self.root = None
+        self.node_table: Optional[UINodeTable] = None
 
     def dump_ui_hierarchy(self, package_name: str) -> str:
         """提取并返回原始XML层次结构"""
         raw_xml = UIAutomatorUtils.dump_hierarchy(self.device)
-        root = UIAutomatorUtils.parse_xml_root(raw_xml)
-        self._prune_xml_tree(root, package_name)
-        self.hierarchy_xml = ET.tostring(root, encoding="utf-8").decode()
-        self.root = root
+        # 解析的同时按包名裁剪，一次遍历得到裁剪后的树与序列化XML
+        self.root, self.hierarchy_xml = HierarchyPruner.prune(raw_xml, package_name)
+        self.node_table = UINodeTable.build(self.root)
         return self.hierarchy_xml
 
-    def _prune_xml_tree(self, node: ET.Element, target_pkg: str) -> bool:
-        """优化版XML树修剪方法"""
-        # 标记是否保留当前节点
-        keep = False
-
-        # 当前节点属于目标包
-        if node.get("package") == target_pkg:
-            keep = True
-
-        # 倒序处理子节点避免删除影响索引
-        for child in reversed(list(node)):
-            if self._prune_xml_tree(child, target_pkg):
-                keep = True
-            else:
-                # 直接移除不需要的子节点
-                node.remove(child)
-
-        return keep
+    def _table(self) -> UINodeTable:
+        """当前层级的节点表（尚未构建时按 self.root 构建）"""
+        if self.node_table is None:
+            self.node_table = UINodeTable.build(self.root)
+        return self.node_table
 
     def extract_all_contexts(self, app_name: str, package_name: str) -> Dict:
         """提取并整合所有上下文信息"""
@@ -64,24 +54,10 @@ class ContextExtractor:
             xml_path = self._save_xml_data(xml_content)
             logger.info(f"\t📄 UI层级解析完成 | 路径：{xml_path}")
 
-            # 组件上下文提取
-            component_contexts = self.extract_component_contexts()
-            logger.info(f"\t✅ 组件上下文就绪（发现 {len(component_contexts)} 个输入组件）")
-
-            # 全局上下文
-            global_contexts = self.extract_global_context(app_name, package_name, len(component_contexts))
-            logger.info("\t✅ 全局上下文就绪")
+            contexts = self.extract_hierarchy_contexts(app_name, package_name)
 
-            # 相邻上下文分析
-            adjacent_contexts = self.extract_adjacent_contexts(component_contexts)
-            logger.info("\t✅ 相邻关系分析完成 ")
-
-            # 整合数据
-            contexts = {
-                "global": global_contexts,
-                "component": component_contexts,
-                "adjacent": adjacent_contexts
-            }
+            # 离线重提取所需的元数据（屏幕尺寸、activity）
+            self._save_metadata(xml_path, app_name, package_name, screenshot_path)
 
         except Exception as e:
             logger.critical(f"🚨 上下文提取流程异常终止 | 错误: {str(e)}", exc_info=True)
@@ -90,9 +66,39 @@ class ContextExtractor:
         logger.info("🎉 上下文提取流程完成")
         return contexts
 
+    def extract_hierarchy_contexts(self, app_name: str, package_name: str) -> Dict:
+        """基于已解析的UI层级（self.root）提取组件、全局、相邻上下文"""
+        # 组件上下文提取
+        component_contexts = self.extract_component_contexts()
+        logger.info(f"\t✅ 组件上下文就绪（发现 {len(component_contexts)} 个输入组件）")
+
+        # 全局上下文
+        global_contexts = self.extract_global_context(app_name, package_name, len(component_contexts))
+        logger.info("\t✅ 全局上下文就绪")
+
+        # 相邻上下文分析
+        adjacent_contexts = self.extract_adjacent_contexts(component_contexts)
+        logger.info("\t✅ 相邻关系分析完成 ")
+
+        # 整合数据
+        return {
+            "global": global_contexts,
+            "component": component_contexts,
+            "adjacent": adjacent_contexts
+        }
+
+    def _display_size(self) -> Tuple[int, int]:
+        """屏幕宽高"""
+        device_info = UIAutomatorUtils.get_device_info(self.device)
+        return device_info["displayWidth"], device_info["displayHeight"]
+
+    def _current_app(self) -> Dict:
+        """前台应用信息（package、activity）"""
+        return UIAutomatorUtils.get_current_app_info(self.device)
+
     def extract_global_context(self, app_name: str, package_name: str, text_input_number: int) -> Dict:
         """提取全局上下文"""
-        current_app = UIAutomatorUtils.get_current_app_info(self.device)
+        current_app = self._current_app()
         return {
             "app_name": app_name,
             "package_name": package_name,
@@ -102,61 +108,51 @@ class ContextExtractor:
 
     def extract_component_contexts(self) -> List[Dict]:
         """提取可见的输入组件"""
-        device_info = UIAutomatorUtils.get_device_info(self.device)
-        screen_width = device_info["displayWidth"]
-        screen_height = device_info["displayHeight"]
-
-        INPUT_CLASSES = [
-            'android.widget.EditText',
-            'android.widget.AutoCompleteTextView',
-            'android.widget.MultiAutoCompleteTextView'
-        ]
-        input_nodes = []
-        for cls in INPUT_CLASSES:
-            input_nodes += UIAutomatorUtils.find_nodes(
-                self.root,
-                f".//node[@class='{cls}']"
-            )
-        input_nodes = list({id(node): node for node in input_nodes}.values())
+        screen_width, screen_height = self._display_size()
+
+        table = self._table()
 
         visible_inputs = []
-        for node in input_nodes:
+        for row in table.rows_of_classes(UIAutomatorUtils.INPUT_CLASSES):
+            resource_id = table.resource_id[row]
 
-            if UIAutomatorUtils.get_node_attribute(node, "resource-id") == "":
+            if resource_id == "":
                 logger.error(f"❌ app异常，输入框的id字段无法获得，请选择比的页面，或者更换app")
-                sys.exit(-1)
-            if (UIAutomatorUtils.get_node_attribute(node, "resource-id") in (
+                # 抛出异常而非退出进程：批量/调度模式下只让当前应用失败
+                raise ValueError(f"输入框缺少 resource-id: {table.cls[row]} {table.bounds_dict(row)}")
+            if (resource_id in (
                     # 时间选择框排除
                     "com.kajda.fuelio:id/initialDate",
                     "com.omronhealthcare.omronconnect:id/actv_date"
             )):
-                logger.warning(f"{UIAutomatorUtils.get_node_attribute(node, 'resource-id')}为时间选择框，跳过")
+                logger.warning(f"{resource_id}为时间选择框，跳过")
                 continue
 
-            bounds = self._parse_bounds(UIAutomatorUtils.get_node_attribute(node, "bounds", "[0,0][0,0]"))
-            if (UIAutomatorUtils.get_node_attribute(node, "package", "") in (
+            if (table.package[row] in (
                     # clickable 白名单
                     "com.applabstudios.ai.mail.homescreen.inbox"
             )):
-                visible_inputs.append(node)
+                visible_inputs.append(row)
                 continue
 
-            if (self._is_visible(bounds, screen_width, screen_height)
-                    and UIAutomatorUtils.get_node_attribute(node, "clickable", "false") == "true"):
-                visible_inputs.append(node)
+            if (self._is_visible(table.bounds_dict(row), screen_width, screen_height)
+                    and table.has_flag(row, "clickable")):
+                visible_inputs.append(row)
 
         return self.get_visible_inputs_attributes(visible_inputs)
 
-    def get_visible_inputs_attributes(self, visible_inputs):
+    def get_visible_inputs_attributes(self, visible_inputs: List[int]):
+        """visible_inputs 为节点表中的行号"""
+        table = self._table()
         components = []
-        for node in visible_inputs:
+        for row in visible_inputs:
             components.append({
-                "index": UIAutomatorUtils.get_node_attribute(node, "index", "0"),
-                "type": UIAutomatorUtils.get_node_attribute(node, "class"),
-                "hint": UIAutomatorUtils.get_node_attribute(node, "hint"),
-                "text": UIAutomatorUtils.get_node_attribute(node, "text"),
-                "resource_id": UIAutomatorUtils.get_node_attribute(node, "resource-id"),
-                "bounds": self._parse_bounds(UIAutomatorUtils.get_node_attribute(node, "bounds")),
+                "index": table.index[row],
+                "type": table.cls[row],
+                "hint": table.hint[row],
+                "text": table.text[row],
+                "resource_id": table.resource_id[row],
+                "bounds": table.bounds_dict(row),
                 "resource_id_combined": ""
             })
 
@@ -179,83 +175,34 @@ class ContextExtractor:
         return components
 
     def extract_adjacent_contexts(self, text_inputs: List[Dict]) -> Dict[str, Dict]:
+        """每个输入框上/下/左/右最近的 TextView 标签（无则为 None）"""
         adjacent_contexts = {}
-
-        for edit_data in text_inputs:
-            # 确保使用统一的键名（如resource-id）
-
-            text_nodes = UIAutomatorUtils.find_nodes(self.root, ".//node[@class='android.widget.TextView']")
-            # 获取textinput的边界值以及中心点坐标
-            edit_bounds = edit_data["bounds"]
-            et_center = self._calculate_center(edit_bounds)
-
-            # 初始化每一个方向上的候选textview列表
-            direction_candidates = {"top": [], "bottom": [], "left": [], "right": []}
-
-            # 获取每一个候选与当前edittext的位置关系
-            for tv_node in text_nodes:
-                tv_bounds = self._parse_bounds(UIAutomatorUtils.get_node_attribute(tv_node, "bounds", "[0,0][0,0]"))
-                tv_text = UIAutomatorUtils.get_node_attribute(tv_node, "text", "").strip()
-
-                tv_center = self._calculate_center(tv_bounds)
-                direction = self._determine_relative_position(edit_bounds, tv_bounds, tv_center)
-                if direction is None:
-                    continue
-                if direction in ("left", "right"):
-                    distance = abs(et_center[0] - tv_center[0])
-                else:
-                    distance = abs(et_center[1] - tv_center[1])
-
-                direction_candidates[direction].append({
-                    "text": tv_text,
-                    "distance": distance
-                })
-
-            adjacent = {}
-            for direction, candidates in direction_candidates.items():
-                adjacent[direction] = sorted(candidates, key=lambda x: x["distance"])[0] if candidates else None
-            resource_id = edit_data["resource_id_combined"]
-            adjacent_contexts[resource_id] = adjacent
+        for edit_data, candidates in zip(text_inputs, self._query_labels(text_inputs, k=1)):
+            adjacent = LabelSpatialIndex.closest(candidates)
+            adjacent_contexts[edit_data["resource_id_combined"]] = adjacent
             logger.info(f"\t\t{adjacent}")
         return adjacent_contexts
 
-    def _determine_relative_position(
-            self,
-            edit_bounds: Dict[str, int],
-            tv_bounds: Dict[str, int],
-            tv_center: Tuple[float, float]
-    ) -> Optional[str]:
-
-        if (tv_bounds["bottom"] <= edit_bounds["top"]) and (
-                edit_bounds["left"] <= tv_center[0] <= edit_bounds["right"]):
-            return "top"
-
-        if (tv_bounds["top"] >= edit_bounds["bottom"]) and (
-                edit_bounds["left"] <= tv_center[0] <= edit_bounds["right"]):
-            return "bottom"
-
-        if (tv_bounds["right"] <= edit_bounds["left"]) and (
-                edit_bounds["top"] <= tv_center[1] <= edit_bounds["bottom"]):
-            return "left"
-
-        if (tv_bounds["left"] >= edit_bounds["right"]) and (
-                edit_bounds["top"] <= tv_center[1] <= edit_bounds["bottom"]):
-            return "right"
+    def extract_adjacent_candidates(self, text_inputs: List[Dict], k: int = 3) -> Dict[str, Dict[str, List[Dict]]]:
+        """每个输入框每个方向按距离升序的前 k 个候选标签"""
+        return {
+            edit_data["resource_id_combined"]: candidates
+            for edit_data, candidates in zip(text_inputs, self._query_labels(text_inputs, k))
+        }
 
-        return None
+    def _query_labels(self, text_inputs: List[Dict], k: int) -> List[Dict[str, List[Dict]]]:
+        """所有输入框一次批量查询空间索引"""
+        edit_bounds = np.array(
+            [[c["bounds"]["left"], c["bounds"]["top"], c["bounds"]["right"], c["bounds"]["bottom"]]
+             for c in text_inputs],
+            dtype=np.int64
+        ).reshape(-1, 4)
+        labels = LabelSpatialIndex.from_table(self._table(), (UIAutomatorUtils.TEXT_VIEW_CLASS,))
+        return labels.nearest(edit_bounds, k)
 
     def _parse_bounds(self, bounds_str: str) -> Dict:
-        if not bounds_str or '][' not in bounds_str:
-            return {"left": 0, "top": 0, "right": 0, "bottom": 0}
-
-        try:
-            cleaned = [s.replace("[", "").replace("]", "") for s in bounds_str.split("][")]
-            parts = cleaned[0].split(",") + cleaned[1].split(",")
-            left, top, right, bottom = map(int, parts)
-            return {"left": left, "top": top, "right": right, "bottom": bottom}
-        except Exception as e:
-            logger.error(f"解析bounds失败: {bounds_str}, 错误: {e}")
-            return {"left": 0, "top": 0, "right": 0, "bottom": 0}
+        left, top, right, bottom = UINodeTable.parse_bounds(bounds_str)
+        return {"left": left, "top": top, "right": right, "bottom": bottom}
 
     def _is_visible(self, bounds: Dict, screen_w: int, screen_h: int) -> bool:
         return (0 <= bounds["left"] < screen_w and
@@ -263,11 +210,8 @@ class ContextExtractor:
                 bounds["right"] <= screen_w and
                 bounds["bottom"] <= screen_h)
 
-    def _calculate_center(self, bounds: Dict) -> Tuple[float, float]:
-        return (bounds["right"] + bounds["left"]) / 2, (bounds["bottom"] + bounds["top"]) / 2
-
     def _save_xml_data(self, xml_content: str) -> Path:
-        package = UIAutomatorUtils.get_current_app_info(self.device).get('package', 'unknown')
+        package = self._current_app().get('package', 'unknown')
         xml_dir = Path("output/xml_dumps")
         xml_dir.mkdir(parents=True, exist_ok=True)
 
@@ -277,6 +221,22 @@ class ContextExtractor:
 
         return file_path
 
+    def _save_metadata(self, xml_path: Path, app_name: str, package_name: str, screenshot_path: Path) -> Path:
+        """在层级XML旁保存同名 .json 元数据，供 OfflineContextExtractor 离线重提取"""
+        screen_width, screen_height = self._display_size()
+        metadata = {
+            "app_name": app_name,
+            "package_name": package_name,
+            "activity": self._current_app().get('activity'),
+            "display_width": screen_width,
+            "display_height": screen_height,
+            "screenshot": str(screenshot_path),
+        }
+        metadata_path = xml_path.with_suffix(".json")
+        with open(metadata_path, "w", encoding="utf-8") as f:
+            json.dump(metadata, f, indent=2, ensure_ascii=False)
+        return metadata_path
+
     def _save_screenshot(self, package_name: str) -> Path:
         """保存设备截图到文件"""
         max_retries = 5
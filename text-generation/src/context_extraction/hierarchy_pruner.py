@@ -0,0 +1,138 @@
+# src/context_extraction/hierarchy_pruner.py
+"""UI层级按包名裁剪：解析XML的同时过滤节点，一次遍历得到裁剪后的树及其序列化结果（无递归）"""
+from typing import List, Optional, Tuple
+from xml.etree import ElementTree as ET
+
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+def _escape_cdata(text: str) -> str:
+    if "&" in text:
+        text = text.replace("&", "&amp;")
+    if "<" in text:
+        text = text.replace("<", "&lt;")
+    if ">" in text:
+        text = text.replace(">", "&gt;")
+    return text
+
+
+def _escape_attrib(text: str) -> str:
+    text = _escape_cdata(text)
+    if "\"" in text:
+        text = text.replace("\"", "&quot;")
+    if "\r" in text:
+        text = text.replace("\r", "&#13;")
+    if "\n" in text:
+        text = text.replace("\n", "&#10;")
+    if "\t" in text:
+        text = text.replace("\t", "&#09;")
+    return text
+
+
+class _PruningBuilder:
+    """XMLParser 的 target（SAX 风格）：元素结束时才决定是否保留，被裁剪的节点不创建 Element
+
+    保留规则与原递归实现一致：节点自身 package 为目标包，或任一后代被保留；根节点始终保留。
+    每个保留节点同时生成序列化片段（嵌套列表），结果与 ET.tostring 逐字节一致。
+    """
+
+    def __init__(self, package_name: str):
+        self.package_name = package_name
+        self.visited = 0
+        self.kept = 0
+        # [tag, attrib, 保留的子元素, 子元素片段, text]
+        self._stack: List[list] = []
+        self._data: List[str] = []
+        self._tail = False
+        self._last: Optional[Tuple[ET.Element, list]] = None  # 最近结束的节点及其片段（被裁剪时为 None）
+        self._root: Optional[ET.Element] = None
+        self._root_piece: Optional[list] = None
+        self._namespaced = False
+
+    def start(self, tag: str, attrib: dict):
+        self._flush()
+        self._stack.append([tag, attrib, [], [], None])
+        self._tail = False
+
+    def data(self, data: str):
+        self._data.append(data)
+
+    def end(self, tag: str):
+        self._flush()
+        tag, attrib, children, child_pieces, text = self._stack.pop()
+        self.visited += 1
+        if not (children or attrib.get("package") == self.package_name or not self._stack):
+            self._last = None
+            self._tail = True
+            return
+
+        elem = ET.Element(tag, attrib)
+        elem.text = text
+        elem.extend(children)
+        self.kept += 1
+
+        if "{" in tag or any("{" in key for key in attrib):
+            self._namespaced = True
+        head = "<" + tag + "".join(f" {key}=\"{_escape_attrib(value)}\"" for key, value in attrib.items())
+        if text or children:
+            piece = [head + ">" + (_escape_cdata(text) if text else ""), *child_pieces, "</" + tag + ">"]
+        else:
+            piece = [head + " />"]
+
+        if self._stack:
+            self._stack[-1][2].append(elem)
+            self._stack[-1][3].append(piece)
+        else:
+            self._root, self._root_piece = elem, piece
+        self._last = (elem, piece)
+        self._tail = True
+
+    def _flush(self):
+        if not self._data:
+            return
+        text = "".join(self._data)
+        self._data = []
+        if self._tail:
+            # 上一个结束节点的 tail；节点被裁剪时 tail 随之丢弃
+            if self._last is not None:
+                elem, piece = self._last
+                elem.tail = text
+                piece.append(_escape_cdata(text))
+        elif self._stack:
+            self._stack[-1][4] = text
+
+    def close(self) -> Tuple[ET.Element, str]:
+        self._flush()
+        if self._root is None:
+            raise ValueError("UI层级XML为空")
+        if self._namespaced:
+            return self._root, ET.tostring(self._root, encoding="utf-8").decode()
+
+        # 迭代展开嵌套片段
+        out: List[str] = []
+        stack = [iter(self._root_piece)]
+        while stack:
+            for part in stack[-1]:
+                if isinstance(part, list):
+                    stack.append(iter(part))
+                    break
+                out.append(part)
+            else:
+                stack.pop()
+        return self._root, "".join(out)
+
+
+class HierarchyPruner:
+    """UI层级裁剪（静态方法）"""
+
+    @staticmethod
+    def prune(raw_xml: str, package_name: str) -> Tuple[ET.Element, str]:
+        """解析 raw_xml 并只保留目标包节点及其祖先，返回 (裁剪后的根节点, 序列化XML)"""
+        builder = _PruningBuilder(package_name)
+        parser = ET.XMLParser(target=builder)
+        parser.feed(raw_xml)
+        root, xml = parser.close()
+        logger.debug(f"UI层级裁剪: {builder.visited} 个节点，保留 {builder.kept} 个")
+        return root, xml
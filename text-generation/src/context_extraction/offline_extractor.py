@@ -0,0 +1,183 @@
+# src/context_extraction/offline_extractor.py
+"""离线上下文提取：基于已保存的层级XML与元数据重建 global/component/adjacent 上下文，无需设备，可多进程批量执行"""
+import json
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from src.context_extraction.context_extractor import ContextExtractor
+from src.context_extraction.hierarchy_pruner import HierarchyPruner
+from src.context_extraction.ui_node_table import UINodeTable
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+DUMP_PREFIX = "hierarchy_"
+
+
+class OfflineContextExtractor(ContextExtractor):
+    """以 output/xml_dumps/hierarchy_<pkg>.xml 及同名 .json 元数据代替设备
+
+    元数据字段：app_name, package_name, activity, display_width, display_height（由在线提取写入）。
+    旧的转储没有元数据时，包名取自文件名，activity 记为 unknown；屏幕尺寸优先使用 display_size（--display），
+    否则取全部节点 bounds 的右下边界并告警（位于屏幕外的输入框可能被误判为可见）。
+    """
+
+    def __init__(self, xml_path: Path, metadata: Optional[Dict] = None,
+                 display_size: Optional[Tuple[int, int]] = None):
+        super().__init__(device=None)
+        self.xml_path = Path(xml_path)
+        self.metadata = metadata if metadata is not None else self.load_metadata(self.xml_path)
+        self.display_size = display_size
+        self._guessed_display: Optional[Tuple[int, int]] = None
+
+    @staticmethod
+    def load_metadata(xml_path: Path) -> Dict:
+        metadata_path = Path(xml_path).with_suffix(".json")
+        if not metadata_path.exists():
+            logger.warning(f"⚠️ 未找到元数据 {metadata_path}，使用层级XML推断")
+            return {}
+        with open(metadata_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    @property
+    def package_name(self) -> str:
+        stem = self.xml_path.stem
+        return self.metadata.get("package_name") or (stem[len(DUMP_PREFIX):] if stem.startswith(DUMP_PREFIX) else stem)
+
+    def dump_ui_hierarchy(self, package_name: str) -> str:
+        """读取已保存的层级XML（已裁剪的转储再次裁剪结果不变）"""
+        raw_xml = self.xml_path.read_text(encoding="utf-8")
+        self.root, self.hierarchy_xml = HierarchyPruner.prune(raw_xml, package_name)
+        self.node_table = UINodeTable.build(self.root)
+        return self.hierarchy_xml
+
+    def extract_all_contexts(self, app_name: Optional[str] = None, package_name: Optional[str] = None) -> Dict:
+        """从转储重建上下文，不截图、不写回XML"""
+        package_name = package_name or self.package_name
+        app_name = app_name or self.metadata.get("app_name") or package_name
+        try:
+            self.dump_ui_hierarchy(package_name)
+            contexts = self.extract_hierarchy_contexts(app_name, package_name)
+        except Exception as e:
+            logger.error(f"🚨 离线上下文提取失败 {self.xml_path} | 错误: {str(e)}")
+            raise RuntimeError("上下文提取失败") from e
+        return contexts
+
+    def _display_size(self) -> Tuple[int, int]:
+        if self.metadata.get("display_width") and self.metadata.get("display_height"):
+            return self.metadata["display_width"], self.metadata["display_height"]
+        if self.display_size:
+            return self.display_size
+        if self._guessed_display is None:
+            table = self._table()
+            if len(table):
+                self._guessed_display = int(table.bounds[:, 2].max()), int(table.bounds[:, 3].max())
+            else:
+                self._guessed_display = 0, 0
+            logger.warning(
+                f"⚠️ {self.xml_path} 缺少屏幕尺寸，按节点 bounds 推断为 "
+                f"{self._guessed_display[0]}x{self._guessed_display[1]}，屏幕外的输入框可能被计为可见；"
+                f"可用 --display WxH 指定"
+            )
+        return self._guessed_display
+
+    def _current_app(self) -> Dict:
+        return {"package": self.package_name, "activity": self.metadata.get("activity") or "unknown"}
+
+    @staticmethod
+    def extract_file(xml_path: str, display_size: Optional[Tuple[int, int]] = None
+                     ) -> Tuple[str, Optional[Dict], Optional[str]]:
+        """进程池任务：返回 (路径, 上下文, 错误信息)"""
+        try:
+            context = OfflineContextExtractor(Path(xml_path), display_size=display_size).extract_all_contexts()
+            return xml_path, context, None
+        except Exception as e:
+            # 单个转储的任何错误（XML/元数据损坏、输入框缺少 resource-id 等）只记录为失败，不中断整个批次
+            cause = e.__cause__ or e
+            return xml_path, None, f"{type(cause).__name__}: {cause}"
+
+    @staticmethod
+    def extract_corpus(xml_paths: List[Path], workers: Optional[int] = None, context_dir: str = "output/contexts",
+                       display_size: Optional[Tuple[int, int]] = None) -> Dict[str, Dict]:
+        """多进程重提取全部转储，上下文保存到 context_dir/context_<pkg>.json，返回 {包名: 上下文}
+
+        display_size 为没有元数据的转储指定屏幕尺寸 (宽, 高)。
+        """
+        out_dir = Path(context_dir)
+        out_dir.mkdir(parents=True, exist_ok=True)
+        contexts: Dict[str, Dict] = {}
+        failures: Dict[str, str] = {}
+
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            task = partial(OfflineContextExtractor.extract_file, display_size=display_size)
+            for xml_path, context, error in pool.map(task, [str(p) for p in xml_paths], chunksize=4):
+                if context is None:
+                    failures[xml_path] = error
+                    logger.error(f"\t❌ {xml_path}: {error}")
+                    continue
+                package_name = context["global"]["package_name"]
+                with open(out_dir / f"context_{package_name}.json", "w", encoding="utf-8") as f:
+                    json.dump(context, f, indent=2, ensure_ascii=False)
+                contexts[package_name] = context
+
+        logger.info(f"🎉 离线上下文提取完成: {len(contexts)} 成功 | {len(failures)} 失败")
+        OfflineContextExtractor.save_report(contexts, failures)
+        return contexts
+
+    @staticmethod
+    def save_report(contexts: Dict[str, Dict], failures: Dict[str, str], report_dir: str = "output/reports") -> Path:
+        path = Path(report_dir)
+        path.mkdir(parents=True, exist_ok=True)
+        report_path = path / f"offline_extraction_{time.strftime('%Y%m%d_%H%M%S')}.json"
+        with open(report_path, "w", encoding="utf-8") as f:
+            json.dump({
+                "success": {pkg: ctx["global"]["input_count"] for pkg, ctx in sorted(contexts.items())},
+                "failed": failures,
+            }, f, indent=2, ensure_ascii=False)
+        logger.info(f"📄 离线提取报告已保存: {report_path}")
+        return report_path
+
+
+def _parse_display(value: str) -> Tuple[int, int]:
+    """解析 --display 参数，如 1080x2400"""
+    width, sep, height = value.lower().partition("x")
+    if not sep or not width.isdigit() or not height.isdigit():
+        raise ValueError(f"屏幕尺寸格式应为 WxH: {value}")
+    return int(width), int(height)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from src.utils.logger import setup_logging
+
+    parser = argparse.ArgumentParser(description="基于已保存的层级XML离线重提取上下文")
+    parser.add_argument("paths", nargs="*", help="层级XML文件，默认 output/xml_dumps/hierarchy_*.xml")
+    parser.add_argument("--workers", type=int, help="进程数，默认CPU核数")
+    parser.add_argument("--prompts", action="store_true", help="同时重建提示并写入 t_google_prompts 与 output/prompts")
+    parser.add_argument("--display", type=_parse_display, help="没有元数据的转储使用的屏幕尺寸 WxH（如 1080x2400）")
+    args = parser.parse_args()
+
+    setup_logging()
+    dump_paths = [Path(p) for p in args.paths] or sorted(Path("output/xml_dumps").glob(f"{DUMP_PREFIX}*.xml"))
+    if not dump_paths:
+        raise SystemExit("未找到层级XML文件（output/xml_dumps/hierarchy_*.xml）")
+    corpus = OfflineContextExtractor.extract_corpus(dump_paths, args.workers, display_size=args.display)
+
+    if args.prompts:
+        from src.llm_integration.prompt_generator import PromptEngine
+
+        # 提示构建与写库在主进程执行（子进程退出时不会刷新后台写库队列）
+        engine = PromptEngine()
+        failed = []
+        for package_name, context_data in corpus.items():
+            try:
+                engine.build_prompt(context_data)
+            except Exception as e:
+                # 单个应用失败不影响其余应用
+                failed.append(package_name)
+                logger.error(f"\t❌ {package_name} 提示构建失败: {type(e).__name__}: {e}")
+        logger.info(f"📒 提示重建完成: {len(corpus) - len(failed)} 成功 | {len(failed)} 失败")
@@ -0,0 +1,92 @@
+# src/context_extraction/spatial_index.py
+"""标签空间索引：用 NumPy 一次性计算所有输入框在上/下/左/右四个方向上最近的文本标签"""
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from src.context_extraction.ui_node_table import UINodeTable
+
+LEFT, TOP, RIGHT, BOTTOM = range(4)
+
+
+class LabelSpatialIndex:
+    """候选标签的 bounds 数组索引
+
+    方向判定与原逐对比较一致：标签中心点的投影落在输入框范围内，且整体位于输入框某一侧；
+    同时满足多个方向时按 top > bottom > left > right 取第一个。
+    距离为中心点在该方向轴上的差值，距离相同时按文档顺序取先出现的标签。
+    """
+
+    DIRECTIONS = ("top", "bottom", "left", "right")
+
+    def __init__(self, bounds: np.ndarray, texts: Sequence[str]):
+        self.bounds = np.asarray(bounds, dtype=np.int64).reshape(-1, 4)
+        self.texts = list(texts)
+        self.centers = np.stack([
+            (self.bounds[:, RIGHT] + self.bounds[:, LEFT]) / 2,
+            (self.bounds[:, BOTTOM] + self.bounds[:, TOP]) / 2
+        ], axis=1)
+
+    @classmethod
+    def from_table(cls, table: UINodeTable, classes: Sequence[str] = ("android.widget.TextView",)) -> "LabelSpatialIndex":
+        rows = table.rows_of_classes(classes)
+        return cls(table.bounds[rows], [table.text[row].strip() for row in rows])
+
+    def __len__(self) -> int:
+        return len(self.texts)
+
+    def distance_matrices(self, edit_bounds: np.ndarray) -> Dict[str, np.ndarray]:
+        """返回每个方向 shape 为 (输入框数, 标签数) 的距离矩阵，不属于该方向的位置为 inf"""
+        edit = np.asarray(edit_bounds, dtype=np.int64).reshape(-1, 4)
+        e_left, e_top, e_right, e_bottom = (edit[:, i:i + 1] for i in range(4))
+        e_cx = (e_right + e_left) / 2
+        e_cy = (e_bottom + e_top) / 2
+        t_cx = self.centers[None, :, 0]
+        t_cy = self.centers[None, :, 1]
+        t = self.bounds[None]
+
+        x_inside = (e_left <= t_cx) & (t_cx <= e_right)
+        y_inside = (e_top <= t_cy) & (t_cy <= e_bottom)
+
+        top = (t[..., BOTTOM] <= e_top) & x_inside
+        bottom = (t[..., TOP] >= e_bottom) & x_inside & ~top
+        taken = top | bottom
+        left = (t[..., RIGHT] <= e_left) & y_inside & ~taken
+        taken |= left
+        right = (t[..., LEFT] >= e_right) & y_inside & ~taken
+
+        vertical = np.abs(e_cy - t_cy)
+        horizontal = np.abs(e_cx - t_cx)
+        return {
+            "top": np.where(top, vertical, np.inf),
+            "bottom": np.where(bottom, vertical, np.inf),
+            "left": np.where(left, horizontal, np.inf),
+            "right": np.where(right, horizontal, np.inf),
+        }
+
+    def nearest(self, edit_bounds: np.ndarray, k: int = 1) -> List[Dict[str, List[Dict]]]:
+        """批量查询：每个输入框每个方向按距离升序返回最多 k 个 {"text", "distance"}"""
+        edit = np.asarray(edit_bounds, dtype=np.int64).reshape(-1, 4)
+        results: List[Dict[str, List[Dict]]] = [{direction: [] for direction in self.DIRECTIONS} for _ in edit]
+        if not len(self) or not len(edit):
+            return results
+
+        for direction, distances in self.distance_matrices(edit).items():
+            if k == 1:
+                # argmin 返回第一个最小值，等价于稳定排序后取首个
+                order = np.argmin(distances, axis=1)[:, None]
+            else:
+                order = np.argsort(distances, axis=1, kind="stable")[:, :k]
+            picked = np.take_along_axis(distances, order, axis=1)
+            for edit_idx in range(len(edit)):
+                results[edit_idx][direction] = [
+                    {"text": self.texts[label_idx], "distance": float(distance)}
+                    for label_idx, distance in zip(order[edit_idx], picked[edit_idx])
+                    if np.isfinite(distance)
+                ]
+        return results
+
+    @staticmethod
+    def closest(candidates: Dict[str, List[Dict]]) -> Dict[str, Optional[Dict]]:
+        """每个方向只保留最近的标签（无候选为 None），即 extract_adjacent_contexts 的输出格式"""
+        return {direction: found[0] if found else None for direction, found in candidates.items()}
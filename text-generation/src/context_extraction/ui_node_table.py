@@ -0,0 +1,101 @@
+# src/context_extraction/ui_node_table.py
+"""UI层级节点表：一次遍历XML树，按列存储节点属性与整数bounds，并按 class / resource-id 建立索引"""
+import re
+from typing import Dict, List, Optional, Sequence
+from xml.etree import ElementTree as ET
+
+import numpy as np
+
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+_BOUNDS_PATTERN = re.compile(r"\[\s*(-?\d+)\s*,\s*(-?\d+)\s*\]\[\s*(-?\d+)\s*,\s*(-?\d+)\s*\]")
+EMPTY_BOUNDS = (0, 0, 0, 0)
+
+
+class UINodeTable:
+    """列式节点表（行号即节点在文档中的顺序）
+
+    - 字符串列：class / resource-id / text / hint / index / package
+    - flags：布尔属性的位掩码（见 FLAGS）
+    - bounds：shape 为 (n, 4) 的整数数组，列依次为 left, top, right, bottom
+    """
+
+    FLAGS = ("checkable", "checked", "clickable", "enabled", "focusable", "focused",
+             "scrollable", "long-clickable", "password", "selected")
+    _FLAG_BITS = {name: 1 << bit for bit, name in enumerate(FLAGS)}
+
+    def __init__(self):
+        self.nodes: List[ET.Element] = []
+        self.cls: List[str] = []
+        self.resource_id: List[str] = []
+        self.text: List[str] = []
+        self.hint: List[str] = []
+        self.index: List[str] = []
+        self.package: List[str] = []
+        self.flags = np.zeros(0, dtype=np.uint16)
+        self.bounds = np.zeros((0, 4), dtype=np.int64)
+        self.by_class: Dict[str, List[int]] = {}
+        self.by_resource_id: Dict[str, List[int]] = {}
+
+    @classmethod
+    def build(cls, root: ET.Element) -> "UINodeTable":
+        """线性遍历一次 root 下的全部 node 节点构建节点表"""
+        table = cls()
+        flags: List[int] = []
+        bounds: List[tuple] = []
+        flag_bits = cls._FLAG_BITS.items()
+
+        for row, node in enumerate(root.iter("node")):
+            attrib = node.attrib
+            node_class = attrib.get("class", "")
+            resource_id = attrib.get("resource-id", "")
+
+            table.nodes.append(node)
+            table.cls.append(node_class)
+            table.resource_id.append(resource_id)
+            table.text.append(attrib.get("text", ""))
+            table.hint.append(attrib.get("hint", ""))
+            table.index.append(attrib.get("index", "0"))
+            table.package.append(attrib.get("package", ""))
+            flags.append(sum(bit for name, bit in flag_bits if attrib.get(name) == "true"))
+            bounds.append(cls.parse_bounds(attrib.get("bounds", "")))
+
+            table.by_class.setdefault(node_class, []).append(row)
+            table.by_resource_id.setdefault(resource_id, []).append(row)
+
+        table.flags = np.asarray(flags, dtype=np.uint16)
+        table.bounds = np.asarray(bounds, dtype=np.int64).reshape(-1, 4)
+        return table
+
+    @staticmethod
+    def parse_bounds(bounds_str: Optional[str]) -> tuple:
+        """解析 "[l,t][r,b]" 为 (left, top, right, bottom)，缺失或格式错误时返回全0"""
+        if not bounds_str or '][' not in bounds_str:
+            return EMPTY_BOUNDS
+        match = _BOUNDS_PATTERN.fullmatch(bounds_str.strip())
+        if match is None:
+            logger.error(f"解析bounds失败: {bounds_str}")
+            return EMPTY_BOUNDS
+        return tuple(int(value) for value in match.groups())
+
+    def __len__(self) -> int:
+        return len(self.nodes)
+
+    def rows_of_classes(self, classes: Sequence[str]) -> List[int]:
+        """按 classes 顺序拼接各类节点的行号（类内保持文档顺序）"""
+        rows: List[int] = []
+        for node_class in classes:
+            rows += self.by_class.get(node_class, [])
+        return rows
+
+    def rows_of_resource_id(self, resource_id: str) -> List[int]:
+        return self.by_resource_id.get(resource_id, [])
+
+    def has_flag(self, row: int, name: str) -> bool:
+        return bool(self.flags[row] & self._FLAG_BITS[name])
+
+    def bounds_dict(self, row: int) -> Dict[str, int]:
+        left, top, right, bottom = (int(value) for value in self.bounds[row])
+        return {"left": left, "top": top, "right": right, "bottom": bottom}
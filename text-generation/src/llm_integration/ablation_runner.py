@@ -0,0 +1,105 @@
+# src/llm_integration/ablation_runner.py
+"""提示结构消融实验：在单个进程内对多个应用重建 0-5 号提示结构并并发请求，结果按结构写入 t_google_results"""
+import asyncio
+import json
+import logging
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from src.llm_integration.fanout_engine import PromptFanoutEngine
+from src.utils.db_utils import DBUtils
+from src.utils.db_writer import DBWriter
+
+logger = logging.getLogger(__name__)
+
+STATUSES = ("success", "empty", "failed", "skipped")
+
+
+class AblationRunner:
+    """多应用共享同一个扇出引擎（连接池、模型限流器、响应缓存），应用之间并发执行"""
+
+    def __init__(self, llm_config: dict, fanout_config: dict):
+        self.engine = PromptFanoutEngine(llm_config, fanout_config)
+        self.max_parallel_apps: int = fanout_config.get('max_parallel_apps', 4)
+
+    def run(self, app_ids: Optional[List[str]] = None, models: List[str] = None,
+            structures: List[int] = None) -> Dict[str, Dict]:
+        """同步入口，app_ids 为空时处理 t_google_prompts 中的全部应用"""
+        async def _run():
+            try:
+                return await self.run_apps(app_ids, models, structures)
+            finally:
+                await self.engine.client.close()
+
+        return asyncio.run(_run())
+
+    async def run_apps(self, app_ids: Optional[List[str]] = None, models: List[str] = None,
+                       structures: List[int] = None) -> Dict[str, Dict]:
+        if not app_ids:
+            # 先回放上次遗留的写库日志，日志中的子提示也应参与实验
+            await asyncio.to_thread(DBWriter.replay_pending)
+            app_ids = await asyncio.to_thread(DBUtils.select_prompt_app_ids)
+        logger.info(f"🧪 消融实验开始: {len(app_ids)} 个应用 | 同时处理 {self.max_parallel_apps} 个")
+
+        semaphore = asyncio.Semaphore(self.max_parallel_apps)
+
+        async def _run_one(app_id: str):
+            async with semaphore:
+                try:
+                    return app_id, await self.engine.run_app(app_id, models, structures)
+                except RuntimeError as e:
+                    # 数据库异常只影响当前应用
+                    logger.error(f"❌ {app_id} 执行失败: {e}")
+                    return app_id, {"error": str(e)}
+
+        return dict(await asyncio.gather(*(_run_one(app_id) for app_id in app_ids)))
+
+    @staticmethod
+    def summarize(results: Dict[str, Dict]) -> Dict[str, Dict[str, int]]:
+        """按提示结构汇总全部应用的统计"""
+        summary: Dict[str, Dict[str, int]] = {}
+        for stats in results.values():
+            for structure, counts in stats.get("by_structure", {}).items():
+                total = summary.setdefault(str(structure), {status: 0 for status in STATUSES})
+                for status in STATUSES:
+                    total[status] += counts[status]
+        return dict(sorted(summary.items()))
+
+    @staticmethod
+    def save_report(results: Dict[str, Dict], report_dir: str = "output/reports") -> Path:
+        """打印并保存消融实验汇总"""
+        summary = AblationRunner.summarize(results)
+        for structure, counts in summary.items():
+            logger.info(
+                f"\t结构{structure}: {counts['success']} 成功 | {counts['empty']} 无有效结果 | "
+                f"{counts['failed']} 请求失败 | {counts['skipped']} 跳过"
+            )
+        failed_apps = [app_id for app_id, stats in results.items() if "error" in stats]
+        if failed_apps:
+            logger.warning(f"执行失败的应用: {', '.join(failed_apps)}")
+
+        path = Path(report_dir)
+        path.mkdir(parents=True, exist_ok=True)
+        report_path = path / f"ablation_{time.strftime('%Y%m%d_%H%M%S')}.json"
+        with open(report_path, 'w', encoding='utf-8') as f:
+            json.dump({"by_structure": summary, "apps": results}, f, indent=2, ensure_ascii=False)
+        logger.info(f"📄 消融实验报告已保存: {report_path}")
+        return report_path
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from src.utils.logger import setup_logging
+    from src.utils.yaml_utils import YamlUtils
+
+    parser = argparse.ArgumentParser(description="提示结构消融实验")
+    parser.add_argument("app_ids", nargs="*", help="应用包名，默认 t_google_prompts 中的全部应用")
+    parser.add_argument("--models", nargs="*", help="模型列表，默认使用 fanout_config.models")
+    parser.add_argument("--structures", nargs="*", type=int, help="提示结构列表，默认 fanout_config.prompt_structures")
+    args = parser.parse_args()
+
+    setup_logging()
+    runner = AblationRunner(YamlUtils.load_llm_config(), YamlUtils.load_fanout_config())
+    AblationRunner.save_report(runner.run(args.app_ids, args.models, args.structures))
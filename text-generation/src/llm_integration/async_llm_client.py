@@ -0,0 +1,214 @@
+# src/llm_integration/async_llm_client.py
+"""异步LLM客户端：连接池复用、并发上限、超时与指数退避重试"""
+import asyncio
+import json
+import logging
+import random
+import threading
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Callable, Coroutine, Dict, List, Optional, Tuple
+
+import aiohttp
+
+from src.llm_integration.json_extractor import JsonExtractor
+from src.llm_integration.llm_errors import (
+    LLMClientError,
+    LLMRateLimitError,
+    LLMResponseError,
+    LLMServerError,
+    LLMTransportError,
+)
+from src.llm_integration.response_cache import ResponseCache
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncLLMClient:
+    """基于 aiohttp 的LLM客户端，协议: {modelType, sessionId, message} -> {success, data: {chat, id}}"""
+
+    # 决定客户端行为的配置项（model_type 除外：调用方每次请求都会传入）
+    SETTINGS = ("base_url", "api_key", "verify_ssl", "timeout", "connect_timeout", "max_connections",
+                "max_concurrency", "transport_retries", "backoff_base", "backoff_max", "stream", "response_cache")
+
+    def __init__(self, config: dict):
+        self.api_key = config['api_key']
+        self.base_url = config['base_url']
+        self.model_type = config['model_type']
+        self.verify_ssl = config.get('verify_ssl', True)
+
+        self.timeout = config.get('timeout', 30)
+        self.connect_timeout = config.get('connect_timeout', 10)
+        self.max_connections = config.get('max_connections', 20)
+        self.max_concurrency = config.get('max_concurrency', 8)
+        self.transport_retries = config.get('transport_retries', 4)
+        self.backoff_base = config.get('backoff_base', 1.0)
+        self.backoff_max = config.get('backoff_max', 30.0)
+        # 流式模式：增量解析响应，所有组件ID的JSON到齐后提前断开
+        self.stream = config.get('stream', False)
+
+        # 可选的磁盘响应缓存（llm_config.response_cache）
+        self.cache = ResponseCache.from_config(config.get('response_cache'))
+
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    @classmethod
+    def settings_key(cls, config: dict) -> Tuple[str, ...]:
+        """SETTINGS 的可哈希表示：只有全部一致的配置才能共享同一个客户端"""
+        return tuple(json.dumps(config.get(name), sort_keys=True, default=str) for name in cls.SETTINGS)
+
+    async def _get_session(self) -> aiohttp.ClientSession:
+        """延迟创建会话（必须在事件循环内创建）"""
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.max_connections,
+                ssl=bool(self.verify_ssl),
+                keepalive_timeout=60
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=self.timeout, sock_connect=self.connect_timeout),
+                headers={
+                    "Authorization": f"Bearer {self.api_key}",
+                    "Content-Type": "application/json"
+                }
+            )
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._session
+
+    async def chat_completion(self, message: str, session_id: str = "", model_type: Optional[str] = None,
+                              expected_keys: Optional[List[str]] = None, cache_variant: str = "",
+                              accept: Optional[Callable[[Dict], bool]] = None) -> Dict:
+        """发送一次对话请求；429/5xx/网络异常按指数退避重试，最终失败时抛出对应的 LLMError 子类
+
+        流式模式下 expected_keys 为需要生成的组件ID，覆盖全部ID的JSON对象到齐后立即结束读取。
+        启用响应缓存时：cache_variant 参与缓存键（如实验序号 seq）；只有 accept(响应) 为真
+        （即调用方解析通过）时才写入缓存（含拿到完整JSON后提前断开的流式响应），未提供 accept 时不写入。
+        """
+        model_type = model_type or self.model_type
+        if self.cache is not None:
+            cached = self.cache.get(model_type, session_id, message, cache_variant)
+            if cached is not None:
+                return cached
+
+        payload = {
+            "modelType": model_type,
+            "sessionId": session_id,
+            "message": message
+        }
+        if self.stream:
+            payload["stream"] = True
+        session = await self._get_session()
+
+        async with self._semaphore:
+            for attempt in range(1, self.transport_retries + 1):
+                retry_after = None
+                try:
+                    async with session.post(self.base_url, json=payload) as response:
+                        if response.status == 429:
+                            error = LLMRateLimitError(f"HTTP 429: {await response.text()}")
+                            retry_after = response.headers.get("Retry-After")
+                        elif response.status >= 500:
+                            error = LLMServerError(f"HTTP {response.status}: {await response.text()}")
+                            retry_after = response.headers.get("Retry-After")
+                        elif response.status >= 400:
+                            raise LLMClientError(f"HTTP {response.status}: {await response.text()}")
+                        else:
+                            if self.stream and "text/event-stream" in response.headers.get("Content-Type", ""):
+                                result = await self._read_event_stream(response, expected_keys)
+                            else:
+                                result = self._decode_body(await response.text())
+                            # 提前断开的流式响应已包含完整JSON，同样缓存（回放时与完整响应解析结果一致）
+                            if self.cache is not None and accept is not None and accept(result):
+                                self.cache.put(model_type, session_id, message, result, cache_variant)
+                            return result
+                except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                    error = LLMTransportError(f"{type(e).__name__}: {e}")
+
+                if attempt == self.transport_retries:
+                    raise error
+
+                delay = self._retry_delay(attempt, retry_after)
+                logger.warning(f"\t🔁 {type(error).__name__}，{delay:.1f}s 后重试 ({attempt}/{self.transport_retries}): {error}")
+                await asyncio.sleep(delay)
+
+    @staticmethod
+    def _decode_body(body: str) -> Dict:
+        try:
+            return json.loads(body)
+        except json.JSONDecodeError as e:
+            raise LLMResponseError(f"响应不是合法JSON: {e}") from e
+
+    @staticmethod
+    async def _read_event_stream(response: aiohttp.ClientResponse,
+                                 expected_keys: Optional[List[str]]) -> Dict:
+        """读取SSE响应并拼接为普通响应格式
+
+        每个事件为 data: {"chat": 增量文本, "id": 会话ID}，以 data: [DONE] 结束；
+        事件中 success 为 false 时直接返回该事件。
+        """
+        extractor = JsonExtractor(expected_keys or ())
+        parts: List[str] = []
+        session_id = ""
+        async for raw_line in response.content:
+            line = raw_line.decode("utf-8").strip()
+            if not line.startswith("data:"):
+                continue
+            data = line[len("data:"):].strip()
+            if data == "[DONE]":
+                break
+            event = AsyncLLMClient._decode_body(data)
+            if not event.get("success", True):
+                return event
+            session_id = event.get("id") or session_id
+            delta = event.get("chat", "")
+            parts.append(delta)
+            extractor.feed(delta)
+            if extractor.complete:
+                # 后续多为解释性文字，断开连接不再等待
+                logger.debug(f"\t✂️ 已收到完整JSON，提前结束流式响应（{sum(map(len, parts))} 字符）")
+                response.close()
+                break
+        return {"success": True, "data": {"chat": "".join(parts), "id": session_id}}
+
+    def _retry_delay(self, attempt: int, retry_after: Optional[str]) -> float:
+        """优先使用 Retry-After，否则为带抖动的指数退避（full jitter）"""
+        if retry_after:
+            try:
+                return min(float(retry_after), self.backoff_max)
+            except ValueError:
+                try:
+                    retry_at = parsedate_to_datetime(retry_after)
+                    return min(max((retry_at - datetime.now(timezone.utc)).total_seconds(), 0.0), self.backoff_max)
+                except (TypeError, ValueError):
+                    pass
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** (attempt - 1)))
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        if self.cache is not None:
+            self.cache.close()
+
+
+class BackgroundLoop:
+    """后台事件循环线程，为同步调用方提供长期存活的连接池"""
+
+    _loop: Optional[asyncio.AbstractEventLoop] = None
+    _lock = threading.Lock()
+
+    @classmethod
+    def get_loop(cls) -> asyncio.AbstractEventLoop:
+        if cls._loop is None:
+            with cls._lock:
+                if cls._loop is None:
+                    loop = asyncio.new_event_loop()
+                    threading.Thread(target=loop.run_forever, name="llm-event-loop", daemon=True).start()
+                    cls._loop = loop
+        return cls._loop
+
+    @classmethod
+    def run(cls, coro: Coroutine):
+        """在后台循环中执行协程并阻塞等待结果"""
+        return asyncio.run_coroutine_threadsafe(coro, cls.get_loop()).result()
@@ -0,0 +1,227 @@
+# src/llm_integration/fanout_engine.py
+"""多模型提示并发扇出引擎：对已存储的提示并发执行 模型 × 提示结构 × 序号 全部组合"""
+import asyncio
+import json
+import logging
+import re
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from src.llm_integration.async_llm_client import AsyncLLMClient
+from src.llm_integration.llm_errors import LLMError
+from src.llm_integration.prompt_generator import PromptEngine
+from src.llm_integration.text_input_extractor import TextInputExtractor
+from src.llm_integration.token_counter import TokenCounter
+from src.utils.db_utils import DBUtils
+from src.utils.db_writer import DBWriter
+from src.utils.yaml_utils import YamlUtils
+
+logger = logging.getLogger(__name__)
+
+
+class ModelRateLimiter:
+    """单个模型的并发数与请求速率限制"""
+
+    def __init__(self, max_concurrency: int, requests_per_minute: Optional[float] = None):
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._interval = 60.0 / requests_per_minute if requests_per_minute else 0.0
+        self._next_slot = 0.0
+        self._lock = asyncio.Lock()
+
+    async def __aenter__(self):
+        await self._semaphore.acquire()
+        if self._interval:
+            # 按固定间隔分配请求发出时间
+            async with self._lock:
+                now = asyncio.get_running_loop().time()
+                wait = self._next_slot - now
+                self._next_slot = max(now, self._next_slot) + self._interval
+            if wait > 0:
+                await asyncio.sleep(wait)
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self._semaphore.release()
+
+
+class PromptFanoutEngine:
+    """读取 t_google_prompts 中的子提示，跳过 t_google_results 中已有的组合，其余组合并发请求"""
+
+    def __init__(self, llm_config: dict, fanout_config: dict):
+        self.llm_config = llm_config
+        self.models: List[str] = fanout_config.get('models') or [llm_config['model_type']]
+        self.prompt_structures: List[int] = fanout_config.get('prompt_structures', [0, 1, 2, 3, 4, 5])
+        self.seq_count: int = fanout_config.get('seq_count', 3)
+        self.xml_dir = Path(fanout_config.get('xml_dir', 'output/xml_dumps'))
+        self.rate_limits: Dict[str, dict] = fanout_config.get('rate_limits', {})
+        self.max_retries: int = llm_config.get('max_retries', 5)
+
+        budget = YamlUtils.load_prompt_budget_config()
+        self.token_counter = TokenCounter.from_config(budget)
+        self.max_prompt_tokens: Optional[int] = budget.get('max_prompt_tokens')
+
+        self.client = AsyncLLMClient(llm_config)
+        self._limiters: Dict[str, ModelRateLimiter] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def _bind_loop(self):
+        """客户端（连接池、响应缓存）与限流器绑定到当前事件循环；换用新的事件循环时重新创建"""
+        loop = asyncio.get_running_loop()
+        if self._loop is loop:
+            return
+        if self._loop is not None:
+            # 上一次 run() 已关闭客户端，其信号量与锁也属于已关闭的事件循环
+            self.client = AsyncLLMClient(self.llm_config)
+            self._limiters = {}
+        self._loop = loop
+
+    def run(self, app_id: str, models: List[str] = None, structures: List[int] = None) -> Dict:
+        """同步入口（每次调用使用新的事件循环，可重复调用）"""
+        async def _run():
+            try:
+                return await self.run_app(app_id, models, structures)
+            finally:
+                await self.client.close()
+
+        return asyncio.run(_run())
+
+    async def run_app(self, app_id: str, models: List[str] = None, structures: List[int] = None) -> Dict:
+        """执行单个应用的全部缺失组合，返回统计 {total, skipped, success, empty, failed, by_structure}"""
+        models = models or self.models
+        structures = self.prompt_structures if structures is None else structures
+        self._bind_loop()
+
+        # 先回放上次遗留的写库日志，续跑时提示与已有结果才完整
+        await asyncio.to_thread(DBWriter.replay_pending)
+        prompts = await asyncio.to_thread(DBUtils.select_prompt, app_id)
+        if prompts is None:
+            logger.error(f"未找到 {app_id} 对应的提示，请检查 t_google_prompts")
+            return {"total": 0, "skipped": 0, "success": 0, "empty": 0, "failed": 0, "by_structure": {}}
+
+        existing = await asyncio.to_thread(DBUtils.select_result_keys, app_id)
+        component_ids = self.extract_component_ids(prompts["restrictive"])
+        logger.info(f"📚 {app_id} 提示加载完成 | 组件: {component_ids} | 已有结果 {len(existing)} 条")
+
+        hierarchy_xml = self._read_hierarchy_xml(app_id) if PromptEngine.XML_STRUCTURE in structures else None
+        structure_prompts = {}
+        for structure in structures:
+            prompt = PromptEngine.build_structured_prompt(
+                prompts, structure, hierarchy_xml, self.max_prompt_tokens, self.token_counter
+            )
+            if prompt is None:
+                logger.warning(f"构建 {app_id} 的prompt异常, promptStructure={structure}")
+                continue
+            structure_prompts[structure] = prompt
+
+        stats = {"total": 0, "skipped": 0, "success": 0, "empty": 0, "failed": 0}
+        # 按提示结构分组的统计（消融实验汇总用）
+        by_structure = {structure: {"skipped": 0, "success": 0, "empty": 0, "failed": 0}
+                        for structure in structure_prompts}
+        tasks, task_structures = [], []
+        for model in models:
+            for structure, prompt in structure_prompts.items():
+                for seq in range(1, self.seq_count + 1):
+                    stats["total"] += 1
+                    if (model, structure, seq) in existing:
+                        stats["skipped"] += 1
+                        by_structure[structure]["skipped"] += 1
+                        continue
+                    tasks.append(self._run_combination(app_id, model, structure, seq, prompt, component_ids))
+                    task_structures.append(structure)
+
+        logger.info(f"🚀 {app_id} 并发执行 {len(tasks)} 个组合（跳过已有 {stats['skipped']} 个）")
+        for structure, status in zip(task_structures, await asyncio.gather(*tasks)):
+            stats[status] += 1
+            by_structure[structure][status] += 1
+        stats["by_structure"] = by_structure
+
+        logger.info(
+            f"✅ {app_id} 完成: {stats['success']} 成功 | {stats['empty']} 无有效结果 | "
+            f"{stats['failed']} 请求失败 | {stats['skipped']} 跳过"
+        )
+        return stats
+
+    async def _run_combination(self, app_id: str, model: str, structure: int, seq: int, prompt: str,
+                               component_ids: List[str]) -> str:
+        """执行单个组合并写库，返回 success / empty / failed"""
+        try:
+            parsed = await self._extract_test_input(app_id, model, seq, prompt, component_ids)
+        except LLMError as e:
+            # 请求层失败不写库，下次运行会重新执行该组合
+            logger.error(f"🔌 {app_id} | {model} | 结构{structure} | 第{seq}次 请求失败 [{type(e).__name__}]: {e}")
+            return "failed"
+
+        await asyncio.to_thread(DBWriter.target().save_result_value, app_id, model, seq, None, structure, parsed or {})
+        logger.info(f"\t💾 {app_id} | {model} | 结构{structure} | 第{seq}次 {'已写入' if parsed else '无有效结果'}")
+        return "success" if parsed else "empty"
+
+    async def _extract_test_input(self, app_id: str, model: str, seq: int, prompt: str,
+                                  component_ids: List[str]) -> Dict:
+        """与 ChatProcessor.extractTestInput 一致：解析失败时以新会话重发原始提示
+
+        缓存键包含 seq，各次实验独立采样；只缓存解析通过的答案，重试不会回放失败的答案。
+        """
+        parser = TextInputExtractor.for_components(component_ids, app_id, max_retries=self.max_retries)
+        accept = parser.accepts()
+        for attempt in range(1, self.max_retries + 1):
+            async with self._get_limiter(model):
+                response = await self.client.chat_completion(prompt, session_id="", model_type=model,
+                                                             expected_keys=component_ids,
+                                                             cache_variant=f"seq={seq}", accept=accept)
+            _, parsed = parser.parse_response(response)
+            if parsed:
+                return parsed
+            logger.debug(f"\t{model} 解析结果不满足条件 (第{attempt}/{self.max_retries}次尝试)")
+        return {}
+
+    def _get_limiter(self, model: str) -> ModelRateLimiter:
+        if model not in self._limiters:
+            limits = {**self.rate_limits.get('default', {}), **self.rate_limits.get(model, {})}
+            self._limiters[model] = ModelRateLimiter(
+                max_concurrency=limits.get('max_concurrency', 4),
+                requests_per_minute=limits.get('requests_per_minute')
+            )
+        return self._limiters[model]
+
+    def _read_hierarchy_xml(self, app_id: str) -> Optional[str]:
+        xml_path = self.xml_dir / f"hierarchy_{app_id}.xml"
+        if not xml_path.exists():
+            logger.warning(f"{xml_path} 文件不存在")
+            return None
+        return xml_path.read_text(encoding="utf-8")
+
+    @staticmethod
+    def extract_component_ids(restrictive_prompt: str) -> List[str]:
+        """从限制性提示的JSON示例中提取组件ID"""
+        match = re.search(r"```json\s*(\{.*?})\s*```", restrictive_prompt, re.DOTALL)
+        if not match:
+            return []
+        try:
+            return list(json.loads(match.group(1)).keys())
+        except json.JSONDecodeError as e:
+            logger.error(f"组件ID解析失败: {e}")
+            return []
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from src.utils.logger import setup_logging
+
+    parser = argparse.ArgumentParser(description="多模型提示并发扇出")
+    parser.add_argument("app_ids", nargs="+", help="应用包名")
+    parser.add_argument("--models", nargs="*", help="模型列表，默认使用 fanout_config.models")
+    parser.add_argument("--structures", nargs="*", type=int, help="提示结构列表，默认 0-5")
+    args = parser.parse_args()
+
+    setup_logging()
+    engine = PromptFanoutEngine(YamlUtils.load_llm_config(), YamlUtils.load_fanout_config())
+
+    async def _run_all():
+        try:
+            for target_app in args.app_ids:
+                await engine.run_app(target_app, args.models, args.structures)
+        finally:
+            await engine.client.close()
+
+    asyncio.run(_run_all())
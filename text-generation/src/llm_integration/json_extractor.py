@@ -0,0 +1,171 @@
+# src/llm_integration/json_extractor.py
+"""容错JSON提取：单遍扫描LLM响应中的顶层JSON对象，修复常见语法问题，选出包含期望组件ID最多的对象"""
+import json
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+_SMART_QUOTES = str.maketrans({"“": '"', "”": '"', "‘": "'", "’": "'"})
+_PY_LITERALS = {"True": "true", "False": "false", "None": "null"}
+
+
+def repair_json(text: str) -> Optional[Dict]:
+    """解析JSON对象，失败时修复尾逗号、单引号、注释、中文引号与Python字面量后重试"""
+    for candidate in (text, _normalize(text), _normalize(text.translate(_SMART_QUOTES))):
+        try:
+            value = json.loads(candidate)
+        except json.JSONDecodeError:
+            continue
+        return value if isinstance(value, dict) else None
+    return None
+
+
+def _normalize(text: str) -> str:
+    """按字符扫描（感知字符串边界）：单引号字符串转双引号，删除注释与尾逗号，替换Python字面量"""
+    out: List[str] = []
+    i, n = 0, len(text)
+    while i < n:
+        ch = text[i]
+        if ch in "\"'":
+            # 复制整个字符串，单引号字符串转为双引号
+            j, chars = i + 1, []
+            while j < n and text[j] != ch:
+                if text[j] == "\\" and j + 1 < n:
+                    chars.append(text[j:j + 2])
+                    j += 2
+                    continue
+                chars.append('\\"' if ch == "'" and text[j] == '"' else text[j])
+                j += 1
+            body = "".join(chars)
+            if ch == "'":
+                body = body.replace("\\'", "'")
+            out.append(f'"{body}"')
+            i = j + 1
+        elif text.startswith("//", i):
+            i = text.find("\n", i)
+            i = n if i < 0 else i
+        elif text.startswith("/*", i):
+            end = text.find("*/", i + 2)
+            i = n if end < 0 else end + 2
+        elif ch == ",":
+            j = i + 1
+            while j < n and text[j].isspace():
+                j += 1
+            if j >= n or text[j] not in "}]":
+                out.append(ch)
+            i += 1
+        elif ch.isalpha():
+            j = i
+            while j < n and (text[j].isalnum() or text[j] == "_"):
+                j += 1
+            word = text[i:j]
+            out.append(_PY_LITERALS.get(word, word))
+            i = j
+        else:
+            out.append(ch)
+            i += 1
+    return "".join(out)
+
+
+class JsonExtractor:
+    """可增量喂入的顶层JSON对象扫描器
+
+    feed() 接收流式响应片段，扫描状态跨片段保留，已扫描的文本不会重复扫描；
+    对象闭合时立即解析并按期望键覆盖数打分（平分时代码块内优先、先出现者优先）。
+    """
+
+    def __init__(self, expected_keys: Iterable[str] = ()):
+        self.expected_keys = list(expected_keys)
+        self._text = ""
+        self._pos = 0
+        self._depth = 0
+        self._start = -1
+        self._quote: Optional[str] = None
+        self._escape = False
+        self._fence_count = 0
+        self._start_fenced = False
+        self._best: Optional[Tuple[Tuple[int, int], Dict]] = None
+
+    @classmethod
+    def extract(cls, text: str, expected_keys: Iterable[str] = ()) -> Optional[Dict]:
+        """一次性提取完整响应中的最佳JSON对象，找不到时返回 None"""
+        extractor = cls(expected_keys)
+        extractor.feed(text)
+        return extractor.result
+
+    @property
+    def result(self) -> Optional[Dict]:
+        return self._best[1] if self._best else None
+
+    @property
+    def complete(self) -> bool:
+        """已找到包含全部期望键的对象（流式场景可据此提前结束）"""
+        return self._best is not None and self._best[0][0] == len(self.expected_keys) and bool(self.expected_keys)
+
+    def missing_keys(self) -> List[str]:
+        found = self.result or {}
+        return [key for key in self.expected_keys if key not in found]
+
+    def feed(self, chunk: str) -> Optional[Dict]:
+        """追加一段响应文本，返回当前最佳对象"""
+        self._text += chunk
+        text, n = self._text, len(self._text)
+        i = self._pos
+        while i < n:
+            ch = text[i]
+            if self._depth == 0:
+                if ch == "`":
+                    if i + 3 > n:
+                        break  # 可能是被截断的代码块标记，等待下一片段
+                    if text.startswith("```", i):
+                        self._fence_count += 1
+                        i += 3
+                        continue
+                elif ch == "{":
+                    self._depth, self._start = 1, i
+                    self._start_fenced = self._fence_count % 2 == 1
+            elif self._quote:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == self._quote:
+                    self._quote = None
+                elif ch == "\n":
+                    # JSON字符串不能跨行：该 "{" 只是正文中的普通字符，从其后一位重新扫描
+                    i = self._abandon()
+                    continue
+            elif ch == "`" and text.startswith("```", i):
+                i = self._abandon()
+                continue
+            elif ch in "\"'":
+                self._quote = ch
+            elif ch == "{":
+                self._depth += 1
+            elif ch == "}":
+                self._depth -= 1
+                if self._depth == 0:
+                    self._consider(text[self._start:i + 1])
+            i += 1
+        self._pos = i
+        return self.result
+
+    def _abandon(self) -> int:
+        """放弃当前候选对象，返回重新扫描的位置"""
+        restart = self._start + 1
+        self._depth, self._start, self._quote, self._escape = 0, -1, None, False
+        return restart
+
+    def _consider(self, candidate: str):
+        parsed = repair_json(candidate)
+        if parsed is None:
+            logger.debug(f"跳过无法修复的JSON片段: {candidate[:80]}")
+            return
+        coverage = sum(1 for key in self.expected_keys if key in parsed)
+        if self.expected_keys and coverage == 0:
+            return
+        score = (coverage, 1 if self._start_fenced else 0)
+        if self._best is None or score > self._best[0]:
+            self._best = (score, parsed)
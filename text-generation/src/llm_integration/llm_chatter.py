@@ -1,17 +1,20 @@
 # src/llm_integration/llm_chatter.py
 import logging
-from typing import Dict
-
-import requests
-import urllib3
-
-# 禁用特定警告
+import threading
+from typing import Callable, Dict, List, Optional, Tuple
 
+from src.llm_integration.async_llm_client import AsyncLLMClient, BackgroundLoop
 
 logger = logging.getLogger(__name__)
 
 
 class LLMChatter:
+    """同步LLM对话接口（内部委托给共享的 AsyncLLMClient）"""
+
+    # 客户端配置（AsyncLLMClient.SETTINGS）完全相同的 LLMChatter 共享同一个客户端（连接池）
+    _clients: Dict[Tuple, AsyncLLMClient] = {}
+    _clients_lock = threading.Lock()
+
     def __init__(self, config: dict):
         self.api_key = config['api_key']
         self.base_url = config['base_url']
@@ -19,30 +22,24 @@ class LLMChatter:
         self.max_retries = config['max_retries']
         self.verify_ssl = config.get('verify_ssl', True)
 
-        self.session = requests.Session()
-        self.session.headers.update({
-            "Authorization": f"Bearer {self.api_key}",
-            "Content-Type": "application/json"
-        })
-
-        urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
-
-    def chat_completion(self, message: str, session_id: str = "") -> Dict:
-        payload = {
-            "modelType": self.model_type,
-            "sessionId": session_id,
-            "message": message
-        }
-
-        try:
-            response = self.session.post(
-                self.base_url,
-                json=payload,
-                timeout=30,
-                verify=self.verify_ssl
-            )
-            response.raise_for_status()
-            return response.json()
-
-        except requests.exceptions.RequestException as e:
-            return {}
+        self.client = self._get_client(config)
+
+    @classmethod
+    def _get_client(cls, config: dict) -> AsyncLLMClient:
+        key = AsyncLLMClient.settings_key(config)
+        with cls._clients_lock:
+            if key not in cls._clients:
+                cls._clients[key] = AsyncLLMClient(config)
+            return cls._clients[key]
+
+    def chat_completion(self, message: str, session_id: str = "", expected_keys: Optional[List[str]] = None,
+                        cache_variant: str = "", accept: Optional[Callable[[Dict], bool]] = None) -> Dict:
+        """发送对话请求，最终失败时抛出 LLMError 子类（网络/限流/服务端/响应格式）
+
+        expected_keys 为需要生成的组件ID，流式模式下用于提前结束读取；
+        cache_variant / accept 见 AsyncLLMClient.chat_completion（响应缓存键与写入判定）。
+        """
+        return BackgroundLoop.run(
+            self.client.chat_completion(message, session_id=session_id, model_type=self.model_type,
+                                        expected_keys=expected_keys, cache_variant=cache_variant, accept=accept)
+        )
@@ -0,0 +1,30 @@
+# src/llm_integration/llm_errors.py
+"""LLM调用异常类型"""
+
+
+class LLMError(Exception):
+    """LLM调用异常基类"""
+
+
+class LLMTransportError(LLMError):
+    """网络层异常（连接失败、超时），重试后仍失败"""
+
+
+class LLMRateLimitError(LLMError):
+    """429 限流，重试后仍失败"""
+
+
+class LLMServerError(LLMError):
+    """5xx 服务端异常，重试后仍失败"""
+
+
+class LLMClientError(LLMError):
+    """4xx 请求错误（不重试）"""
+
+
+class LLMResponseError(LLMError):
+    """响应体不是合法JSON"""
+
+
+class LLMCacheMissError(LLMError):
+    """仅回放模式下缓存未命中"""
@@ -0,0 +1,153 @@
+# src/llm_integration/load_tester.py
+"""LLM对话协议压测：并发驱动 TextInputExtractor.extract_test_input，统计吞吐、延迟与重试"""
+import json
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from src.llm_integration.async_llm_client import BackgroundLoop
+from src.llm_integration.llm_chatter import LLMChatter
+from src.llm_integration.llm_errors import LLMError
+from src.llm_integration.prompt_templates import example_json
+from src.llm_integration.text_input_extractor import TextInputExtractor
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class LoadTester:
+    """以 concurrency 个工作线程执行 total_tasks 次完整的“首轮请求 + 解析重试”流程"""
+
+    def __init__(self, llm_config: dict, component_ids: List[str], package_name: str = "com.example.loadtest"):
+        self.llm_config = llm_config
+        self.component_ids = component_ids
+        self.package_name = package_name
+        self.chatter = LLMChatter(llm_config)
+
+    def build_prompt(self) -> str:
+        return ("Generate valid text inputs for the EditText components below.\n"
+                f"```json\n{example_json(self.component_ids)}\n```")
+
+    def _run_task(self, task_id: int) -> Dict:
+        prompt = self.build_prompt()
+        extractor = TextInputExtractor.for_components(
+            self.component_ids, self.package_name, self.chatter, self.llm_config.get('max_retries', 5)
+        )
+        start = time.perf_counter()
+        try:
+            initial_response = self.chatter.chat_completion(prompt, expected_keys=self.component_ids)
+            _, parsed = extractor.extract_test_input(initial_response, prompt)
+            status = "success" if parsed else "exhausted"
+        except LLMError as e:
+            logger.debug(f"任务 {task_id} 首轮请求失败 [{type(e).__name__}]: {e}")
+            status = "transport_failed"
+        return {"task": task_id, "status": status, "latency": time.perf_counter() - start}
+
+    def run(self, total_tasks: int, concurrency: int) -> Dict:
+        """执行压测并返回汇总"""
+        logger.info(f"🚀 压测开始: {total_tasks} 个任务 | 并发 {concurrency} | 目标 {self.llm_config['base_url']}")
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="load-test") as executor:
+            results = list(executor.map(self._run_task, range(total_tasks)))
+        elapsed = time.perf_counter() - start
+        return self.summarize(results, elapsed, concurrency)
+
+    @staticmethod
+    def summarize(results: List[Dict], elapsed: float, concurrency: int) -> Dict:
+        latencies = sorted(r["latency"] for r in results)
+
+        def percentile(p: float) -> float:
+            if not latencies:
+                return 0.0
+            return latencies[min(len(latencies) - 1, int(round(p / 100 * (len(latencies) - 1))))]
+
+        counts = {status: sum(1 for r in results if r["status"] == status)
+                  for status in ("success", "exhausted", "transport_failed")}
+        return {
+            "tasks": len(results),
+            "concurrency": concurrency,
+            "elapsed_seconds": round(elapsed, 3),
+            "throughput_per_second": round(len(results) / elapsed, 2) if elapsed else 0.0,
+            **counts,
+            "latency_seconds": {
+                "mean": round(statistics.fmean(latencies), 4) if latencies else 0.0,
+                "p50": round(percentile(50), 4),
+                "p95": round(percentile(95), 4),
+                "p99": round(percentile(99), 4),
+                "max": round(latencies[-1], 4) if latencies else 0.0
+            }
+        }
+
+    @staticmethod
+    def save_report(summary: Dict, report_dir: str = "output/reports") -> Path:
+        """打印并保存压测汇总"""
+        latency = summary["latency_seconds"]
+        logger.info(
+            f"压测完成: {summary['success']} 成功 | {summary['exhausted']} 重试用尽 | "
+            f"{summary['transport_failed']} 请求失败 | 吞吐 {summary['throughput_per_second']}/s | "
+            f"p50 {latency['p50']}s p95 {latency['p95']}s p99 {latency['p99']}s"
+        )
+        if "server" in summary:
+            server = summary["server"]
+            logger.info(
+                f"\t服务端: {server['requests']} 次请求 | 429 {server['http_429']} | 500 {server['http_500']} | "
+                f"格式错误 {server['malformed']} | 会话 {server['sessions']} | "
+                f"每任务请求 {summary['requests_per_task']}"
+            )
+
+        path = Path(report_dir)
+        path.mkdir(parents=True, exist_ok=True)
+        report_path = path / f"load_test_{time.strftime('%Y%m%d_%H%M%S')}.json"
+        with open(report_path, 'w', encoding='utf-8') as f:
+            json.dump(summary, f, indent=2, ensure_ascii=False)
+        logger.info(f"📄 压测报告已保存: {report_path}")
+        return report_path
+
+
+def run_against_mock(scenario: Optional[dict], llm_config: dict, component_ids: List[str],
+                     total_tasks: int, concurrency: int) -> Dict:
+    """启动进程内模拟服务并压测，汇总中附带服务端统计（请求数 / 注入错误 / 格式错误）"""
+    from src.llm_integration.mock_llm_server import MockLLMServer
+
+    with MockLLMServer(scenario) as server:
+        config = {**llm_config, 'base_url': server.url, 'response_cache': None}
+        tester = LoadTester(config, component_ids)
+        try:
+            summary = tester.run(total_tasks, concurrency)
+        finally:
+            # 模拟服务端口随用随弃，关闭对应的连接池
+            BackgroundLoop.run(tester.chatter.client.close())
+        summary["server"] = server.snapshot_stats()
+        # 平均每个任务产生的HTTP请求数，反映传输重试与解析重试的放大倍数
+        summary["requests_per_task"] = round(summary["server"]["requests"] / max(total_tasks, 1), 3)
+        summary["scenario"] = server.scenario
+    return summary
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from src.utils.config_registry import ConfigRegistry
+    from src.utils.logger import setup_logging
+    from src.utils.yaml_utils import YamlUtils
+
+    parser = argparse.ArgumentParser(description="LLM对话协议压测")
+    parser.add_argument("--tasks", type=int, default=200, help="任务总数")
+    parser.add_argument("--concurrency", type=int, default=16, help="并发线程数")
+    parser.add_argument("--components", type=int, default=3, help="每个提示的组件数")
+    parser.add_argument("--scenario", help="模拟服务场景YAML（键同 mock_llm_server.DEFAULT_SCENARIO）")
+    parser.add_argument("--live", action="store_true", help="直接压测 llm_config.base_url，不启动模拟服务")
+    args = parser.parse_args()
+
+    setup_logging()
+    base_config = YamlUtils.load_llm_config()
+    ids = [f"com.example.loadtest:id/input_{i}" for i in range(args.components)]
+
+    if args.live:
+        result = LoadTester(base_config, ids).run(args.tasks, args.concurrency)
+    else:
+        mock_scenario = ConfigRegistry.parse_file(Path(args.scenario)) if args.scenario else None
+        result = run_against_mock(mock_scenario, base_config, ids, args.tasks, args.concurrency)
+    LoadTester.save_report(result)
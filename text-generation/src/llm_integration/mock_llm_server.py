@@ -0,0 +1,267 @@
+# src/llm_integration/mock_llm_server.py
+"""本地模拟LLM服务：实现 {modelType, sessionId, message} -> {success, data: {chat, id}} 协议，行为可脚本化"""
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+DEFAULT_SCENARIO = {
+    # 组件ID -> 固定答案，未列出的组件使用 default_answer
+    "answers": {},
+    "default_answer": "mock_value",
+    # 返回格式错误代码块的概率，类型从 malformed_kinds 中随机选择
+    "malformed_rate": 0.0,
+    "malformed_kinds": ["no_fence", "unclosed_fence", "trailing_comma", "missing_component"],
+    # 响应延迟（秒）: fixed {value} / uniform {min, max} / lognormal {mu, sigma}
+    "latency": {"type": "fixed", "value": 0.0},
+    # 错误注入概率及 429 的 Retry-After（秒，None 表示不返回该头）
+    "rate_429": 0.0,
+    "rate_500": 0.0,
+    "retry_after": None,
+    # 为 True 时未知的 sessionId 返回 success=false
+    "strict_sessions": False,
+    # 答案后追加的解释文字长度（字符），模拟 GuiP 要求的分步说明
+    "explanation_chars": 0,
+    # 流式请求（payload.stream=true）按 SSE 分片返回：每片字符数与片间间隔（秒）
+    "stream_chunk_size": 16,
+    "stream_chunk_delay": 0.0,
+    "seed": None
+}
+
+
+class MockLLMServer:
+    """基于 ThreadingHTTPServer 的模拟服务，可在后台线程中运行
+
+    回答按提示中 ```json 示例的键（组件ID）生成；非空 sessionId 延续已有会话，
+    GET /stats 返回请求统计。
+    """
+
+    def __init__(self, scenario: Optional[dict] = None, host: str = "127.0.0.1", port: int = 0):
+        self.scenario = {**DEFAULT_SCENARIO, **(scenario or {})}
+        self._random = random.Random(self.scenario["seed"])
+        self._lock = threading.Lock()
+        self.sessions: Dict[str, List[str]] = {}
+        self.stats = {"requests": 0, "ok": 0, "malformed": 0, "http_429": 0, "http_500": 0,
+                      "unknown_session": 0, "sessions": 0,
+                      "streams": 0, "stream_cancelled": 0}
+
+        self._httpd = ThreadingHTTPServer((host, port), self._make_handler())
+        self._httpd.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/"
+
+    def start(self) -> "MockLLMServer":
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="mock-llm-server", daemon=True)
+        self._thread.start()
+        logger.info(f"🧪 模拟LLM服务已启动: {self.url}")
+        return self
+
+    def serve_forever(self):
+        """在当前线程中运行，直到 KeyboardInterrupt"""
+        try:
+            self._httpd.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self._httpd.server_close()
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+    def snapshot_stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self.stats)
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                if self.path.rstrip("/") == "/stats":
+                    self._send_json(200, server.snapshot_stats())
+                else:
+                    self._send_json(404, {"error": "not found"})
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                try:
+                    payload = json.loads(self.rfile.read(length) or b"{}")
+                except json.JSONDecodeError:
+                    self._send_json(400, {"error": "invalid json"})
+                    return
+                status, body, headers = server.handle_chat(payload)
+                if payload.get("stream") and status == 200 and body.get("success"):
+                    self._send_stream(body["data"])
+                else:
+                    self._send_json(status, body, headers)
+
+            def _send_stream(self, data: dict):
+                """以 SSE 分片发送 chat，客户端提前断开时计入 stream_cancelled"""
+                server._count("streams")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Cache-Control", "no-cache")
+                self.send_header("Connection", "close")
+                self.end_headers()
+                self.close_connection = True
+
+                chat, size = data["chat"], max(1, server.scenario["stream_chunk_size"])
+                try:
+                    for offset in range(0, len(chat), size):
+                        event = {"success": True, "chat": chat[offset:offset + size], "id": data["id"]}
+                        self.wfile.write(f"data: {json.dumps(event, ensure_ascii=False)}\n\n".encode("utf-8"))
+                        self.wfile.flush()
+                        if server.scenario["stream_chunk_delay"]:
+                            time.sleep(server.scenario["stream_chunk_delay"])
+                    self.wfile.write(b"data: [DONE]\n\n")
+                    self.wfile.flush()
+                except (BrokenPipeError, ConnectionResetError):
+                    server._count("stream_cancelled")
+
+            def _send_json(self, status: int, body, headers: Optional[dict] = None):
+                data = json.dumps(body, ensure_ascii=False).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                for key, value in (headers or {}).items():
+                    self.send_header(key, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                logger.debug(f"mock-llm {self.address_string()} {format % args}")
+
+        return Handler
+
+    def handle_chat(self, payload: dict):
+        """处理一次对话请求，返回 (HTTP状态码, 响应体, 额外响应头)"""
+        scenario = self.scenario
+        with self._lock:
+            self.stats["requests"] += 1
+            roll_429, roll_500, roll_malformed = (self._random.random() for _ in range(3))
+            delay = self._sample_latency()
+
+        if delay > 0:
+            time.sleep(delay)
+
+        if roll_429 < scenario["rate_429"]:
+            self._count("http_429")
+            headers = {"Retry-After": str(scenario["retry_after"])} if scenario["retry_after"] is not None else {}
+            return 429, {"error": "rate limited"}, headers
+        if roll_500 < scenario["rate_500"]:
+            self._count("http_500")
+            return 500, {"error": "injected server error"}, {}
+
+        session_id = payload.get("sessionId") or ""
+        message = payload.get("message", "")
+        with self._lock:
+            if not session_id:
+                session_id = uuid.uuid4().hex
+                self.sessions[session_id] = []
+                self.stats["sessions"] += 1
+            elif session_id not in self.sessions:
+                self.stats["unknown_session"] += 1
+                if scenario["strict_sessions"]:
+                    return 200, {"success": False, "data": None, "message": "unknown session"}, {}
+                self.sessions[session_id] = []
+            self.sessions[session_id].append(message)
+
+        component_ids = self.extract_component_ids(message)
+        answer = {rid: scenario["answers"].get(rid, scenario["default_answer"]) for rid in component_ids}
+        if roll_malformed < scenario["malformed_rate"]:
+            self._count("malformed")
+            with self._lock:
+                kind = self._random.choice(scenario["malformed_kinds"])
+            chat = self.render_malformed(answer, kind)
+        else:
+            self._count("ok")
+            chat = self.render_answer(answer)
+        if scenario["explanation_chars"]:
+            filler = "The value follows the hint text and the adjacent labels. "
+            repeat = scenario["explanation_chars"] // len(filler) + 1
+            chat += "\n### Explanation:\n" + (filler * repeat)[:scenario["explanation_chars"]]
+        return 200, {"success": True, "data": {"chat": chat, "id": session_id}}, {}
+
+    def _count(self, key: str):
+        with self._lock:
+            self.stats[key] += 1
+
+    def _sample_latency(self) -> float:
+        latency = self.scenario["latency"]
+        kind = latency.get("type", "fixed")
+        if kind == "uniform":
+            return self._random.uniform(latency.get("min", 0.0), latency.get("max", 0.0))
+        if kind == "lognormal":
+            return self._random.lognormvariate(latency.get("mu", -3.0), latency.get("sigma", 0.5))
+        return latency.get("value", 0.0)
+
+    @staticmethod
+    def extract_component_ids(message: str) -> List[str]:
+        """取提示中最后一个 ```json 示例的键作为组件ID"""
+        blocks = re.findall(r"```json\s*(\{.*?})\s*```", message, re.DOTALL)
+        for block in reversed(blocks):
+            try:
+                return list(json.loads(block).keys())
+            except json.JSONDecodeError:
+                continue
+        return []
+
+    @staticmethod
+    def render_answer(answer: Dict[str, str]) -> str:
+        return f"Here is the generated input:\n\n```json\n{json.dumps(answer, indent=2)}\n```\n"
+
+    @staticmethod
+    def render_malformed(answer: Dict[str, str], kind: str) -> str:
+        body = json.dumps(answer, indent=2)
+        if kind == "no_fence":
+            return f"Generated input: {body}"
+        if kind == "unclosed_fence":
+            return f"Here is the generated input:\n\n```json\n{body}\n"
+        if kind == "trailing_comma":
+            return f"```json\n{body[:-2]},\n}}\n```"
+        # missing_component: 丢掉最后一个组件
+        partial = dict(list(answer.items())[:-1])
+        return f"```json\n{json.dumps(partial, indent=2)}\n```"
+
+
+if __name__ == "__main__":
+    import argparse
+    from pathlib import Path
+
+    from src.utils.config_registry import ConfigRegistry
+    from src.utils.logger import setup_logging
+
+    parser = argparse.ArgumentParser(description="本地模拟LLM服务")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--scenario", help="场景YAML文件，键同 DEFAULT_SCENARIO")
+    args = parser.parse_args()
+
+    setup_logging(level="DEBUG")
+    mock_scenario = ConfigRegistry.parse_file(Path(args.scenario)) if args.scenario else None
+    mock_server = MockLLMServer(mock_scenario, args.host, args.port)
+    logger.info(f"🧪 模拟LLM服务监听 {mock_server.url}（Ctrl+C 退出）")
+    mock_server.serve_forever()
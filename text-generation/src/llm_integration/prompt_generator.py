@@ -1,9 +1,13 @@
 import json
+import xml.etree.ElementTree as ET
 from pathlib import Path
-from typing import Dict, List
+from typing import Dict, List, Optional, Set, Tuple
 
-from src.utils.db_utils import DBUtils
+from src.llm_integration.prompt_templates import PromptTemplates, example_json
+from src.llm_integration.token_counter import TokenCounter, count_sub_prompts
+from src.utils.db_writer import DBWriter
 from src.utils.logger import get_logger
+from src.utils.uiautomator_utils import UIAutomatorUtils
 from src.utils.yaml_utils import YamlUtils
 
 logger = get_logger(__name__)
@@ -12,10 +16,16 @@ logger = get_logger(__name__)
 class PromptEngine:
     """模块化提示生成引擎，支持子提示存储"""
 
-    def __init__(self):
-        self.templates = YamlUtils.load_prompt_config()
+    SUB_PROMPT_KEYS = ("GloP", "ComP", "AdjP", "ResP", "GuiP", "FullPrompt")
+
+    def __init__(self, token_counter: TokenCounter = None, max_prompt_tokens: Optional[int] = None):
+        self.templates = PromptTemplates.load()  # 预编译模板（进程内共享）
         self.sub_prompts = {}  # 存储各子提示内容
 
+        budget = YamlUtils.load_prompt_budget_config()
+        self.token_counter = token_counter or TokenCounter.from_config(budget)
+        self.max_prompt_tokens = max_prompt_tokens if max_prompt_tokens is not None else budget.get('max_prompt_tokens')
+
     def _get_ordinal_suffix(self, n: int) -> str:
         """生成序数词后缀 (1st, 2nd, 3rd...)"""
         if 11 <= (n % 100) <= 13:
@@ -40,56 +50,91 @@ class PromptEngine:
 
         # 全局上下文
         glop = self._build_global(context)
-        components.append(glop)
-        self._record_subprompt("GloP", glop)
-
         # 组件描述
         comps = self._build_components(context)
-        components.extend(comps)
-        self._record_subprompt("ComP", comps)
-
-        # 相邻上下文
-        adjps = self._build_adjacent(context)
-        components.extend(adjps)
-        self._record_subprompt("AdjP", adjps)
-
         # 限制性提示
         resp = self._build_restrictive(context)
-        components.append(resp)
-        self._record_subprompt("ResP", resp)
-
         # 指导性提示
-        guip = self.templates["GuiP"]
-        components.append(guip)
+        guip = self.templates["GuiP"].render()
+        # 相邻上下文（超出预算时按距离裁剪）
+        adjps = self._fit_adjacent([glop, *comps, resp, guip], self._adjacent_entries(context))
+
+        components = [glop, *comps, *adjps, resp, guip]
+        self._record_subprompt("GloP", glop)
+        self._record_subprompt("ComP", comps)
+        self._record_subprompt("AdjP", adjps)
+        self._record_subprompt("ResP", resp)
         self._record_subprompt("GuiP", guip)
 
         # 添加完整提示内容
         full_prompt = " ".join(components)
         self.sub_prompts["FullPrompt"] = full_prompt
 
+        # 各子提示 token 数
+        token_counts = count_sub_prompts(
+            self.token_counter, {key: self.sub_prompts[key] for key in self.SUB_PROMPT_KEYS}
+        )
+        self.sub_prompts["TokenCounts"] = {**token_counts, "tokenizer": self.token_counter.name}
+        logger.info(
+            f"📏 prompt token: " + " | ".join(f"{key} {token_counts[key]}" for key in self.SUB_PROMPT_KEYS[:-1])
+            + f" | 总计 {token_counts['FullPrompt']} ({self.token_counter.name})"
+        )
+
         # 保存子提示
-        DBUtils.save_prompt(context["global"]["package_name"], glop, str(comps), str(adjps), resp, guip)
+        package_name = context["global"]["package_name"]
+        DBWriter.target().save_prompt(package_name, glop, str(comps), str(adjps), resp, guip,
+                                      self.sub_prompts["TokenCounts"])
+        self._save_sub_prompts(Path("output/prompts"), package_name)
         logger.info(f"✅ prompt生成成功")
 
         return full_prompt
 
+    def _fit_adjacent(self, fixed_parts: List[str], adjacent_entries: List[Tuple[float, str]]) -> List[str]:
+        """超出 token 预算时按距离从远到近删除 AdjP 条目（保持原有顺序）"""
+        texts = [text for _, text in adjacent_entries]
+        if not self.max_prompt_tokens:
+            return texts
+
+        costs = [self.token_counter.count(text) for text in texts]
+        total = sum(self.token_counter.count(part) for part in fixed_parts) + sum(costs)
+        dropped = set()
+        for idx in sorted(range(len(texts)), key=lambda i: adjacent_entries[i][0], reverse=True):
+            if total <= self.max_prompt_tokens:
+                break
+            dropped.add(idx)
+            total -= costs[idx]
+
+        if dropped:
+            self.sub_prompts["TrimmedAdjP"] = [texts[i] for i in sorted(dropped)]
+            logger.warning(f"✂️ prompt 超出 {self.max_prompt_tokens} token 预算，删除 {len(dropped)} 条较远的 AdjP")
+        if total > self.max_prompt_tokens:
+            logger.warning(f"⚠️ 删除全部 AdjP 后 prompt 仍有 {total} token，超出预算 {self.max_prompt_tokens}")
+        return [text for i, text in enumerate(texts) if i not in dropped]
+
     def _build_global(self, context: Dict) -> str:
         """构建全局上下文提示"""
         global_info = context["global"]
         component_types = {c["type"].split('.')[-1] for c in context["component"]}
-        return self.templates["GloP"].format(
+        return self.templates["GloP"].render(
             app_name=global_info["app_name"],
             input_count=global_info["input_count"],
             activity=global_info["activity"].split('.')[-1],
             component_types=", ".join(component_types)
         )
 
-    def _build_components(self, context: Dict) -> List[str]:
+    def build_component_context(self, context: Dict, resource_ids: List[str]) -> List[str]:
+        """仅为指定组件构建 ComP 与 AdjP 子提示（部分重试用，序数与完整提示一致）"""
+        wanted = set(resource_ids)
+        return self._build_components(context, wanted) + self._build_adjacent(context, wanted)
+
+    def _build_components(self, context: Dict, only: Optional[Set[str]] = None) -> List[str]:
         """构建组件描述提示"""
         components = []
         for idx, comp in enumerate(context["component"], 1):
+            if only is not None and comp["resource_id_combined"] not in only:
+                continue
             components.append(
-                self.templates["ComP"].format(
+                self.templates["ComP"].render(
                     component_order=self._format_ordinal(idx),
                     component_type=comp["type"].split('.')[-1],
                     resource_id=comp["resource_id"],
@@ -99,32 +144,117 @@ class PromptEngine:
             )
         return components
 
-    def _build_adjacent(self, context: Dict) -> List[str]:
+    def _build_adjacent(self, context: Dict, only: Optional[Set[str]] = None) -> List[str]:
         """构建相邻上下文提示"""
+        return [text for _, text in self._adjacent_entries(context, only)]
+
+    def _adjacent_entries(self, context: Dict, only: Optional[Set[str]] = None) -> List[Tuple[float, str]]:
+        """构建相邻上下文提示，附带标签距离（用于预算裁剪）"""
         adjacents = []
         for comp_id, adj_info in context["adjacent"].items():
+            if only is not None and comp_id not in only:
+                continue
             for direction, info in adj_info.items():
                 if info and info.get("text"):
-                    adjacents.append(
-                        self.templates["AdjP"].format(
+                    adjacents.append((
+                        info.get("distance", 0),
+                        self.templates["AdjP"].render(
                             direction=direction,
                             component_id=comp_id,
                             text=info["text"],
                             distance=f"{info.get('distance', 0):.2f}"
                         )
-                    )
+                    ))
         return adjacents
 
     def _build_restrictive(self, context: Dict) -> str:
-        """构建限制性提示（动态生成JSON示例）"""
+        """构建限制性提示（JSON示例按组件ID缓存）"""
         resource_ids = [c["resource_id_combined"] for c in context["component"]]
-        example_dict = {rid: "generated_value" for rid in resource_ids}
-        example_json = json.dumps(example_dict, indent=2)
 
-        return self.templates["ResP"].format(
+        return self.templates["ResP"].render(
             component_list=", ".join(resource_ids),
-            example_json=example_json
+            example_json=example_json(resource_ids)
+        )
+
+    # 提示结构（与 ChatProcessor.buildPrompt 保持一致）:
+    # 0: global+component+adjacent+restrictive+guiding
+    # 1: component+adjacent+restrictive+guiding
+    # 2: global+adjacent+restrictive+guiding
+    # 3: global+component+restrictive+guiding
+    # 4: global+component+adjacent+restrictive
+    # 5: global + UI层级XML + restrictive + guiding
+    PROMPT_STRUCTURES = {
+        0: ("global", "component", "adjacent", "restrictive", "guiding"),
+        1: ("component", "adjacent", "restrictive", "guiding"),
+        2: ("global", "adjacent", "restrictive", "guiding"),
+        3: ("global", "component", "restrictive", "guiding"),
+        4: ("global", "component", "adjacent", "restrictive"),
+    }
+    XML_STRUCTURE = 5
+
+    @staticmethod
+    def build_structured_prompt(prompts: Dict[str, str], structure: int, hierarchy_xml: str = None,
+                                max_tokens: Optional[int] = None, token_counter: TokenCounter = None) -> str:
+        """按提示结构拼接已存储的子提示（t_google_prompts 一行），结构5缺少XML时返回None
+
+        结构5在给定 max_tokens 时会裁剪XML，使整体提示不超过预算。
+        """
+        if structure == PromptEngine.XML_STRUCTURE:
+            if not hierarchy_xml or not hierarchy_xml.strip():
+                return None
+            header = "Here is the detailed hierarchy structure of the UI that contains those text-input components:\n"
+            if max_tokens:
+                counter = token_counter or TokenCounter.from_config(None)
+                fixed = sum(counter.count(prompts[key]) for key in ("global", "restrictive", "guiding"))
+                hierarchy_xml = PromptEngine.trim_hierarchy_xml(
+                    hierarchy_xml, max_tokens - fixed - counter.count(header), counter
+                )
+            return " ".join([
+                prompts["global"] + "\n",
+                header,
+                hierarchy_xml + "\n\n",
+                prompts["restrictive"] + "\n",
+                prompts["guiding"]
+            ])
+        return " ".join(prompts[part] for part in PromptEngine.PROMPT_STRUCTURES[structure])
+
+    @staticmethod
+    def trim_hierarchy_xml(hierarchy_xml: str, max_tokens: int, token_counter: TokenCounter) -> str:
+        """XML超出预算时从大到小删除不含输入框（INPUT_CLASSES）的子树，输入框及其祖先节点始终保留"""
+        total = token_counter.count(hierarchy_xml)
+        if total <= max_tokens:
+            return hierarchy_xml
+        try:
+            root = ET.fromstring(hierarchy_xml)
+        except ET.ParseError as e:
+            logger.warning(f"层级XML解析失败，跳过裁剪: {e}")
+            return hierarchy_xml
+
+        parents = {child: parent for parent in root.iter() for child in parent}
+        protected = {root}
+        for node in root.iter():
+            if node.get("class") in UIAutomatorUtils.INPUT_CLASSES:
+                while node is not None and node not in protected:
+                    protected.add(node)
+                    node = parents.get(node)
+
+        # 受保护节点下的非保护子节点即为可整体删除的最大子树
+        candidates = [child for parent in root.iter() if parent in protected
+                      for child in parent if child not in protected]
+        sized = sorted(
+            ((token_counter.count(ET.tostring(node, encoding="unicode")), node) for node in candidates),
+            key=lambda item: item[0], reverse=True
         )
+        removed = 0
+        for cost, node in sized:
+            if total <= max_tokens:
+                break
+            parents[node].remove(node)
+            total -= cost
+            removed += 1
+
+        logger.warning(f"✂️ 层级XML超出 {max_tokens} token 预算，删除 {removed} 个不含输入框的子树（剩余约 {total}）")
+        return ET.tostring(root, encoding="unicode")
 
     def _save_sub_prompts(self, save_dir: Path, package_name: str):
         """保存子提示到JSON文件"""
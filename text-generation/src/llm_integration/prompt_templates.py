@@ -0,0 +1,55 @@
+# src/llm_integration/prompt_templates.py
+"""预编译提示模板：prompt_templates.yaml 只解析一次，进程内共享编译结果与JSON示例"""
+import json
+import threading
+from functools import lru_cache
+from string import Formatter
+from typing import Dict, Optional, Sequence, Tuple
+
+from src.utils.yaml_utils import CONFIG_DIR, YamlUtils
+
+
+class CompiledTemplate:
+    """str.format 模板的预编译形式：加载时解析出字段，渲染时直接调用绑定的 C 实现格式化方法"""
+
+    def __init__(self, source: str):
+        self.source = source
+        self.fields = tuple(name for _, name, _, _ in Formatter().parse(source) if name is not None)
+        # 不含占位符的模板（如 GuiP）直接缓存渲染结果
+        self._static = source.format() if not self.fields else None
+        self._format = source.format
+
+    def render(self, **values) -> str:
+        if self._static is not None:
+            return self._static
+        return self._format(**values)
+
+    def __str__(self) -> str:
+        return self.source
+
+
+class PromptTemplates:
+    """按文件修改时间缓存的已编译模板集合（进程内共享，只读）"""
+
+    _cache: Optional[Tuple[int, Dict[str, CompiledTemplate]]] = None
+    _lock = threading.Lock()
+
+    @classmethod
+    def load(cls) -> Dict[str, CompiledTemplate]:
+        mtime = (CONFIG_DIR / "prompt_templates.yaml").stat().st_mtime_ns
+        with cls._lock:
+            if cls._cache is not None and cls._cache[0] == mtime:
+                return cls._cache[1]
+            compiled = {name: CompiledTemplate(text) for name, text in YamlUtils.load_prompt_config().items()}
+            cls._cache = (mtime, compiled)
+            return compiled
+
+
+@lru_cache(maxsize=4096)
+def _example_json(component_ids: Tuple[str, ...]) -> str:
+    return json.dumps({rid: "generated_value" for rid in component_ids}, indent=2)
+
+
+def example_json(component_ids: Sequence[str]) -> str:
+    """限制性提示中的JSON示例，按组件ID序列缓存（PromptEngine 与 TextInputExtractor 共用）"""
+    return _example_json(tuple(component_ids))
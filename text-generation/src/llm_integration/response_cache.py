@@ -0,0 +1,125 @@
+# src/llm_integration/response_cache.py
+"""LLM响应缓存：按 (模型, 会话, 提示, 变体) 内容哈希存储已通过解析校验的原始JSON响应（SQLite）"""
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Optional
+
+from src.llm_integration.llm_errors import LLMCacheMissError
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class ResponseCache:
+    """磁盘响应缓存，支持 TTL 与条目数上限淘汰
+
+    variant 区分同一提示的不同实验样本（如 seq），避免多次独立采样命中同一条缓存；
+    写入由调用方在答案解析通过后触发，解析失败的答案不会被缓存和回放。
+
+    mode:
+      - read_write: 命中直接返回，未命中请求后写入
+      - replay_only: 只读缓存，未命中抛出 LLMCacheMissError（离线重新分析）
+    """
+
+    MODES = ("read_write", "replay_only")
+
+    def __init__(self,
+                 path: str = "output/cache/llm_responses.sqlite",
+                 mode: str = "read_write",
+                 ttl_seconds: Optional[float] = None,
+                 max_entries: Optional[int] = None):
+        if mode not in self.MODES:
+            raise ValueError(f"不支持的缓存模式: {mode}")
+        self.path = Path(path)
+        self.mode = mode
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS llm_responses (
+                cache_key TEXT PRIMARY KEY,
+                model_type TEXT NOT NULL,
+                response TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_responses_access ON llm_responses (last_access)")
+        self._conn.commit()
+
+    @classmethod
+    def from_config(cls, config: Optional[dict]) -> Optional["ResponseCache"]:
+        """根据 llm_config.response_cache 创建，未启用时返回 None"""
+        if not config or not config.get('enabled', False):
+            return None
+        return cls(
+            path=config.get('path', "output/cache/llm_responses.sqlite"),
+            mode=config.get('mode', "read_write"),
+            ttl_seconds=config.get('ttl_seconds'),
+            max_entries=config.get('max_entries')
+        )
+
+    @staticmethod
+    def make_key(model_type: str, session_id: str, message: str, variant: str = "") -> str:
+        payload = json.dumps([model_type, session_id or "", message, variant or ""], ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, model_type: str, session_id: str, message: str, variant: str = "") -> Optional[Dict]:
+        """查询缓存，过期条目视为未命中；回放模式下未命中抛出 LLMCacheMissError"""
+        cache_key = self.make_key(model_type, session_id, message, variant)
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT response, created_at FROM llm_responses WHERE cache_key = ?", (cache_key,)
+            ).fetchone()
+            if row and self.ttl_seconds and now - row[1] > self.ttl_seconds:
+                self._conn.execute("DELETE FROM llm_responses WHERE cache_key = ?", (cache_key,))
+                self._conn.commit()
+                row = None
+            if row:
+                self._conn.execute("UPDATE llm_responses SET last_access = ? WHERE cache_key = ?", (now, cache_key))
+                self._conn.commit()
+
+        if row:
+            logger.debug(f"\t💾 LLM响应缓存命中: {model_type} | {cache_key[:12]}")
+            return json.loads(row[0])
+        if self.mode == "replay_only":
+            raise LLMCacheMissError(f"回放模式缓存未命中: {model_type} | {cache_key[:12]}")
+        return None
+
+    def put(self, model_type: str, session_id: str, message: str, response: Dict, variant: str = ""):
+        """写入缓存（仅缓存 success 响应），超出上限时淘汰最久未访问的条目"""
+        if self.mode == "replay_only" or not response.get('success', False):
+            return
+        cache_key = self.make_key(model_type, session_id, message, variant)
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_responses (cache_key, model_type, response, created_at, last_access) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (cache_key, model_type, json.dumps(response, ensure_ascii=False), now, now)
+            )
+            self._evict(now)
+            self._conn.commit()
+
+    def _evict(self, now: float):
+        if self.ttl_seconds:
+            self._conn.execute("DELETE FROM llm_responses WHERE created_at < ?", (now - self.ttl_seconds,))
+        if self.max_entries:
+            self._conn.execute("""
+                DELETE FROM llm_responses WHERE cache_key IN (
+                    SELECT cache_key FROM llm_responses ORDER BY last_access DESC LIMIT -1 OFFSET ?
+                )
+            """, (self.max_entries,))
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
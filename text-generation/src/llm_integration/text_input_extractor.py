@@ -2,35 +2,62 @@
 import json
 import logging
 from pathlib import Path
-from typing import Dict, Tuple
+from typing import Callable, Dict, List, Tuple
 
-from src.utils.yaml_utils import YamlUtils
+from src.llm_integration.json_extractor import JsonExtractor
+from src.llm_integration.llm_errors import LLMError
+from src.llm_integration.prompt_generator import PromptEngine
+from src.llm_integration.prompt_templates import PromptTemplates, example_json
 
 logger = logging.getLogger(__name__)
 
 
 class TextInputExtractor:
-    def __init__(self, llm_chatter, max_retries, context_data):
+    def __init__(self, llm_chatter, max_retries, context_data, cache_variant: str = ""):
         self.llm_chatter = llm_chatter
         self.max_retries = max_retries
+        self.cache_variant = cache_variant  # 响应缓存键的区分值（如实验序号），避免不同实验共用缓存
         self.component_ids = [c["resource_id_combined"] for c in context_data["component"]]
         self.package_name = context_data['global']['package_name']
-        self.retry_templates = YamlUtils.load_prompt_config().get('Retry')
-
-    def _generate_example_json(self) -> str:
-        """构建限制性提示（动态生成JSON示例）"""
-        example_dict = {rid: "generated_value" for rid in self.component_ids}
-        example_json = json.dumps(example_dict, indent=2)
-
-        return example_json
+        self.context_data = context_data
+        templates = PromptTemplates.load()
+        self.retry_templates = templates.get('Retry')
+        self.partial_retry_template = templates.get('PartialRetry')
+
+    @classmethod
+    def for_components(cls, component_ids: List[str], package_name: str, llm_chatter=None, max_retries: int = 5):
+        """仅凭组件ID构造（离线/批量场景，无完整上下文）"""
+        context_data = {
+            "component": [{"resource_id_combined": rid} for rid in component_ids],
+            "global": {"package_name": package_name}
+        }
+        return cls(llm_chatter, max_retries, context_data)
+
+    def _generate_example_json(self, component_ids: List[str] = None) -> str:
+        """构建限制性提示（与 PromptEngine 共用按组件ID缓存的JSON示例）"""
+        return example_json(component_ids or self.component_ids)
 
     def _build_retry_prompt(self) -> str:
         """构建重试提示"""
-        return self.retry_templates.format(
+        return self.retry_templates.render(
             example_json=self._generate_example_json(),
             component_count=len(self.component_ids)
         )
 
+    def _build_partial_retry_prompt(self, missing: List[str]) -> str:
+        """构建部分重试提示：只请求缺失的组件，并附上它们的 ComP/AdjP 上下文"""
+        if "adjacent" in self.context_data:
+            context_lines = PromptEngine().build_component_context(self.context_data, missing)
+        else:
+            # 离线场景没有组件上下文，仅列出组件ID
+            context_lines = [f"- {rid}" for rid in missing]
+        return self.partial_retry_template.render(
+            missing_count=len(missing),
+            component_count=len(self.component_ids),
+            component_context="\n".join(line.strip() for line in context_lines),
+            example_json=self._generate_example_json(missing)
+        )
+
     def _validate_structure(self, parsed_data: Dict) -> bool:
         """验证响应数据结构"""
         # 检查所有必需组件是否存在
@@ -40,8 +67,8 @@ class TextInputExtractor:
             return False
         return True
 
-    def _parse_response(self, response: Dict) -> Tuple[str, Dict]:
-        """解析并验证LLM响应"""
+    def _extract_answer(self, response: Dict) -> Tuple[str, Dict]:
+        """提取响应中的JSON对象（允许缺少部分组件）"""
         try:
             # 基础验证
             if not response.get('success', False):
@@ -51,50 +78,81 @@ class TextInputExtractor:
             raw_content = data.get('chat', '')
             session_id = data.get('id', '')
 
-            # JSON解析
-            if "```json" not in raw_content:
-                return str(session_id), {}
+            # 容错提取：兼容 ```JSON、无代码块、尾逗号、多个代码块等情况
+            parsed_data = JsonExtractor.extract(raw_content, self.component_ids)
+            return str(session_id), parsed_data or {}
+
+        except (KeyError, AttributeError) as e:
+            logger.error(f"Parsing error: {str(e)}")
+            return "", {}
 
-            # 分割字符串提取JSON部分
-            json_str = raw_content.split("```json")[1].split("```")[0].strip()
-            parsed_data = json.loads(json_str)
+    def accepts(self, expected_keys: List[str] = None) -> Callable[[Dict], bool]:
+        """响应缓存写入判定：答案包含 expected_keys 的全部组件时才允许缓存"""
+        keys = expected_keys or self.component_ids
 
-            # 结构验证
-            if not self._validate_structure(parsed_data):
-                return str(session_id), {}
+        def _accept(response: Dict) -> bool:
+            _, parsed_data = self._extract_answer(response)
+            return all(rid in parsed_data for rid in keys)
 
-            return str(session_id), parsed_data
+        return _accept
 
-        except (KeyError, json.JSONDecodeError) as e:
-            logger.error(f"Parsing error: {str(e)}")
-            return "", {}
+    def parse_response(self, response: Dict) -> Tuple[str, Dict]:
+        """解析并验证LLM响应，结构不满足时返回空字典（也供扇出引擎单独调用）"""
+        session_id, parsed_data = self._extract_answer(response)
+
+        # 结构验证
+        if not parsed_data or not self._validate_structure(parsed_data):
+            return session_id, {}
+
+        return session_id, parsed_data
 
     def extract_test_input(self, initial_response: Dict, prompt: str) -> Tuple[str, Dict]:
 
         llm_response = initial_response  # 当前LLM响应
+        collected: Dict = {}  # 各轮已得到的组件值，缺失的组件在后续轮次中补齐
 
         for attempt in range(1, self.max_retries):
 
-            session_id, parsed_data = self._parse_response(llm_response)
+            session_id, parsed_data = self._extract_answer(llm_response)
+            for rid, value in parsed_data.items():
+                collected.setdefault(rid, value)
+            missing = [rid for rid in self.component_ids if rid not in collected]
+            expected_keys = self.component_ids
 
             if session_id == "Failed--":
                 logger.warning(f"\t🔌 连接失败 (第 {attempt + 1}/{self.max_retries} 次尝试)")
                 current_prompt = prompt  # 重置为初始提示
                 session_id = ""  # 重置会话
 
-            elif not parsed_data:
-                logger.debug(f"\t⚠️ 解析结果不满足条件 (第 {attempt + 1}/{self.max_retries} 次尝试)")
-                current_prompt = self._build_retry_prompt()  # 切换重试提示
+            elif not missing:
+                logger.info(f"✅ 测试文本提取成功")
+                return session_id, collected
+
+            elif collected and self.partial_retry_template:
+                logger.debug(
+                    f"\t🧩 已获得 {len(self.component_ids) - len(missing)}/{len(self.component_ids)} 个组件，"
+                    f"仅请求缺失组件: {', '.join(missing)} (第 {attempt + 1}/{self.max_retries} 次尝试)"
+                )
+                current_prompt = self._build_partial_retry_prompt(missing)  # 只补缺失组件
+                expected_keys = missing
 
             else:
-                logger.info(f"✅ 测试文本提取成功")
-                return session_id, parsed_data
+                logger.debug(f"\t⚠️ 解析结果不满足条件 (第 {attempt + 1}/{self.max_retries} 次尝试)")
+                current_prompt = self._build_retry_prompt()  # 切换重试提示
 
             if attempt < self.max_retries:
-                llm_response = self.llm_chatter.chat_completion(
-                    message=current_prompt,
-                    session_id=session_id
-                )
+                try:
+                    llm_response = self.llm_chatter.chat_completion(
+                        message=current_prompt,
+                        session_id=session_id,
+                        expected_keys=expected_keys,
+                        cache_variant=self.cache_variant,
+                        accept=self.accepts(expected_keys)
+                    )
+                except LLMError as e:
+                    # 客户端已按退避策略重试过，传输层失败不再占用解析重试次数
+                    logger.error(f"\t🔌 LLM请求失败 [{type(e).__name__}]: {e}")
+                    return "TAG：次数用完，未成功提取测试用例", {}
 
         logger.error(f"🚫 达到最大尝试次数 {self.max_retries} 次，默认返回空")
         return "TAG：次数用完，未成功提取测试用例", {}
@@ -0,0 +1,87 @@
+# src/llm_integration/token_counter.py
+"""提示词 token 计数：默认使用离线启发式估算，可切换为 tiktoken 等真实分词器"""
+import math
+import re
+from abc import ABC, abstractmethod
+from typing import Callable, Dict, Optional
+
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# 英文单词/数字、CJK字符、其余非空白符号分别计数
+_TOKEN_PATTERN = re.compile(r"[A-Za-z0-9_]+|[぀-ヿ㐀-䶿一-鿿가-힯]|[^\sA-Za-z0-9_]")
+
+
+class TokenCounter(ABC):
+    """token 计数器基类"""
+
+    name = "base"
+
+    @abstractmethod
+    def count(self, text: str) -> int:
+        """返回 text 的 token 数"""
+
+    @staticmethod
+    def from_config(config: Optional[dict]) -> "TokenCounter":
+        """根据 prompt_budget.tokenizer 创建: heuristic（默认）或 tiktoken:<编码名>"""
+        tokenizer = (config or {}).get('tokenizer', 'heuristic')
+        if tokenizer.startswith('tiktoken'):
+            encoding = tokenizer.partition(':')[2] or 'cl100k_base'
+            try:
+                return TiktokenCounter(encoding)
+            except ImportError:
+                logger.warning("未安装 tiktoken，使用启发式 token 估算")
+        elif tokenizer != 'heuristic':
+            logger.warning(f"未知的 tokenizer: {tokenizer}，使用启发式 token 估算")
+        return HeuristicTokenCounter()
+
+
+class HeuristicTokenCounter(TokenCounter):
+    """离线估算：英文单词按每4个字符1个token，CJK字符与标点各计1个token"""
+
+    name = "heuristic"
+
+    def count(self, text: str) -> int:
+        if not text:
+            return 0
+        total = 0
+        for token in _TOKEN_PATTERN.findall(text):
+            is_word = token.isascii() and (token[0].isalnum() or token[0] == "_")
+            total += math.ceil(len(token) / 4) if is_word else 1
+        return total
+
+
+class TiktokenCounter(TokenCounter):
+    """基于 tiktoken 的精确计数（可选依赖）"""
+
+    def __init__(self, encoding: str = 'cl100k_base'):
+        import tiktoken
+
+        self._encoding = tiktoken.get_encoding(encoding)
+        self.name = f"tiktoken:{encoding}"
+
+    def count(self, text: str) -> int:
+        return len(self._encoding.encode(text or "", disallowed_special=()))
+
+
+class CallableTokenCounter(TokenCounter):
+    """包装任意计数函数（如模型服务商SDK提供的分词接口）"""
+
+    def __init__(self, counter: Callable[[str], int], name: str = "custom"):
+        self._counter = counter
+        self.name = name
+
+    def count(self, text: str) -> int:
+        return self._counter(text or "")
+
+
+def count_sub_prompts(counter: TokenCounter, sub_prompts: Dict) -> Dict[str, int]:
+    """统计各子提示的 token 数（列表类子提示按条目求和）"""
+    counts = {}
+    for key, content in sub_prompts.items():
+        if isinstance(content, list):
+            counts[key] = sum(counter.count(item) for item in content)
+        elif isinstance(content, str):
+            counts[key] = counter.count(content)
+    return counts
@@ -1,18 +1,23 @@
 # main.py
 """主程序入口模块，负责协调应用安装、启动、上下文提取及提示生成全流程"""
+import json
 import sys
 import time
-from typing import Any, Dict, Tuple
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
 
 from src.apk_management.installer import PackageInstaller
 from src.apk_management.launcher import AppLauncher
 from src.context_extraction.context_extractor import ContextExtractor
+from src.llm_integration.llm_errors import LLMError
 from src.llm_integration.llm_chatter import LLMChatter
 from src.llm_integration.prompt_generator import PromptEngine
 from src.llm_integration.text_input_extractor import TextInputExtractor
 from src.test_execution.action_executor import ActionExecutor
+from src.test_execution.experiment_scheduler import ExperimentScheduler
 from src.utils.assert_utils import AssertUtils
 from src.utils.db_utils import DBUtils
+from src.utils.db_writer import DBWriter
 from src.utils.logger import get_logger, LoggerUtils
 from src.utils.uiautomator_utils import UIAutomatorUtils
 from src.utils.yaml_utils import YamlUtils
@@ -20,43 +25,16 @@ from src.utils.yaml_utils import YamlUtils
 logger = get_logger(__name__)
 
 
-def main_process(config: Dict[str, Any]) -> None:
+def main_process(config: Dict[str, Any], device_serial: Optional[str] = None) -> None:
     """自动化测试主流程控制器"""
 
     try:
         # 初始化阶段
         llm_config = YamlUtils.load_llm_config()
+        launcher = AppLauncher(device_serial)
+        package_name, main_activity = _install_app(config['sources'], launcher, device_serial)
 
-        for try_time in range(3):
-            logger.info(f"\n第{try_time + 1}次实验 {'=*' * 50}")
-            # 应用启动阶段
-            launcher, app_config = _launch_and_navigate(config)
-
-            # 上下文处理阶段
-            context_data = _extract_context(launcher, app_config)
-            prompt = _build_prompt(context_data)
-
-            # LLM交互阶段
-            test_text = _process_llm_interaction(llm_config, context_data, prompt)
-
-            # 执行验证阶段
-            val = _execute_validation(launcher, app_config, test_text)
-
-            DBUtils.save_result_value(
-                app_config['package_name'],
-                llm_config['model_type'],
-                try_time + 1,
-                val,
-                0,
-                test_text
-            )
-            UIAutomatorUtils.app_stop(launcher.device, app_config['package_name'])
-            UIAutomatorUtils.app_stop(launcher.device, "android")
-
-            if app_config['package_name'] in (
-                    "com.applabstudios.ai.mail.homescreen.inbox",
-            ):
-                time.sleep(20)
+        run_experiments(launcher, package_name, llm_config, main_activity=main_activity)
 
     except Exception as e:
         logger.critical(f"主流程异常终止: {e}", exc_info=True)
@@ -67,22 +45,150 @@ def main_process(config: Dict[str, Any]) -> None:
         logger.info(f"{'=*' * 50}")
 
 
-def _launch_and_navigate(config: dict) -> Tuple[AppLauncher, dict]:
-    """处理应用启动与导航"""
-    installer = PackageInstaller()
-    success, package_name, message = installer.install_app(config['sources'])
+def run_experiments(launcher: AppLauncher,
+                    package_name: str,
+                    llm_config: dict,
+                    trials: int = 3,
+                    main_activity: Optional[str] = None) -> List[int]:
+    """对已安装应用执行多次实验，返回本次新完成实验的验证结果"""
+    # 断点续跑：跳过数据库中已完成的 (app, model, seq) 实验（先回放上次遗留的写库日志）
+    DBWriter.replay_pending()
+    finished_seqs = DBUtils.select_finished_seqs(package_name, llm_config['model_type'], 0)
+
+    vals = []
+    for try_time in range(trials):
+        if try_time + 1 in finished_seqs:
+            logger.info(f"⏭️ 第{try_time + 1}次实验已存在结果，跳过: {package_name}")
+            continue
+
+        logger.info(f"\n第{try_time + 1}次实验 {'=*' * 50}")
+        # 应用启动阶段
+        app_config = _launch_and_navigate(launcher, package_name, main_activity)
+
+        # 上下文处理阶段
+        context_data = _extract_context(launcher, app_config)
+        prompt = _build_prompt(context_data)
+
+        # LLM交互阶段
+        test_text = _process_llm_interaction(llm_config, context_data, prompt, try_time + 1)
+
+        # 执行验证阶段
+        val = _execute_validation(launcher, app_config, test_text)
+        vals.append(val)
+
+        DBWriter.target().save_result_value(
+            app_config['package_name'],
+            llm_config['model_type'],
+            try_time + 1,
+            val,
+            0,
+            test_text
+        )
+        UIAutomatorUtils.app_stop(launcher.device, app_config['package_name'])
+        UIAutomatorUtils.app_stop(launcher.device, "android")
+
+        if app_config['package_name'] in (
+                "com.applabstudios.ai.mail.homescreen.inbox",
+        ):
+            time.sleep(20)
+
+    return vals
+
+
+def batch_process(config: Dict[str, Any], device_serial: Optional[str] = None) -> List[Dict]:
+    """批量模式：安装目录下所有缺失应用，再对已配置的应用执行实验，返回汇总报告"""
+    installer = PackageInstaller(device_id=device_serial)
+    app_files = installer.collect_app_files(config['sources'])
+    logger.info(f"📦 批量模式 | 发现 {len(app_files)} 个安装文件: {config['sources']}")
+
+    install_results = installer.install_apps(app_files, [device_serial])
+
+    llm_config = YamlUtils.load_llm_config()
+    app_configs = YamlUtils.preload_app_configs()
+    launcher = AppLauncher(device_serial)  # 整个批次复用同一设备连接
+
+    report = []
+    for result in install_results:
+        package_name = result['package']
+        entry = {
+            "file": result['file'],
+            "package": package_name,
+            "install": {1: "installed", 0: "skipped", -1: "failed"}[result['success']],
+            "status": "",
+            "passed": 0,
+            "trials": 0,
+            "message": result['message']
+        }
+        report.append(entry)
+
+        if result['success'] == -1:
+            entry['status'] = "install_failed"
+            continue
+        if package_name not in app_configs:
+            entry['status'] = "no_config"
+            logger.info(f"⏭️ {package_name} 缺少应用配置，跳过实验")
+            continue
+
+        try:
+            main_activity = installer.get_package_metadata(Path(result['file']))["launchable_activity"]
+            vals = run_experiments(launcher, package_name, llm_config, main_activity=main_activity)
+            entry.update(status="done", passed=sum(vals), trials=len(vals), message="")
+        except Exception as e:
+            logger.error(f"❌ {package_name} 实验失败: {e}", exc_info=True)
+            entry.update(status="failed", message=str(e))
+            UIAutomatorUtils.app_stop(launcher.device, package_name)
+
+    _save_batch_report(report)
+    return report
+
+
+def _save_batch_report(report: List[Dict]) -> Path:
+    """打印并保存批量执行汇总"""
+    statuses = ["done", "no_config", "install_failed", "failed"]
+    counts = {status: sum(1 for r in report if r['status'] == status) for status in statuses}
+    logger.info(
+        f"批量执行完成: {counts['done']} 完成 | {counts['no_config']} 无配置 | "
+        f"{counts['install_failed']} 安装失败 | {counts['failed']} 实验失败 | 总计 {len(report)}"
+    )
+    for r in report:
+        logger.info(f"\t[{r['status']}] {r['package'] or r['file']} | 通过 {r['passed']}/{r['trials']} {r['message']}")
 
-    launcher = AppLauncher()
+    report_dir = Path("output/reports")
+    report_dir.mkdir(parents=True, exist_ok=True)
+    report_path = report_dir / f"batch_summary_{time.strftime('%Y%m%d_%H%M%S')}.json"
+    with open(report_path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+
+    logger.info(f"📄 汇总报告已保存: {report_path}")
+    return report_path
 
-    if not launcher.launch_app(package_name):
-        logger.error("应用启动失败")
-        raise RuntimeError("应用启动异常")
 
-    # 如果为首次安装，安装完成后自动化结束进程
+def _install_app(source: str,
+                 launcher: AppLauncher,
+                 device_serial: Optional[str] = None) -> Tuple[str, Optional[str]]:
+    """安装应用并返回 (包名, 启动Activity)"""
+    installer = PackageInstaller(device_id=device_serial)
+    success, package_name, message = installer.install_app(source)
+    # 元数据已在安装时写入缓存，此处不会再次调用aapt
+    main_activity = installer.get_package_metadata(Path(source))["launchable_activity"]
+
+    # 如果为首次安装，拉起应用后自动化结束进程
     if success == 1:
+        if not launcher.launch_app(package_name, main_activity):
+            logger.error("应用启动失败")
+            raise RuntimeError("应用启动异常")
         logger.info(f"{package_name}安装成功")
         sys.exit(1)
 
+    return package_name, main_activity
+
+
+def _launch_and_navigate(launcher: AppLauncher, package_name: str, main_activity: Optional[str] = None) -> dict:
+    """处理应用启动与导航"""
+    if not launcher.launch_app(package_name, main_activity):
+        logger.error("应用启动失败")
+        raise RuntimeError("应用启动异常")
+
     # 如果已经安装了，就执行脚本
     app_config = YamlUtils.load_app_config(package_name)
 
@@ -105,7 +211,7 @@ def _launch_and_navigate(config: dict) -> Tuple[AppLauncher, dict]:
     time.sleep(2)
     logger.info("🎉 成功进入目标页面")
 
-    return launcher, app_config
+    return app_config
 
 
 def _extract_context(launcher: AppLauncher, app_config: dict) -> dict:
@@ -126,18 +232,24 @@ def _build_prompt(context_data: dict) -> str:
     return PromptEngine().build_prompt(context_data)
 
 
-def _process_llm_interaction(llm_config: dict, context_data: dict, prompt: str) -> dict:
-    """处理LLM交互流程"""
+def _process_llm_interaction(llm_config: dict, context_data: dict, prompt: str, seq: int = 1) -> dict:
+    """处理LLM交互流程（seq 为实验序号，用于区分响应缓存）"""
 
     chatter = LLMChatter(llm_config)
     extractor = TextInputExtractor(
         llm_chatter=chatter,
         max_retries=llm_config['max_retries'],
         context_data=context_data,
+        cache_variant=f"seq={seq}",
     )
     logger.info(f"🤖 开始向{llm_config['model_type']}发送上下文信息 (正在进行第 1/{llm_config['max_retries']} 次尝试)")
 
-    response = chatter.chat_completion(prompt)
+    try:
+        response = chatter.chat_completion(prompt, expected_keys=extractor.component_ids,
+                                           cache_variant=extractor.cache_variant, accept=extractor.accepts())
+    except LLMError as e:
+        logger.error(f"🔌 LLM请求失败 [{type(e).__name__}]: {e}")
+        return {}
 
     tag, test_text = extractor.extract_test_input(response, prompt)
 
@@ -170,13 +282,40 @@ def _execute_validation(launcher: AppLauncher, app_config: dict, test_text: dict
     return 1 if verify_result['all_passed'] else 0
 
 
+def _schedule_experiments(config: Dict[str, Any], devices: List[str]) -> None:
+    """多设备并行调度：每台设备独立消费应用队列"""
+    sources = config['sources']
+    if isinstance(sources, str):
+        sources = [sources]
+    # 目录来源展开为其中的安装文件
+    app_files = []
+    for source in sources:
+        if Path(source).is_dir():
+            app_files.extend(str(f) for f in PackageInstaller.collect_app_files(source))
+        else:
+            app_files.append(source)
+
+    scheduler = ExperimentScheduler(
+        device_serials=devices,
+        task=lambda source, serial: main_process({**config, 'sources': source}, device_serial=serial)
+    )
+    scheduler.run(app_files)
+
+
 def main():
     """主程序入口"""
     try:
         # 配置加载
         config = YamlUtils.load_config()
         LoggerUtils.setup_logger(config)
-        main_process(config)
+
+        devices = config.get('devices') or []
+        if devices:
+            _schedule_experiments(config, devices)
+        elif isinstance(config['sources'], str) and Path(config['sources']).is_dir():
+            batch_process(config)
+        else:
+            main_process(config)
 
     except Exception as e:
         logger.critical("主流程异常终止", exc_info=True)
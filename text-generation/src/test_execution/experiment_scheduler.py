@@ -0,0 +1,154 @@
+# src/test_execution/experiment_scheduler.py
+"""多设备并行实验调度模块：每台设备一个工作线程，共享同一个应用队列"""
+import queue
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# 单个应用的实验任务: task(source, device_serial)
+ExperimentTask = Callable[[str, str], None]
+
+
+class ExperimentScheduler:
+    """设备池调度器（设备间故障隔离）"""
+
+    def __init__(self,
+                 device_serials: List[str],
+                 task: ExperimentTask,
+                 max_device_failures: int = 3,
+                 max_app_attempts: int = 2):
+        """
+        :param device_serials: 设备序列号列表（如 emulator-5554）
+        :param task: 单个应用的实验流程，抛出异常视为失败
+        :param max_device_failures: 设备连续失败次数上限，超过后该设备下线
+        :param max_app_attempts: 单个应用因设备下线被重新分配的最大尝试次数
+        """
+        self.device_serials = list(dict.fromkeys(device_serials))
+        self.task = task
+        self.max_device_failures = max_device_failures
+        self.max_app_attempts = max_app_attempts
+
+        self._app_queue: "queue.Queue[Tuple[str, int]]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._results: List[Dict] = []
+        self._pending = 0
+        self._active_devices = set()
+
+    def run(self, sources: List[str]) -> List[Dict]:
+        """调度全部应用并阻塞至完成，返回每个应用的执行结果"""
+        if not self.device_serials:
+            raise ValueError("设备列表为空")
+
+        for source in sources:
+            self._app_queue.put((source, 1))
+        self._pending = len(sources)
+        self._active_devices = set(self.device_serials)
+
+        logger.info(f"🚀 启动并行调度 | 设备 {len(self.device_serials)} 台 | 应用 {len(sources)} 个")
+        workers = [
+            threading.Thread(target=self._worker, args=(serial,), name=f"worker-{serial}", daemon=True)
+            for serial in self.device_serials
+        ]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+
+        # 所有设备均已下线时，剩余应用直接记为失败
+        while True:
+            try:
+                source, attempts = self._app_queue.get_nowait()
+            except queue.Empty:
+                break
+            self._record(source, None, "failed", "无可用设备", 0.0, attempts)
+
+        self._print_summary()
+        return self._results
+
+    def _worker(self, serial: str):
+        """设备工作线程：循环领取应用直到队列完成或设备下线"""
+        consecutive_failures = 0
+
+        while self._has_pending():
+            try:
+                source, attempts = self._app_queue.get(timeout=1)
+            except queue.Empty:
+                continue
+
+            logger.info(f"📱 [{serial}] 开始处理: {source} (第{attempts}次分配)")
+            status, message, elapsed = self._run_task(source, serial)
+
+            if status == "failed":
+                consecutive_failures += 1
+            else:
+                consecutive_failures = 0
+
+            if consecutive_failures >= self.max_device_failures:
+                logger.error(f"⛔ [{serial}] 连续失败 {consecutive_failures} 次，设备下线")
+                self._retire_device(serial, source, attempts, message, elapsed)
+                return
+
+            self._record(source, serial, status, message, elapsed, attempts)
+
+    def _run_task(self, source: str, serial: str) -> Tuple[str, str, float]:
+        """执行单个应用任务，隔离异常，返回 (状态, 信息, 耗时)"""
+        start_time = time.time()
+        try:
+            self.task(source, serial)
+            status, message = "success", ""
+        except SystemExit as e:
+            # 主流程在首次安装后以退出码1结束，属于正常流程
+            if e.code == 1:
+                status, message = "installed", "首次安装完成"
+            else:
+                status, message = "failed", f"流程退出 (code={e.code})"
+        except Exception as e:
+            logger.error(f"❌ [{serial}] 处理失败: {source} | {e}")
+            status, message = "failed", str(e)
+        return status, message, round(time.time() - start_time, 1)
+
+    def _retire_device(self, serial: str, source: str, attempts: int, message: str, elapsed: float):
+        """设备下线：最后一个失败的应用交给其余设备重试"""
+        with self._lock:
+            self._active_devices.discard(serial)
+            has_other_devices = bool(self._active_devices)
+
+        if has_other_devices and attempts < self.max_app_attempts:
+            logger.info(f"🔁 {source} 重新分配至其他设备")
+            self._app_queue.put((source, attempts + 1))
+        else:
+            self._record(source, serial, "failed", message, elapsed, attempts)
+
+    def _has_pending(self) -> bool:
+        with self._lock:
+            return self._pending > 0
+
+    def _record(self, source: str, serial: Optional[str], status: str, message: str, elapsed: float,
+                attempts: int):
+        """记录应用最终结果"""
+        with self._lock:
+            self._pending -= 1
+            self._results.append({
+                "source": source,
+                "device": serial,
+                "status": status,
+                "message": message,
+                "elapsed": elapsed,
+                "attempts": attempts
+            })
+
+    def _print_summary(self):
+        """打印调度汇总"""
+        success = sum(1 for r in self._results if r["status"] == "success")
+        installed = sum(1 for r in self._results if r["status"] == "installed")
+        failed = sum(1 for r in self._results if r["status"] == "failed")
+        logger.info(
+            f"调度完成: {success} 成功 | {installed} 首次安装 | {failed} 失败 | 总计 {len(self._results)}"
+        )
+        for r in self._results:
+            if r["status"] == "failed":
+                logger.warning(f"\t{r['source']} @ {r['device'] or '-'}: {r['message']}")
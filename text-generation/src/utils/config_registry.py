@@ -0,0 +1,65 @@
+"""YAML 配置注册表模块：按文件修改时间缓存解析结果"""
+
+import copy
+import threading
+from pathlib import Path
+from typing import Any, Callable, Dict, Tuple
+
+import yaml
+
+from src.utils.logger import get_logger
+
+try:
+    # libyaml 可用时使用C实现的解析器
+    from yaml import CSafeLoader as SafeLoader
+except ImportError:
+    from yaml import SafeLoader
+
+logger = get_logger(__name__)
+
+
+class ConfigRegistry:
+    """配置注册表：每个文件只解析一次，文件修改时间变化后自动重新加载"""
+
+    # (文件路径, 转换器名) -> (修改时间, 转换后的配置)
+    _cache: Dict[Tuple[str, str], Tuple[int, Any]] = {}
+    _lock = threading.RLock()
+
+    @classmethod
+    def get(cls, path: Path, converter: Callable[[Any], Any] = None) -> Any:
+        """读取配置，converter 将原始YAML转换为最终结果（与原始内容一同缓存）
+
+        返回值为缓存的深拷贝，调用方可以放心修改。
+        文件不存在时抛出 FileNotFoundError，YAML语法错误时抛出 yaml.YAMLError。
+        """
+        mtime = path.stat().st_mtime_ns
+        cache_key = (str(path), getattr(converter, "__qualname__", "raw"))
+
+        with cls._lock:
+            entry = cls._cache.get(cache_key)
+            if entry is not None and entry[0] == mtime:
+                return copy.deepcopy(entry[1])
+
+        raw = cls.parse_file(path)
+        value = converter(raw) if converter else raw
+        logger.debug(f"配置已加载: {path.name}")
+
+        with cls._lock:
+            cls._cache[cache_key] = (mtime, value)
+        return copy.deepcopy(value)
+
+    @staticmethod
+    def parse_file(path: Path) -> Any:
+        """解析YAML文件"""
+        with path.open('r', encoding='utf-8') as f:
+            return yaml.load(f, Loader=SafeLoader)
+
+    @classmethod
+    def invalidate(cls, path: Path = None):
+        """清除指定文件（或全部）的缓存"""
+        with cls._lock:
+            if path is None:
+                cls._cache.clear()
+                return
+            for key in [k for k in cls._cache if k[0] == str(path)]:
+                del cls._cache[key]
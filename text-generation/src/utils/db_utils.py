@@ -1,40 +1,70 @@
+import json
 import logging
+import threading
+from typing import Dict, Iterator, List, Optional, Set, Tuple
 
 import pandas as pd
 
+from src.utils.result_store import ResultStore, create_result_store
 from src.utils.yaml_utils import YamlUtils
 
 logger = logging.getLogger(__name__)
 
-from mysql.connector import pooling
-import json
-
 
 class DBUtils:
-    _connection_pool = None
+    """结果库访问入口，具体存储由 db_config.yaml 的 backend 选择（mysql / sqlite）"""
+
+    _store: Optional[ResultStore] = None
+    _store_lock = threading.Lock()
 
     @classmethod
-    def _initialize_pool(cls):
-        """从YAML文件读取配置并初始化连接池"""
-        if cls._connection_pool is None:
-            try:
-                db_config = YamlUtils.load_db_config()
-
-                # 创建连接池
-                cls._connection_pool = pooling.MySQLConnectionPool(
-                    pool_name=db_config.get('pool_name', 'mypool'),
-                    pool_size=db_config.get('pool_size', 5),
-                    host=db_config['host'],
-                    port=db_config['port'],
-                    user=db_config['user'],
-                    password=db_config['password'],
-                    database=db_config['database']
-                )
-            except Exception as e:
-                raise RuntimeError(f"Failed to initialize database pool: {e}")
+    def store(cls) -> ResultStore:
+        """获取存储后端（首次调用时按配置创建）"""
+        if cls._store is not None:
+            return cls._store
+        # 多设备并行时避免重复创建
+        with cls._store_lock:
+            if cls._store is None:
+                cls._store = create_result_store(YamlUtils.load_storage_config())
+                logger.debug(f"结果存储后端: {cls._store.name}")
+        return cls._store
 
     @classmethod
-    def save_result_value(cls, app_id: str, model_type: str, seq: int, val: int, prompt_structure: int, texts: dict):
+    def use_store(cls, store: ResultStore):
+        """显式指定存储后端（如离线分析时使用 SQLite 文件）"""
+        with cls._store_lock:
+            cls._store = store
+
+    @staticmethod
+    def result_params(app_id: str, model_type: str, seq: int, val: Optional[int], prompt_structure: int,
+                      texts: dict) -> tuple:
+        """save_result_value 的参数化查询变量"""
+        return (
+            app_id,
+            model_type,
+            seq,
+            val,
+            prompt_structure,
+            json.dumps(texts)  # 将字典转为JSON字符串
+        )
+
+    @staticmethod
+    def prompt_params(app_id: str, global_prompt: str, component_prompt: str, adjacent_prompt: str,
+                      restrictive_prompt: str, guiding_prompt: str, token_counts: Optional[dict] = None) -> tuple:
+        """save_prompt 的参数化查询变量"""
+        return (
+            app_id,
+            global_prompt,
+            component_prompt,
+            adjacent_prompt,
+            restrictive_prompt,
+            guiding_prompt,
+            json.dumps(token_counts) if token_counts is not None else None  # 各子提示 token 数（JSON）
+        )
+
+    @classmethod
+    def save_result_value(cls, app_id: str, model_type: str, seq: int, val: Optional[int], prompt_structure: int,
+                          texts: dict):
         """
         插入或更新记录（根据 appid + model_type + seq 判断是否存在）
 
@@ -45,112 +75,55 @@ class DBUtils:
         :param prompt_structure: 提示码
         :param texts: JSON文本数据
         """
-        cls._initialize_pool()  # 确保连接池已初始化
-
-        # SQL语句（使用ON DUPLICATE KEY UPDATE实现插入/更新）
-        query = """
-        INSERT INTO t_google_results
-            (app_id, model_type, seq, val, prompt_structure, texts, update_time)
-        VALUES 
-            (%s, %s, %s, %s, %s, %s, NOW())
-        ON DUPLICATE KEY UPDATE
-            val = VALUES(val),
-            texts = VALUES(texts),
-            update_time = NOW()
-        """
+        cls.write_rows("result", [cls.result_params(app_id, model_type, seq, val, prompt_structure, texts)])
 
-        # 参数化查询的变量
-        params = (
-            app_id,
-            model_type,
-            seq,
-            val,
-            prompt_structure,
-            json.dumps(texts)  # 将字典转为JSON字符串
-        )
+    @classmethod
+    def save_prompt(cls, app_id: str, global_prompt: str, component_prompt: str, adjacent_prompt: str,
+                    restrictive_prompt: str, guiding_prompt: str, token_counts: Optional[dict] = None):
+        cls.write_rows("prompt", [cls.prompt_params(
+            app_id, global_prompt, component_prompt, adjacent_prompt, restrictive_prompt, guiding_prompt, token_counts
+        )])
 
-        # 从连接池获取连接
-        try:
-            with cls._connection_pool.get_connection() as conn:
-                cursor = conn.cursor()
-                cursor.execute(query, params)
-                conn.commit()
-        except Exception as e:
-            conn.rollback()
-            raise RuntimeError(f"Database operation failed: {e}")
-        finally:
-            if 'cursor' in locals():
-                cursor.close()
+    @classmethod
+    def write_rows(cls, kind: str, rows: List[tuple]):
+        """在一个事务中批量写入 result / prompt 记录（executemany）"""
+        cls.store().write_rows(kind, rows)
 
     @classmethod
-    def save_prompt(cls, app_id: str, global_prompt: str, component_prompt: str, adjacent_prompt: str,
-                    restrictive_prompt: str, guiding_prompt: str):
-        cls._initialize_pool()
-
-        query = """
-        INSERT INTO t_google_prompts
-            (app_id, global, component, adjacent, restrictive, guiding, update_time)
-        VALUES 
-            (%s, %s, %s, %s, %s, %s, NOW())
-        ON DUPLICATE KEY UPDATE
-            global = VALUES(global),
-            component = VALUES(component),
-            adjacent = VALUES(adjacent),
-            restrictive = VALUES(restrictive),
-            guiding = VALUES(guiding),
-            update_time = NOW()
-        """
+    def select_finished_seqs(cls, app_id: str, model_type: str, prompt_structure: int) -> Set[int]:
+        """查询已完成的实验序号（用于断点续跑）"""
+        return cls.store().select_finished_seqs(app_id, model_type, prompt_structure)
 
-        params = (
-            app_id,
-            global_prompt,
-            component_prompt,
-            adjacent_prompt,
-            restrictive_prompt,
-            guiding_prompt
-        )
+    @classmethod
+    def select_prompt(cls, app_id: str) -> Optional[Dict[str, str]]:
+        """查询应用已存储的子提示"""
+        return cls.store().select_prompt(app_id)
 
-        # 从连接池获取连接
-        try:
-            with cls._connection_pool.get_connection() as conn:
-                cursor = conn.cursor()
-                cursor.execute(query, params)
-                conn.commit()
-        except Exception as e:
-            conn.rollback()
-            raise RuntimeError(f"Database operation failed: {e}")
-        finally:
-            if 'cursor' in locals():
-                cursor.close()
+    @classmethod
+    def select_prompt_app_ids(cls) -> List[str]:
+        """查询已存储子提示的全部应用"""
+        return cls.store().select_prompt_app_ids()
 
     @classmethod
-    def load_data(cls, FIXED_MODEL: str, FIXED_PROMPT: int):
-        # 连接到SQLite数据库（根据您的实际数据库类型调整）
-        cls._initialize_pool()
-        # 执行查询 - 获取所需数据
-        query = f"""
-        SELECT 
-            app_id,
-            model_type,
-            seq,
-            val,
-            prompt_structure,
-            tau,
-            tau_seq,
-            component_num,
-            component,
-            combination  -- 确保表中有此字段
-        FROM t_google_component_results
-        WHERE model_type = '{FIXED_MODEL}' 
-            AND prompt_structure = {FIXED_PROMPT}
-        """
+    def select_result_keys(cls, app_id: str) -> Set[Tuple[str, int, int]]:
+        """查询应用已有结果的 (model_type, prompt_structure, seq) 组合"""
+        return cls.store().select_result_keys(app_id)
 
-        df = pd.read_sql_query(query,         cls._initialize_pool() )
+    @classmethod
+    def iter_component_results(cls, model_type: str, prompt_structure: int,
+                               chunksize: int = 10000) -> Iterator[pd.DataFrame]:
+        """按块读取 t_google_component_results（参数化查询，命中 model_type + prompt_structure 索引）"""
+        return cls.store().iter_component_results(model_type, prompt_structure, chunksize)
+
+    @classmethod
+    def load_data(cls, FIXED_MODEL: str, FIXED_PROMPT: int, chunksize: int = 10000) -> pd.DataFrame:
+        """读取指定模型与提示结构的组件级结果"""
+        df = pd.concat(list(cls.iter_component_results(FIXED_MODEL, FIXED_PROMPT, chunksize)), ignore_index=True)
 
         # 数据预处理
-        if 'combination' not in df.columns:
-            # 如果表中没有combination字段，根据其他字段创建
-            print("警告: 表中无combination字段，将根据tau_seq和component_num模拟生成")
+        if df['combination'].isna().all() and not df.empty:
+            # 如果表中combination字段为空，根据其他字段创建
+            logger.warning("表中combination字段为空，将根据tau和tau_seq模拟生成")
             df['combination'] = df.apply(lambda x: f"Combination_{x['tau']}_{x['tau_seq']}", axis=1)
 
         return df
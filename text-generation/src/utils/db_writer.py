@@ -0,0 +1,233 @@
+"""后台批量写库模块：结果与子提示入队后由后台线程按批次 executemany 写入，数据库不可用时落盘到本地日志"""
+
+import atexit
+import json
+import queue
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from src.utils.db_utils import DBUtils
+from src.utils.logger import get_logger
+from src.utils.result_store import StoreUnavailableError
+from src.utils.yaml_utils import YamlUtils
+
+logger = get_logger(__name__)
+
+
+class DBWriter:
+    """后台写库线程
+
+    - 队列积累到 batch_size 条或距上次写入超过 flush_interval 秒时批量写入
+    - 连接类错误（StoreUnavailableError）按指数退避重试 max_retries 次，仍失败则追加到 journal_path（JSONL）
+    - SQL/表结构等永久错误不重试、不回放：逐条写入隔离出问题记录，追加到 rejected_path 供人工排查
+    - 创建时同步回放上次遗留的日志（断点续跑查询前由 replay_pending 触发），进程退出时自动 flush
+    """
+
+    _shared: Optional["DBWriter"] = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self,
+                 batch_size: int = 50,
+                 flush_interval: float = 2.0,
+                 max_retries: int = 3,
+                 backoff_base: float = 1.0,
+                 journal_path: str = "output/cache/db_journal.jsonl",
+                 rejected_path: str = "output/cache/db_rejected.jsonl"):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.journal_path = Path(journal_path)
+        self.rejected_path = Path(rejected_path)
+
+        self._queue: "queue.Queue[Optional[Tuple[str, tuple]]]" = queue.Queue()
+        self._journal_lock = threading.Lock()
+        self._closed = False
+        # 先回放再启动写库线程：回放完成前不会有新记录写入
+        self._replay_journal()
+        self._thread = threading.Thread(target=self._run, name="db-writer", daemon=True)
+        self._thread.start()
+
+    @classmethod
+    def shared(cls) -> "DBWriter":
+        """按 db_config.yaml 中 writer 配置创建的进程级共享实例"""
+        if cls._shared is None:
+            with cls._shared_lock:
+                if cls._shared is None:
+                    config = YamlUtils.load_db_writer_config()
+                    cls._shared = cls(
+                        batch_size=config.get('batch_size', 50),
+                        flush_interval=config.get('flush_interval', 2.0),
+                        max_retries=config.get('max_retries', 3),
+                        backoff_base=config.get('backoff_base', 1.0),
+                        journal_path=config.get('journal_path', "output/cache/db_journal.jsonl"),
+                        rejected_path=config.get('rejected_path', "output/cache/db_rejected.jsonl")
+                    )
+                    atexit.register(cls._shared.close)
+        return cls._shared
+
+    @classmethod
+    def target(cls):
+        """写入目标：启用后台写库时为共享 DBWriter，否则为 DBUtils（同步写入），两者写入接口一致"""
+        if YamlUtils.load_db_writer_config().get('enabled', False):
+            return cls.shared()
+        return DBUtils
+
+    @classmethod
+    def replay_pending(cls):
+        """断点续跑查询前调用：同步回放遗留日志并写完已入队记录，使随后的查询能看到全部已保存结果"""
+        config = YamlUtils.load_db_writer_config()
+        journal_path = Path(config.get('journal_path', "output/cache/db_journal.jsonl"))
+        has_journal = journal_path.exists() or any(journal_path.parent.glob(f"{journal_path.name}.replay_*"))
+        # 关闭后台写库时也回放：日志可能来自启用写库时的上一次运行
+        if config.get('enabled', False) or has_journal:
+            cls.shared().flush()
+
+    def save_result_value(self, app_id: str, model_type: str, seq: int, val: Optional[int], prompt_structure: int,
+                          texts: dict):
+        """参数同 DBUtils.save_result_value，立即返回"""
+        self._put("result", DBUtils.result_params(app_id, model_type, seq, val, prompt_structure, texts))
+
+    def save_prompt(self, app_id: str, global_prompt: str, component_prompt: str, adjacent_prompt: str,
+                    restrictive_prompt: str, guiding_prompt: str, token_counts: Optional[dict] = None):
+        """参数同 DBUtils.save_prompt，立即返回"""
+        self._put("prompt", DBUtils.prompt_params(
+            app_id, global_prompt, component_prompt, adjacent_prompt, restrictive_prompt, guiding_prompt, token_counts
+        ))
+
+    def _put(self, kind: str, params: tuple):
+        if self._closed:
+            # 已关闭（如 atexit 之后）时同步写入
+            self._write_batch([(kind, params)])
+            return
+        self._queue.put((kind, params))
+
+    def flush(self):
+        """阻塞直到已入队的记录全部写入（或落盘）"""
+        self._queue.join()
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(None)
+        self._thread.join()
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                self._queue.task_done()
+                return
+
+            # 从第一条记录开始计时，满 batch_size 条或超过 flush_interval 秒即写入
+            batch = [item]
+            deadline = time.monotonic() + self.flush_interval
+            stop = False
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is None:
+                    stop = True
+                    break
+                batch.append(item)
+
+            self._write_batch(batch)
+            for _ in batch:
+                self._queue.task_done()
+            if stop:
+                self._queue.task_done()
+                return
+
+    def _write_batch(self, batch: List[Tuple[str, tuple]]):
+        grouped: Dict[str, List[tuple]] = {}
+        for kind, params in batch:
+            grouped.setdefault(kind, []).append(params)
+
+        for kind, rows in grouped.items():
+            for attempt in range(1, self.max_retries + 1):
+                try:
+                    DBUtils.write_rows(kind, rows)
+                    logger.debug(f"💾 批量写入 {kind} {len(rows)} 条")
+                    break
+                except StoreUnavailableError as e:
+                    if attempt == self.max_retries:
+                        logger.error(
+                            f"❌ 数据库不可用（已重试 {self.max_retries} 次），{len(rows)} 条 {kind} 记录写入日志 "
+                            f"{self.journal_path}: {e}"
+                        )
+                        self._spill(kind, rows)
+                        break
+                    delay = self.backoff_base * 2 ** (attempt - 1)
+                    logger.warning(f"\t🔁 数据库不可用，{delay:.1f}s 后重试 ({attempt}/{self.max_retries}): {e}")
+                    time.sleep(delay)
+                except RuntimeError as e:
+                    logger.error(f"❌ 批量写入 {kind} 失败（非连接错误），改为逐条写入: {e}")
+                    self._write_rows_individually(kind, rows)
+                    break
+
+    def _write_rows_individually(self, kind: str, rows: List[tuple]):
+        """逐条写入以隔离问题记录：写入失败的记录落到 rejected_path，连接中断的记录仍写入日志"""
+        for params in rows:
+            try:
+                DBUtils.write_rows(kind, [params])
+            except StoreUnavailableError as e:
+                logger.error(f"❌ 数据库不可用，{kind} 记录写入日志 {self.journal_path}: {e}")
+                self._spill(kind, [params])
+            except RuntimeError as e:
+                logger.error(f"🚫 {kind} 记录写入失败，已记录到 {self.rejected_path}: {e}")
+                self._reject(kind, params, e)
+
+    def _reject(self, kind: str, params: tuple, error: Exception):
+        """追加到问题记录文件（不回放）"""
+        with self._journal_lock:
+            self.rejected_path.parent.mkdir(parents=True, exist_ok=True)
+            with self.rejected_path.open('a', encoding='utf-8') as f:
+                f.write(json.dumps({"kind": kind, "params": list(params), "error": str(error)},
+                                   ensure_ascii=False) + "\n")
+
+    def _spill(self, kind: str, rows: List[tuple]):
+        """追加到本地日志，下次启动时回放"""
+        with self._journal_lock:
+            self.journal_path.parent.mkdir(parents=True, exist_ok=True)
+            with self.journal_path.open('a', encoding='utf-8') as f:
+                for params in rows:
+                    f.write(json.dumps({"kind": kind, "params": list(params)}, ensure_ascii=False) + "\n")
+
+    def _replay_journal(self):
+        """回放上次遗留的日志（在创建写库线程前同步执行，失败的记录会重新写入新日志）"""
+        with self._journal_lock:
+            pending = sorted(self.journal_path.parent.glob(f"{self.journal_path.name}.replay_*"))
+            if self.journal_path.exists():
+                replay_path = self.journal_path.with_name(f"{self.journal_path.name}.replay_{time.time_ns()}")
+                self.journal_path.rename(replay_path)
+                pending.append(replay_path)
+
+        for replay_path in pending:
+            records = []
+            with replay_path.open('r', encoding='utf-8') as f:
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        logger.warning(f"跳过损坏的日志行: {line[:80]}")
+                        continue
+                    params = tuple(record["params"])
+                    if record["kind"] == "prompt" and len(params) == 6:
+                        params += (None,)  # 旧版本日志没有 token_counts 列
+                    records.append((record["kind"], params))
+            logger.info(f"📥 回放写库日志 {replay_path.name}: {len(records)} 条")
+            for start in range(0, len(records), self.batch_size):
+                self._write_batch(records[start:start + self.batch_size])
+            # 写入（或重新落盘）完成后再删除，中途退出时下次启动会再次回放
+            replay_path.unlink()
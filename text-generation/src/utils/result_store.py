@@ -0,0 +1,382 @@
+"""实验结果存储后端：MySQL（连接池）与嵌入式 SQLite（WAL），DBUtils 通过配置选择后端"""
+
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, ContextManager, Dict, Iterator, List, Optional, Sequence, Set, Tuple
+
+import pandas as pd
+
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class StoreUnavailableError(RuntimeError):
+    """数据库暂时不可用（连接失败/断开、连接池耗尽、库被锁），稍后重试可能成功"""
+
+
+class ResultStore(ABC):
+    """存储后端基类：查询语句统一使用 %s 占位符，由各后端转换
+
+    异常统一包装为 RuntimeError；连接类错误包装为其子类 StoreUnavailableError，
+    其余（SQL语法、表结构、约束等）重试无意义。
+    """
+
+    name = "base"
+    RESULT_UPSERT = ""
+    PROMPT_UPSERT = ""
+
+    @abstractmethod
+    def _connection(self) -> ContextManager:
+        """返回数据库连接的上下文管理器（子类用 @contextmanager 实现）"""
+
+    def _sql(self, query: str) -> str:
+        return query
+
+    def _is_unavailable(self, error: Exception) -> bool:
+        """是否为连接类（可重试）错误，由各后端按驱动异常类型判断"""
+        return False
+
+    def _wrap_error(self, error: Exception) -> RuntimeError:
+        if isinstance(error, StoreUnavailableError):
+            return error
+        if self._is_unavailable(error):
+            return StoreUnavailableError(f"Database unavailable: {error}")
+        return RuntimeError(f"Database operation failed: {error}")
+
+    def write_rows(self, kind: str, rows: List[tuple]):
+        """在一个事务中批量写入 result / prompt 记录"""
+        self._execute_many({"result": self.RESULT_UPSERT, "prompt": self.PROMPT_UPSERT}[kind], rows)
+
+    def _execute_many(self, query: str, rows: List[tuple]):
+        try:
+            with self._connection() as conn:
+                cursor = conn.cursor()
+                try:
+                    cursor.executemany(self._sql(query), rows)
+                    conn.commit()
+                except Exception:
+                    conn.rollback()
+                    raise
+                finally:
+                    cursor.close()
+        except Exception as e:
+            raise self._wrap_error(e) from e
+
+    def fetch_all(self, query: str, params: Sequence[Any] = ()) -> List[tuple]:
+        try:
+            with self._connection() as conn:
+                cursor = conn.cursor()
+                try:
+                    cursor.execute(self._sql(query), tuple(params))
+                    return cursor.fetchall()
+                finally:
+                    cursor.close()
+        except Exception as e:
+            raise self._wrap_error(e) from e
+
+    def fetch_one_dict(self, query: str, params: Sequence[Any] = ()) -> Optional[Dict[str, Any]]:
+        try:
+            with self._connection() as conn:
+                cursor = conn.cursor()
+                try:
+                    cursor.execute(self._sql(query), tuple(params))
+                    row = cursor.fetchone()
+                    columns = [column[0] for column in cursor.description]
+                    # 取完剩余结果，避免连接归还时残留未读结果
+                    cursor.fetchall()
+                    return dict(zip(columns, row)) if row is not None else None
+                finally:
+                    cursor.close()
+        except Exception as e:
+            raise self._wrap_error(e) from e
+
+    def iter_frames(self, query: str, params: Sequence[Any] = (), chunksize: int = 10000) -> Iterator[pd.DataFrame]:
+        """参数化查询，按 chunksize 行分块返回 DataFrame（所有块列一致，无结果时返回一个空表）"""
+        try:
+            with self._connection() as conn:
+                cursor = conn.cursor()
+                try:
+                    cursor.execute(self._sql(query), tuple(params))
+                    columns = [column[0] for column in cursor.description]
+                    emitted = False
+                    while True:
+                        rows = cursor.fetchmany(chunksize)
+                        if not rows:
+                            break
+                        emitted = True
+                        yield pd.DataFrame.from_records(rows, columns=columns)
+                    if not emitted:
+                        yield pd.DataFrame(columns=columns)
+                finally:
+                    cursor.close()
+        except RuntimeError:
+            raise
+        except Exception as e:
+            raise self._wrap_error(e) from e
+
+    # ================= 业务查询 =================
+    def select_finished_seqs(self, app_id: str, model_type: str, prompt_structure: int) -> Set[int]:
+        rows = self.fetch_all(
+            "SELECT seq FROM t_google_results WHERE app_id = %s AND model_type = %s AND prompt_structure = %s",
+            (app_id, model_type, prompt_structure)
+        )
+        return {row[0] for row in rows}
+
+    def select_prompt(self, app_id: str) -> Optional[Dict[str, str]]:
+        return self.fetch_one_dict(
+            "SELECT global, component, adjacent, restrictive, guiding FROM t_google_prompts WHERE app_id = %s",
+            (app_id,)
+        )
+
+    def select_prompt_app_ids(self) -> List[str]:
+        return [row[0] for row in self.fetch_all("SELECT app_id FROM t_google_prompts ORDER BY app_id")]
+
+    def select_result_keys(self, app_id: str) -> Set[Tuple[str, int, int]]:
+        rows = self.fetch_all(
+            "SELECT model_type, prompt_structure, seq FROM t_google_results WHERE app_id = %s", (app_id,)
+        )
+        return {(row[0], row[1], row[2]) for row in rows}
+
+    def iter_component_results(self, model_type: str, prompt_structure: int,
+                               chunksize: int = 10000) -> Iterator[pd.DataFrame]:
+        return self.iter_frames(
+            """
+            SELECT app_id, model_type, seq, val, prompt_structure, tau, tau_seq, component_num, component, combination
+            FROM t_google_component_results
+            WHERE model_type = %s AND prompt_structure = %s
+            """,
+            (model_type, prompt_structure),
+            chunksize
+        )
+
+
+class MySQLResultStore(ResultStore):
+    """MySQL 后端（mysql-connector 连接池，首次使用时创建）"""
+
+    name = "mysql"
+
+    RESULT_UPSERT = """
+        INSERT INTO t_google_results
+            (app_id, model_type, seq, val, prompt_structure, texts, update_time)
+        VALUES
+            (%s, %s, %s, %s, %s, %s, NOW())
+        ON DUPLICATE KEY UPDATE
+            val = VALUES(val),
+            texts = VALUES(texts),
+            update_time = NOW()
+        """
+
+    PROMPT_UPSERT = """
+        INSERT INTO t_google_prompts
+            (app_id, global, component, adjacent, restrictive, guiding, token_counts, update_time)
+        VALUES
+            (%s, %s, %s, %s, %s, %s, %s, NOW())
+        ON DUPLICATE KEY UPDATE
+            global = VALUES(global),
+            component = VALUES(component),
+            adjacent = VALUES(adjacent),
+            restrictive = VALUES(restrictive),
+            guiding = VALUES(guiding),
+            token_counts = VALUES(token_counts),
+            update_time = NOW()
+        """
+
+    # 共享研究库不自动改表：未执行迁移（缺少 token_counts 列）时使用
+    LEGACY_PROMPT_UPSERT = """
+        INSERT INTO t_google_prompts
+            (app_id, global, component, adjacent, restrictive, guiding, update_time)
+        VALUES
+            (%s, %s, %s, %s, %s, %s, NOW())
+        ON DUPLICATE KEY UPDATE
+            global = VALUES(global),
+            component = VALUES(component),
+            adjacent = VALUES(adjacent),
+            restrictive = VALUES(restrictive),
+            guiding = VALUES(guiding),
+            update_time = NOW()
+        """
+    TOKEN_COUNTS_MIGRATION = "ALTER TABLE t_google_prompts ADD COLUMN token_counts TEXT NULL AFTER guiding"
+
+    def __init__(self, config: dict):
+        self.config = config
+        self._pool = None
+        self._pool_lock = threading.Lock()
+        self._token_counts_column: Optional[bool] = None  # 首次写入子提示时检查一次
+
+    def write_rows(self, kind: str, rows: List[tuple]):
+        if kind == "prompt" and not self._has_token_counts_column():
+            # 最后一列为 token_counts
+            self._execute_many(self.LEGACY_PROMPT_UPSERT, [row[:-1] for row in rows])
+            return
+        super().write_rows(kind, rows)
+
+    def _has_token_counts_column(self) -> bool:
+        if self._token_counts_column is None:
+            rows = self.fetch_all(
+                "SELECT COUNT(*) FROM information_schema.COLUMNS "
+                "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 't_google_prompts' AND COLUMN_NAME = 'token_counts'"
+            )
+            self._token_counts_column = rows[0][0] > 0
+            if not self._token_counts_column:
+                logger.warning(f"⚠️ t_google_prompts 缺少 token_counts 列，子提示 token 数不写库；"
+                               f"如需保存请执行: {self.TOKEN_COUNTS_MIGRATION}")
+        return self._token_counts_column
+
+    def _initialize_pool(self):
+        """初始化连接池（多设备并行时避免重复创建）"""
+        if self._pool is not None:
+            return
+        with self._pool_lock:
+            if self._pool is not None:
+                return
+            try:
+                from mysql.connector import pooling
+
+                self._pool = pooling.MySQLConnectionPool(
+                    pool_name=self.config.get('pool_name') or 'mypool',
+                    pool_size=self.config.get('pool_size', 5),
+                    host=self.config['host'],
+                    port=self.config['port'],
+                    user=self.config['user'],
+                    password=self.config['password'],
+                    database=self.config['database']
+                )
+            except Exception as e:
+                raise StoreUnavailableError(f"Failed to initialize database pool: {e}")
+
+    def _is_unavailable(self, error: Exception) -> bool:
+        try:
+            from mysql.connector import errors
+        except ImportError:
+            return False
+        # InterfaceError: 无法连接/连接断开；OperationalError: 服务端断开、超时等；PoolError: 连接池耗尽
+        return isinstance(error, (errors.InterfaceError, errors.OperationalError, errors.PoolError))
+
+    @contextmanager
+    def _connection(self):
+        self._initialize_pool()
+        conn = self._pool.get_connection()
+        try:
+            yield conn
+        finally:
+            conn.close()  # 归还连接池
+
+
+class SQLiteResultStore(ResultStore):
+    """嵌入式 SQLite 后端：WAL 模式，每个线程一个连接，本地运行与CI无需数据库服务"""
+
+    name = "sqlite"
+
+    RESULT_UPSERT = """
+        INSERT INTO t_google_results
+            (app_id, model_type, seq, val, prompt_structure, texts, update_time)
+        VALUES
+            (?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+        ON CONFLICT (app_id, model_type, prompt_structure, seq) DO UPDATE SET
+            val = excluded.val,
+            texts = excluded.texts,
+            update_time = CURRENT_TIMESTAMP
+        """
+
+    PROMPT_UPSERT = """
+        INSERT INTO t_google_prompts
+            (app_id, global, component, adjacent, restrictive, guiding, token_counts, update_time)
+        VALUES
+            (?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+        ON CONFLICT (app_id) DO UPDATE SET
+            global = excluded.global,
+            component = excluded.component,
+            adjacent = excluded.adjacent,
+            restrictive = excluded.restrictive,
+            guiding = excluded.guiding,
+            token_counts = excluded.token_counts,
+            update_time = CURRENT_TIMESTAMP
+        """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS t_google_results (
+            app_id TEXT NOT NULL,
+            model_type TEXT NOT NULL,
+            seq INTEGER NOT NULL,
+            val INTEGER,
+            prompt_structure INTEGER NOT NULL,
+            texts TEXT,
+            update_time TEXT,
+            PRIMARY KEY (app_id, model_type, prompt_structure, seq)
+        );
+        CREATE INDEX IF NOT EXISTS idx_results_model_structure
+            ON t_google_results (model_type, prompt_structure);
+
+        CREATE TABLE IF NOT EXISTS t_google_prompts (
+            app_id TEXT PRIMARY KEY,
+            global TEXT,
+            component TEXT,
+            adjacent TEXT,
+            restrictive TEXT,
+            guiding TEXT,
+            token_counts TEXT,
+            update_time TEXT
+        );
+
+        CREATE TABLE IF NOT EXISTS t_google_component_results (
+            app_id TEXT NOT NULL,
+            model_type TEXT NOT NULL,
+            seq INTEGER NOT NULL,
+            val INTEGER,
+            prompt_structure INTEGER NOT NULL,
+            tau REAL,
+            tau_seq INTEGER,
+            component_num INTEGER,
+            component TEXT,
+            combination TEXT
+        );
+        CREATE INDEX IF NOT EXISTS idx_component_results_key
+            ON t_google_component_results (app_id, model_type, prompt_structure, seq);
+        CREATE INDEX IF NOT EXISTS idx_component_results_model_structure
+            ON t_google_component_results (model_type, prompt_structure);
+        """
+
+    def __init__(self, path: str = "output/db/results.sqlite"):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+        with self._connection() as conn:
+            conn.executescript(self.SCHEMA)
+            # 旧版本创建的库缺少 token_counts 列
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(t_google_prompts)")}
+            if "token_counts" not in columns:
+                conn.execute("ALTER TABLE t_google_prompts ADD COLUMN token_counts TEXT")
+        logger.debug(f"SQLite 结果库: {self.path}")
+
+    @contextmanager
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(str(self.path), timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        yield conn
+
+    def _sql(self, query: str) -> str:
+        return query.replace("%s", "?")
+
+    def _is_unavailable(self, error: Exception) -> bool:
+        # OperationalError 也包括 no such table 等结构错误，只把锁/文件访问问题视为暂时不可用
+        return isinstance(error, sqlite3.OperationalError) and any(
+            reason in str(error) for reason in ("locked", "busy", "unable to open", "disk I/O")
+        )
+
+
+def create_result_store(config: dict) -> ResultStore:
+    """根据 db_config.yaml 创建存储后端（backend: mysql / sqlite）"""
+    backend = config.get('backend', 'mysql')
+    if backend == 'sqlite':
+        return SQLiteResultStore(config.get('sqlite', {}).get('path', "output/db/results.sqlite"))
+    if backend == 'mysql':
+        return MySQLResultStore(config['mysql'])
+    raise ValueError(f"不支持的存储后端: {backend}")
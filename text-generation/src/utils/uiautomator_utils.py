@@ -15,6 +15,13 @@ logger = logging.getLogger(__name__)
 class UIAutomatorUtils:
     """UI Automator 操作工具类（静态方法）"""
 
+    INPUT_CLASSES = (
+        'android.widget.EditText',
+        'android.widget.AutoCompleteTextView',
+        'android.widget.MultiAutoCompleteTextView'
+    )
+    TEXT_VIEW_CLASS = 'android.widget.TextView'
+
     @staticmethod
     def connect_device(serial: Optional[str] = None) -> Device:
         """连接设备"""
@@ -0,0 +1,107 @@
+# src/utils/xml_benchmark.py
+"""UI层级XML基准：对已保存的 output/xml_dumps 分阶段测量实际上下文提取流程的耗时，并校验裁剪结果的序列化"""
+import json
+import statistics
+import time
+from pathlib import Path
+from typing import Callable, Dict, List
+from xml.etree import ElementTree as ET
+
+from src.context_extraction.hierarchy_pruner import HierarchyPruner
+from src.context_extraction.offline_extractor import OfflineContextExtractor
+from src.context_extraction.ui_node_table import UINodeTable
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class XmlBenchmark:
+    """对每个文件取 repeat 次的中位数：
+
+    - prune_ms：HierarchyPruner.prune（解析 + 按包名裁剪 + 序列化）
+    - table_ms：UINodeTable.build（节点表）
+    - extract_ms：OfflineContextExtractor.extract_all_contexts（以上两步加 global/component/adjacent 上下文）
+
+    同时校验裁剪后的XML与 ET.tostring(裁剪后的根节点) 逐字节一致（覆盖 & < " 等转义）。
+    """
+
+    def __init__(self, paths: List[Path], repeat: int = 20):
+        self.paths = paths
+        self.repeat = repeat
+
+    @staticmethod
+    def _median_ms(func: Callable[[], object], repeat: int) -> float:
+        samples = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            func()
+            samples.append(time.perf_counter() - start)
+        return round(statistics.median(samples) * 1000, 4)
+
+    def _bench_file(self, path: Path) -> Dict:
+        raw_xml = path.read_text(encoding="utf-8")
+        extractor = OfflineContextExtractor(path)
+        package_name = extractor.package_name
+        root, xml = HierarchyPruner.prune(raw_xml, package_name)
+        result = {
+            "file": str(path),
+            "bytes": len(raw_xml.encode("utf-8")),
+            "identical": xml == ET.tostring(root, encoding="utf-8").decode(),
+            "prune_ms": self._median_ms(lambda: HierarchyPruner.prune(raw_xml, package_name), self.repeat),
+            "table_ms": self._median_ms(lambda: UINodeTable.build(root), self.repeat),
+        }
+        try:
+            extractor.extract_all_contexts()
+        except RuntimeError as e:
+            # 输入框缺少 resource-id 等情况：只统计裁剪与节点表耗时
+            result["extract_ms"] = None
+            result["error"] = f"{type(e).__name__}: {e}"
+            return result
+        result["extract_ms"] = self._median_ms(extractor.extract_all_contexts, self.repeat)
+        return result
+
+    def run(self) -> Dict:
+        files = [self._bench_file(path) for path in self.paths]
+        return {
+            "repeat": self.repeat,
+            "files": files,
+            "total_ms": {
+                step: round(sum(f[step] for f in files if f[step] is not None), 4)
+                for step in ("prune_ms", "table_ms", "extract_ms")
+            },
+            "mismatched": [f["file"] for f in files if not f["identical"]],
+        }
+
+    @staticmethod
+    def save_report(summary: Dict, report_dir: str = "output/reports") -> Path:
+        """打印并保存基准结果"""
+        total = summary["total_ms"]
+        logger.info(f"裁剪 {total['prune_ms']}ms | 节点表 {total['table_ms']}ms | 完整提取 {total['extract_ms']}ms")
+        if summary["mismatched"]:
+            logger.error(f"❌ 裁剪结果与 ET.tostring 不一致: {summary['mismatched']}")
+        logger.info(f"（{len(summary['files'])} 个文件，每项为各文件中位数之和）")
+
+        path = Path(report_dir)
+        path.mkdir(parents=True, exist_ok=True)
+        report_path = path / f"xml_benchmark_{time.strftime('%Y%m%d_%H%M%S')}.json"
+        with open(report_path, 'w', encoding='utf-8') as f:
+            json.dump(summary, f, indent=2, ensure_ascii=False)
+        logger.info(f"📄 基准报告已保存: {report_path}")
+        return report_path
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from src.utils.logger import setup_logging
+
+    parser = argparse.ArgumentParser(description="UI层级XML上下文提取流程基准")
+    parser.add_argument("paths", nargs="*", help="层级XML文件，默认 output/xml_dumps/hierarchy_*.xml")
+    parser.add_argument("--repeat", type=int, default=20, help="每项测量重复次数")
+    args = parser.parse_args()
+
+    setup_logging()
+    xml_paths = [Path(p) for p in args.paths] or sorted(Path("output/xml_dumps").glob("hierarchy_*.xml"))
+    if not xml_paths:
+        raise SystemExit("未找到层级XML文件（output/xml_dumps/hierarchy_*.xml）")
+    XmlBenchmark.save_report(XmlBenchmark(xml_paths, args.repeat).run())
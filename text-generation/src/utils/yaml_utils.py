@@ -4,35 +4,23 @@ from pathlib import Path
 from typing import Any, Dict, Union, List, Optional
 import yaml
 
+from src.utils.config_registry import ConfigRegistry
 from src.utils.logger import get_logger
 
 logger = get_logger(__name__)
 
+CONFIG_DIR = Path(__file__).parent.parent.parent / "configs"
+
 
 class YamlUtils:
-    """YAML 配置文件处理工具类"""
+    """YAML 配置文件处理工具类（解析结果由 ConfigRegistry 按修改时间缓存）"""
 
     @staticmethod
     def load_config() -> Dict[str, Any]:
         """加载并验证YAML配置文件 """
-        config_path = Path(__file__).parent.parent.parent / "configs" / "install_config.yaml"
+        config_path = CONFIG_DIR / "install_config.yaml"
         try:
-            with config_path.open('r', encoding='utf-8') as f:
-                config = yaml.safe_load(f) or {}
-
-            # 路径规范化处理
-            config['aapt_path'] = str(Path(config.get('aapt_path', '')).expanduser().resolve())
-            config['adb_path'] = str(Path(config.get('adb_path', '')).expanduser().resolve())
-
-            # 处理APK来源路径
-            config['sources'] = config.get('source', [])
-
-            # 验证必要配置项
-            required_keys = ['log_config', 'aapt_path', 'adb_path', 'source']
-            if missing := [k for k in required_keys if k not in config]:
-                raise ValueError(f"缺少必要配置项: {missing}")
-
-            return config
+            return ConfigRegistry.get(config_path, YamlUtils._process_install_config)
 
         except FileNotFoundError as e:
             logger.error(f"配置文件不存在: {config_path}")
@@ -44,13 +32,57 @@ class YamlUtils:
             logger.error(f"配置加载异常: {str(e)}")
             raise
 
+    @staticmethod
+    def _process_install_config(raw: Optional[dict]) -> Dict[str, Any]:
+        """安装配置的规范化与校验"""
+        config = raw or {}
+
+        # 路径规范化处理
+        config['aapt_path'] = str(Path(config.get('aapt_path', '')).expanduser().resolve())
+        config['adb_path'] = str(Path(config.get('adb_path', '')).expanduser().resolve())
+
+        # 处理APK来源路径
+        config['sources'] = config.get('source', [])
+
+        # 验证必要配置项
+        required_keys = ['log_config', 'aapt_path', 'adb_path', 'source']
+        if missing := [k for k in required_keys if k not in config]:
+            raise ValueError(f"缺少必要配置项: {missing}")
+
+        return config
+
     AppConfig = Dict[str, Union[str, List[Dict]]]
 
     @staticmethod
     def load_app_config(package_name: str) -> AppConfig:
         """加载应用特定配置（增强型存在性检查）"""
-        config_path = Path(__file__).parent.parent.parent / "configs" / "apk_config" / f"{package_name}.yaml"
-        default_config = {
+        config_path = CONFIG_DIR / "apk_config" / f"{package_name}.yaml"
+
+        try:
+            final_config = ConfigRegistry.get(config_path, YamlUtils._process_app_config)
+            if not final_config["package_name"]:
+                final_config["package_name"] = package_name
+            if not final_config["app_name"]:
+                final_config["app_name"] = package_name
+
+            # 必须至少有一个有效验证
+            if not any(key in final_config for key in ['verify_appear', 'verify_disappear']):
+                logger.error(
+                    f"配置验证失败：{package_name}.yaml 需要至少一个有效的verify_appear或verify_disappear配置")
+                return YamlUtils._default_app_config()
+
+            return final_config
+
+        except FileNotFoundError:
+            logger.warning(f"应用配置文件不存在: {package_name}.yaml，使用默认配置")
+            return YamlUtils._default_app_config()
+        except Exception as e:
+            logger.error(f"配置加载失败: {package_name}", exc_info=True)
+            return YamlUtils._default_app_config()
+
+    @staticmethod
+    def _default_app_config() -> AppConfig:
+        return {
             "app_name": "",
             "package_name": "",
             "navigation_steps": [],
@@ -58,6 +90,11 @@ class YamlUtils:
             "delay_detect": []
         }
 
+    @staticmethod
+    def _process_app_config(raw: Optional[dict]) -> AppConfig:
+        """应用配置的规范化（包名缺省时由调用方补全）"""
+        config = raw or {}
+
         def process_verify(config_key: str) -> Optional[dict]:
             """智能处理验证配置项"""
             # 只在配置实际存在时处理
@@ -81,59 +118,60 @@ class YamlUtils:
                 'timeout': verify_config.get('timeout', 20),
             }
 
-        try:
-            with config_path.open('r', encoding='utf-8') as f:
-                config = yaml.safe_load(f) or {}
-
-                # 动态生成有效验证配置
-                valid_verifications = {}
-                for key in ['verify_appear', 'verify_disappear']:
-                    verification = process_verify(key)
-                    if verification:
-                        valid_verifications[key] = verification
-
-                # 必须至少有一个有效验证
-                if not valid_verifications:
-                    logger.error(
-                        f"配置验证失败：{package_name}.yaml 需要至少一个有效的verify_appear或verify_disappear配置")
-                    return default_config
-
-                # 构建最终配置（只保留有效项）
-                final_config = {
-                    "app_name": config.get("app_name", package_name),
-                    "delay_detect": config.get("delay_detect", []),
-                    "package_name": config.get("package_name", package_name),
-                    "navigation_steps": config.get("navigation_steps", []),
-                    "verify_action": config.get("verify_action", []),
-                    **valid_verifications  # 动态合并有效验证项
-                }
-
-                return final_config
+        # 动态生成有效验证配置
+        valid_verifications = {}
+        for key in ['verify_appear', 'verify_disappear']:
+            verification = process_verify(key)
+            if verification:
+                valid_verifications[key] = verification
+
+        # 构建最终配置（只保留有效项）
+        return {
+            "app_name": config.get("app_name", ""),
+            "delay_detect": config.get("delay_detect", []),
+            "package_name": config.get("package_name", ""),
+            "navigation_steps": config.get("navigation_steps", []),
+            "verify_action": config.get("verify_action", []),
+            **valid_verifications  # 动态合并有效验证项
+        }
 
-        except FileNotFoundError:
-            logger.warning(f"应用配置文件不存在: {package_name}.yaml，使用默认配置")
-            return default_config
-        except Exception as e:
-            logger.error(f"配置加载失败: {package_name}", exc_info=True)
-            return default_config
+    @staticmethod
+    def preload_app_configs() -> Dict[str, AppConfig]:
+        """预加载 apk_config/*.yaml，返回 {包名: 应用配置} 索引（批量模式使用）"""
+        index = {}
+        for config_path in sorted((CONFIG_DIR / "apk_config").glob("*.yaml")):
+            package_name = config_path.stem
+            app_config = YamlUtils.load_app_config(package_name)
+            if app_config["package_name"]:
+                index[package_name] = app_config
+        logger.info(f"📚 已预加载 {len(index)} 个应用配置")
+        return index
 
     @staticmethod
     def load_llm_config():
-        config_path = Path(__file__).parent.parent.parent / "configs" / "llm_config.yaml"
-        with open(config_path) as f:
-            llm_config = yaml.safe_load(f)['llm_config']
-        return llm_config
+        return ConfigRegistry.get(CONFIG_DIR / "llm_config.yaml")['llm_config']
+
+    @staticmethod
+    def load_fanout_config():
+        return ConfigRegistry.get(CONFIG_DIR / "llm_config.yaml").get('fanout_config', {})
+
+    @staticmethod
+    def load_prompt_budget_config():
+        return ConfigRegistry.get(CONFIG_DIR / "llm_config.yaml").get('prompt_budget', {})
 
     @staticmethod
     def load_db_config():
-        config_path = Path(__file__).parent.parent.parent / "configs" / "db_config.yaml"
-        with open(config_path) as f:
-            db_config = yaml.safe_load(f)['mysql']
-        return db_config
+        return ConfigRegistry.get(CONFIG_DIR / "db_config.yaml")['mysql']
+
+    @staticmethod
+    def load_storage_config():
+        """结果存储配置：backend 及各后端参数（mysql / sqlite）"""
+        return ConfigRegistry.get(CONFIG_DIR / "db_config.yaml")
+
+    @staticmethod
+    def load_db_writer_config():
+        return ConfigRegistry.get(CONFIG_DIR / "db_config.yaml").get('writer') or {}
 
     @staticmethod
     def load_prompt_config():
-        config_path = Path(__file__).parent.parent.parent / "configs" / "prompt_templates.yaml"
-        with open(config_path) as f:
-            db_config = yaml.safe_load(f)['prompt_templates']
-        return db_config
+        return ConfigRegistry.get(CONFIG_DIR / "prompt_templates.yaml")['prompt_templates']